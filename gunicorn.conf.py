@@ -0,0 +1,34 @@
+"""Gunicorn configuration, read automatically from the working directory.
+
+Set ASGI_MODE=true to serve mysite.asgi with uvicorn workers, so the async
+views and the live event stream can hold many slow or idle requests per
+worker. Otherwise mysite.wsgi is served with the default sync workers.
+
+With SIGNUPS_METRICS_DIR set, the master clears the directory on start and
+folds each exited worker's metrics file into one, so the directory does not
+grow with every worker restart.
+"""
+import os
+
+if os.environ.get('ASGI_MODE', 'False').lower() == 'true':
+    wsgi_app = 'mysite.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'mysite.wsgi'
+
+
+# Per-worker metrics files (see signups/metrics.py)
+metrics_dir = os.environ.get('SIGNUPS_METRICS_DIR')
+
+
+def on_starting(server):
+    if metrics_dir:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
+        from signups.metrics import clear_directory
+        clear_directory(metrics_dir)
+
+
+def child_exit(server, worker):
+    if metrics_dir:
+        from signups.metrics import retire_worker
+        retire_worker(metrics_dir, worker.pid)
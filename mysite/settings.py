@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import importlib.util
 import os
 import secrets
 import warnings
@@ -74,6 +75,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Removes itself at startup unless SIGNUPS_PROFILING is set
+    'signups.profiling.ProfilingMiddleware',
+    # Removes itself at startup unless SIGNUPS_SLOW_QUERY_MS is set
+    'signups.slow_queries.SlowQueryCallerMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -103,21 +108,160 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'mysite.wsgi.application'
 
+# Serve through ASGI with uvicorn workers instead of sync WSGI workers (see
+# gunicorn.conf.py). This also routes the public read views to their async
+# versions, and turns on the live availability event stream by default when
+# a shared event broker is configured.
+ASGI_MODE = os.environ.get('ASGI_MODE', 'False').lower() == 'true'
+SIGNUPS_ASYNC_VIEWS = os.environ.get('SIGNUPS_ASYNC_VIEWS', str(ASGI_MODE)).lower() == 'true'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Keep each worker's connection open for DB_CONN_MAX_AGE seconds between
+# requests instead of reconnecting for every request ("none" keeps it
+# forever, 0 closes it after each request), checking that it still works
+# before it is reused. Under ASGI every request runs in its own context, so
+# a kept connection would never be reused; use DB_POOL there instead.
+DB_CONN_MAX_AGE = os.environ.get('DB_CONN_MAX_AGE', '0' if ASGI_MODE else '60')
+DB_CONN_MAX_AGE = None if DB_CONN_MAX_AGE.lower() == 'none' else int(DB_CONN_MAX_AGE)
+DB_CONN_HEALTH_CHECKS = os.environ.get('DB_CONN_HEALTH_CHECKS', 'True').lower() == 'true'
+
+# With DB_POOL=true, PostgreSQL connections come from a pool in each worker
+# (requires psycopg 3 with psycopg_pool, i.e. "psycopg[pool]"). Pooling
+# replaces persistent connections: each request borrows a connection and
+# returns it when done.
+DB_POOL = os.environ.get('DB_POOL', 'False').lower() == 'true'
+DB_POOL_OPTIONS = {
+    'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+    'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+    'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),  # Seconds to wait for a free connection
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Take the write lock up front and wait for it, so concurrent signups
+        # from several workers queue up instead of failing with "database is locked"
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
+        # A file-backed test database lets threaded tests share one database;
+        # the in-memory shared cache raises table locks instead of waiting
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
 # Heroku database configuration
 DATABASE_URL = os.environ.get('DATABASE_URL')
 if DATABASE_URL:
-    DATABASES['default'] = dj_database_url.parse(DATABASE_URL)
+    DATABASES['default'] = dj_database_url.parse(
+        DATABASE_URL,
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=DB_CONN_HEALTH_CHECKS,
+    )
+
+if DB_POOL and DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    if importlib.util.find_spec('psycopg') and importlib.util.find_spec('psycopg_pool'):
+        DATABASES['default']['CONN_MAX_AGE'] = 0  # Django requires this with a pool
+        DATABASES['default'].setdefault('OPTIONS', {})['pool'] = DB_POOL_OPTIONS
+    else:
+        warnings.warn('DB_POOL is set but psycopg[pool] is not installed; using persistent connections instead')
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# The page cache's invalidation tokens live here, so every worker must see
+# the same cache: a token bumped in a per-process cache would leave the other
+# workers serving stale pages. Production needs Redis (set REDIS_URL); without
+# it the local memory cache is used and page and slot card caching are off
+# unless SIGNUPS_PAGE_CACHE=true says this is the only process.
+
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Cache rendered public form pages and slot cards
+SIGNUPS_PAGE_CACHE = os.environ.get('SIGNUPS_PAGE_CACHE', str(bool(REDIS_URL) or DEBUG)).lower() == 'true'
+if not REDIS_URL and not DEBUG and not SIGNUPS_PAGE_CACHE:
+    warnings.warn(
+        'REDIS_URL is not set, so page and slot card caching are off: the local memory '
+        'cache is not shared between workers. Set REDIS_URL to turn them on.'
+    )
+
+# Seconds a rendered public form page may be served from the cache. Pages are
+# invalidated as soon as their form, slots or signups change, so this only
+# bounds how long unused pages occupy the cache.
+SIGNUPS_PAGE_CACHE_TIMEOUT = int(os.environ.get('SIGNUPS_PAGE_CACHE_TIMEOUT', 60 * 60))
+
+# Slots shown per page on the public form and summary pages; "Load more"
+# fetches the next page.
+SIGNUPS_SLOTS_PER_PAGE = int(os.environ.get('SIGNUPS_SLOTS_PER_PAGE', 50))
+
+
+# Live availability over server-sent events. The in-process broker only
+# reaches streams held by the same process, so a stream would miss changes
+# made through other workers; the stream is only on by default with a shared
+# broker class. Pages still poll slowly while the stream is open.
+SIGNUPS_EVENT_BROKER = os.environ.get('SIGNUPS_EVENT_BROKER', 'signups.events.InProcessBroker')
+SIGNUPS_EVENT_STREAM = os.environ.get(
+    'SIGNUPS_EVENT_STREAM', str(ASGI_MODE and SIGNUPS_EVENT_BROKER != 'signups.events.InProcessBroker'),
+).lower() == 'true'
+SIGNUPS_EVENT_HEARTBEAT = 15  # Seconds between keepalive comments on an idle stream
+SIGNUPS_EVENT_RETRY = 30  # Seconds browsers wait before reconnecting
+
+# Time SQL, templates and views for every request, reported in a
+# Server-Timing header and a log line on the signups.profiling logger.
+SIGNUPS_PROFILING = os.environ.get('SIGNUPS_PROFILING', 'False').lower() == 'true'
+
+# Log every query that takes at least this many milliseconds, with its
+# EXPLAIN plan, to the signups.slow_queries logger and SIGNUPS_SLOW_QUERY_LOG.
+# "python manage.py slow_queries" lists the worst. Unset to turn it off.
+SIGNUPS_SLOW_QUERY_MS = float(os.environ['SIGNUPS_SLOW_QUERY_MS']) if os.environ.get('SIGNUPS_SLOW_QUERY_MS') else None
+SIGNUPS_SLOW_QUERY_LOG = os.environ.get('SIGNUPS_SLOW_QUERY_LOG', BASE_DIR / 'slow_queries.jsonl')
+
+
+# Directory shared by all workers on a host, where each writes its metrics
+# so /signups/metrics reports the whole server rather than one worker.
+SIGNUPS_METRICS_DIR = os.environ.get('SIGNUPS_METRICS_DIR')
+
+
+# Logging
+# https://docs.djangoproject.com/en/5.2/topics/logging/
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'signups': {
+            'handlers': ['console'],
+            'level': os.environ.get('SIGNUPS_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
 
 
 # Password validation
@@ -1,11 +1,25 @@
 from django.contrib import admin
+from django.core.exceptions import PermissionDenied
 from django.utils.html import format_html
 from django.http import JsonResponse
 from django.urls import path
 from django.template.response import TemplateResponse
 from django.contrib import messages
 from django.shortcuts import redirect
-from .models import VolunteerForm, VolunteerSlot, VolunteerSignup, VolunteerType
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+import io
+from .cache import get_active_volunteer_types, get_volunteer_types_version
+from .forms import SlotImportForm
+from .importer import detect_format, import_slots
+from .models import VolunteerForm, VolunteerSlot, VolunteerSignup, VolunteerType, WaitlistEntry
+
+# Seconds the browser may reuse a versioned copy of the volunteer types
+VOLUNTEER_TYPES_MAX_AGE = 60 * 60
+
+def volunteer_types_etag(request):
+    return get_volunteer_types_version()
 
 class VolunteerSignupInline(admin.TabularInline):
     model = VolunteerSignup
@@ -13,6 +27,13 @@ class VolunteerSignupInline(admin.TabularInline):
     readonly_fields = ['signed_up_at']
     fields = ['name', 'email', 'phone', 'notes', 'signed_up_at']
 
+class WaitlistEntryInline(admin.TabularInline):
+    model = WaitlistEntry
+    extra = 0
+    readonly_fields = ['joined_at']
+    fields = ['name', 'email', 'phone', 'notes', 'joined_at']
+    verbose_name_plural = 'Waitlist (promoted in this order as spots open)'
+
 class VolunteerSlotInline(admin.TabularInline):
     model = VolunteerSlot
     extra = 1
@@ -21,7 +42,7 @@ class VolunteerSlotInline(admin.TabularInline):
 
 @admin.register(VolunteerForm)
 class VolunteerFormAdmin(admin.ModelAdmin):
-    list_display = ['title', 'created_by', 'created_at', 'is_active', 'form_link', 'total_slots', 'total_signups']
+    list_display = ['title', 'created_by', 'created_at', 'is_active', 'form_link', 'total_slots', 'filled_slots', 'total_signups', 'credit_hours']
     list_filter = ['is_active', 'created_at', 'created_by']
     search_fields = ['title', 'description']
     readonly_fields = ['unique_url', 'form_link', 'created_at', 'updated_at']
@@ -44,34 +65,108 @@ class VolunteerFormAdmin(admin.ModelAdmin):
     def get_urls(self):
         urls = super().get_urls()
         custom_urls = [
-            path('volunteer-types/', self.admin_site.admin_view(self.get_volunteer_types), name='volunteer-types'),
+            path(
+                'volunteer-types/',
+                # cacheable, so admin_view leaves our Cache-Control alone
+                self.admin_site.admin_view(
+                    condition(etag_func=volunteer_types_etag)(self.get_volunteer_types),
+                    cacheable=True,
+                ),
+                name='volunteer-types',
+            ),
+            path('<path:object_id>/import-slots/', self.admin_site.admin_view(self.import_slots_view), name='signups_volunteerform_import_slots'),
         ]
         return custom_urls + urls
     
+    def import_slots_view(self, request, object_id):
+        """Upload a CSV or JSON file of slots for this form"""
+        form = get_object_or_404(VolunteerForm, pk=object_id)
+        if not self.has_change_permission(request, form):
+            raise PermissionDenied
+        result = None
+        if request.method == 'POST':
+            import_form = SlotImportForm(request.POST, request.FILES)
+            if import_form.is_valid():
+                upload = import_form.cleaned_data['file']
+                # Decode the upload as it is read instead of loading it into memory
+                stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+                result = import_slots(
+                    form,
+                    stream,
+                    fmt=detect_format(upload.name),
+                    skip_invalid=import_form.cleaned_data['skip_invalid'],
+                    dry_run=import_form.cleaned_data['dry_run'],
+                )
+                if import_form.cleaned_data['dry_run']:
+                    messages.info(request, f'Dry run: {result.valid} of {result.rows} row(s) are valid.')
+                elif result.committed:
+                    messages.success(request, f'Imported {result.created} slot(s).')
+                    if not result.error_count:
+                        return redirect('admin:signups_volunteerform_change', form.pk)
+                else:
+                    messages.error(request, f'{result.error_count} invalid row(s); no slots were imported.')
+        else:
+            import_form = SlotImportForm()
+        
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'original': form,
+            'title': f'Import slots into {form.title}',
+            'import_form': import_form,
+            'result': result,
+        }
+        return TemplateResponse(request, 'admin/signups/volunteerform/import_slots.html', context)
+    
     def get_volunteer_types(self, request):
-        volunteer_types = VolunteerType.objects.filter(is_active=True).values('id', 'name', 'description')
-        return JsonResponse(list(volunteer_types), safe=False)
+        response = JsonResponse(list(get_active_volunteer_types()), safe=False)
+        if request.GET.get('v') == get_volunteer_types_version():
+            # Form pages ask for the current version, so a change gets a new URL
+            patch_cache_control(response, private=True, max_age=VOLUNTEER_TYPES_MAX_AGE)
+        else:
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+    
+    def volunteer_types_context(self, extra_context):
+        return {
+            **(extra_context or {}),
+            'volunteer_types': get_active_volunteer_types(),
+            'volunteer_types_version': get_volunteer_types_version(),
+        }
     
     def change_view(self, request, object_id, form_url='', extra_context=None):
-        extra_context = extra_context or {}
-        extra_context['volunteer_types'] = VolunteerType.objects.filter(is_active=True)
-        return super().change_view(request, object_id, form_url, extra_context)
+        return super().change_view(request, object_id, form_url, self.volunteer_types_context(extra_context))
     
     def add_view(self, request, form_url='', extra_context=None):
-        extra_context = extra_context or {}
-        extra_context['volunteer_types'] = VolunteerType.objects.filter(is_active=True)
-        return super().add_view(request, form_url, extra_context)
+        return super().add_view(request, form_url, self.volunteer_types_context(extra_context))
+    
+    # Totals come from the form's stats row rather than aggregating every signup
+    def form_stat(self, obj, field):
+        stats = getattr(obj, 'stats', None)
+        return getattr(stats, field) if stats else None
     
     def total_slots(self, obj):
-        return obj.slots.count()
+        return self.form_stat(obj, 'total_slots')
     total_slots.short_description = 'Total Slots'
+    total_slots.admin_order_field = 'stats__total_slots'
+    
+    def filled_slots(self, obj):
+        return self.form_stat(obj, 'filled_slots')
+    filled_slots.short_description = 'Filled Slots'
+    filled_slots.admin_order_field = 'stats__filled_slots'
     
     def total_signups(self, obj):
-        return sum(slot.signups.count() for slot in obj.slots.all())
+        return self.form_stat(obj, 'total_signups')
     total_signups.short_description = 'Total Signups'
+    total_signups.admin_order_field = 'stats__total_signups'
+    
+    def credit_hours(self, obj):
+        return self.form_stat(obj, 'credit_hours')
+    credit_hours.short_description = 'Credit Hours'
+    credit_hours.admin_order_field = 'stats__credit_hours'
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('created_by')
+        return super().get_queryset(request).select_related('created_by', 'stats')
 
     def form_link(self, obj):
         """Display a clickable link to the volunteer form"""
@@ -109,7 +204,7 @@ class VolunteerSlotAdmin(admin.ModelAdmin):
     list_filter = ['date', 'form', 'form__is_active', 'volunteer_type']
     search_fields = ['title', 'description', 'form__title', 'volunteer_type__name']
     readonly_fields = ['current_signups', 'credit_hours']
-    inlines = [VolunteerSignupInline]
+    inlines = [VolunteerSignupInline, WaitlistEntryInline]
     
     def credit_hours(self, obj):
         """Display credit hours for this slot"""
@@ -117,8 +212,7 @@ class VolunteerSlotAdmin(admin.ModelAdmin):
             return f"{obj.volunteer_type.credit_hours} hours"
         return "No type set"
     credit_hours.short_description = 'Credit Hours'
-    
-
+    credit_hours.admin_order_field = 'volunteer_type__credit_hours'
     
     def is_full(self, obj):
         return obj.is_full()
@@ -126,7 +220,7 @@ class VolunteerSlotAdmin(admin.ModelAdmin):
     is_full.short_description = 'Full'
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('form')
+        return super().get_queryset(request).select_related('form', 'volunteer_type')
 
 @admin.register(VolunteerSignup)
 class VolunteerSignupAdmin(admin.ModelAdmin):
@@ -138,15 +232,17 @@ class VolunteerSignupAdmin(admin.ModelAdmin):
     def form_title(self, obj):
         return obj.slot.form.title
     form_title.short_description = 'Form'
+    form_title.admin_order_field = 'slot__form__title'
     
     def credit_hours(self, obj):
         """Display credit hours earned for this signup"""
         hours = obj.get_credit_hours()
         return f"{hours:.2f} hours"
     credit_hours.short_description = 'Credit Hours'
+    credit_hours.admin_order_field = 'credit_hours'
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('slot', 'slot__form')
+        return super().get_queryset(request).select_related('slot', 'slot__form').with_credit_hours()
 
 @admin.register(VolunteerType)
 class VolunteerTypeAdmin(admin.ModelAdmin):
@@ -163,3 +259,13 @@ class VolunteerTypeAdmin(admin.ModelAdmin):
             'description': 'Set the number of credit hours this volunteer activity is worth'
         }),
     )
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ['name', 'email', 'slot', 'joined_at']
+    list_filter = ['joined_at', 'slot__form']
+    search_fields = ['name', 'email', 'slot__title', 'slot__form__title']
+    readonly_fields = ['joined_at']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('slot')
@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class SignupsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'signups'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        if settings.SIGNUPS_PROFILING:
+            from .profiling import install_query_recorder
+            install_query_recorder()
+        if settings.SIGNUPS_SLOW_QUERY_MS is not None:
+            from .slow_queries import install
+            install()
@@ -0,0 +1,140 @@
+"""Query-budget and latency benchmarks for the signups views.
+
+``run_benchmarks`` seeds one form per requested size, requests every public
+view and admin changelist through the test client, and records query count,
+wall time and response size for each. ``check_results`` turns those numbers
+into failures: a view over its query budget, or slower than a stored
+baseline by more than the allowed tolerance. The ``benchmark_views``
+management command wraps both and writes the results as JSON.
+"""
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .cache import bump_form_version
+from .generator import generate_form, get_or_create_types
+from .models import VolunteerForm, VolunteerSlot
+
+# Slots per form, and the inclusive range of signups seeded into each slot
+DEFAULT_SIZES = [10, 500, 5000]
+DEFAULT_SIGNUPS_PER_SLOT = (0, 20)
+
+# Maximum queries per request, independent of form size
+QUERY_BUDGETS = {
+    'volunteer_form_view': 3,
+    'volunteer_slot_detail': 4,
+    'form_summary': 3,
+    'admin_form_changelist': 6,
+    'admin_slot_changelist': 7,
+    'admin_signup_changelist': 6,
+}
+
+# A timing only counts as a regression when it is slower than the baseline by
+# this ratio and by at least this many milliseconds, so fast views do not
+# fail on scheduler noise
+DEFAULT_TOLERANCE = 1.5
+MIN_REGRESSION_MS = 5.0
+
+
+def seed_form(user, volunteer_types, slot_count, signups_per_slot, rng):
+    """Create one form with slot_count slots and a random number of signups each"""
+    form = VolunteerForm.objects.create(
+        title=f'Benchmark form ({slot_count} slots)',
+        description='Generated for benchmarking',
+        created_by=user,
+    )
+    signups = generate_form(form, slot_count, signups_per_slot, volunteer_types, rng)
+    return form, signups
+
+
+def _targets(form, slot):
+    public = {'unique_url': form.unique_url}
+    return [
+        ('volunteer_form_view', reverse('signups:volunteer_form_view', kwargs=public), False),
+        ('volunteer_slot_detail', reverse('signups:slot_detail', kwargs={**public, 'slot_id': slot.pk}), False),
+        ('form_summary', reverse('signups:form_summary', kwargs=public), False),
+        ('admin_form_changelist', reverse('admin:signups_volunteerform_changelist'), True),
+        ('admin_slot_changelist', reverse('admin:signups_volunteerslot_changelist'), True),
+        ('admin_signup_changelist', reverse('admin:signups_volunteersignup_changelist'), True),
+    ]
+
+
+def measure(client, url, form, repeat):
+    """Request url repeat times, bypassing the page and slot card caches, and summarise"""
+    timings = []
+    queries = size = status = None
+    for _ in range(repeat):
+        # Every repeat times a full render, not cached cards from the last one
+        bump_form_version(form.pk)
+        VolunteerSlot.objects.filter(form=form).bump_version()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.get(url, secure=True)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries = len(captured)
+        size = len(response.content)
+        status = response.status_code
+    return {
+        'status': status,
+        'queries': queries,
+        'median_ms': round(statistics.median(timings), 2),
+        'max_ms': round(max(timings), 2),
+        'bytes': size,
+    }
+
+
+def run_benchmarks(sizes=None, signups_per_slot=DEFAULT_SIGNUPS_PER_SLOT, repeat=3, seed=0, log=None):
+    """Seed a form per size and measure every view against it"""
+    rng = random.Random(seed)
+    user, _ = User.objects.get_or_create(
+        username='benchmark-admin',
+        defaults={'is_staff': True, 'is_superuser': True},
+    )
+    volunteer_types = get_or_create_types(3)
+    public_client = Client()
+    admin_client = Client()
+    admin_client.force_login(user)
+
+    results = []
+    for slot_count in sizes or DEFAULT_SIZES:
+        form, signups = seed_form(user, volunteer_types, slot_count, signups_per_slot, rng)
+        if log:
+            log(f'Seeded {slot_count} slots with {signups} signups')
+        for name, url, is_admin in _targets(form, form.slots.order_by('pk').first()):
+            result = measure(admin_client if is_admin else public_client, url, form, repeat)
+            result.update(view=name, slots=slot_count, query_budget=QUERY_BUDGETS[name])
+            results.append(result)
+            if log:
+                log(f"  {name}: {result['queries']} queries, {result['median_ms']} ms, {result['bytes']} bytes")
+    return results
+
+
+def result_key(result):
+    return f"{result['view']}@{result['slots']}"
+
+
+def check_results(results, baseline=None, tolerance=DEFAULT_TOLERANCE):
+    """Return a list of human readable failures for results"""
+    failures = []
+    baseline_by_key = {result_key(result): result for result in (baseline or [])}
+    for result in results:
+        key = result_key(result)
+        if result['status'] != 200:
+            failures.append(f"{key}: returned HTTP {result['status']}")
+        if result['queries'] > result['query_budget']:
+            failures.append(f"{key}: {result['queries']} queries exceeds budget of {result['query_budget']}")
+        previous = baseline_by_key.get(key)
+        if previous:
+            limit = max(previous['median_ms'] * tolerance, previous['median_ms'] + MIN_REGRESSION_MS)
+            if result['median_ms'] > limit:
+                failures.append(
+                    f"{key}: {result['median_ms']} ms regressed past {limit:.2f} ms "
+                    f"(baseline {previous['median_ms']} ms)"
+                )
+    return failures
@@ -0,0 +1,277 @@
+"""Versioned page cache for the public form pages.
+
+Every form has a version token stored in the cache, alongside a global token
+that covers data shared by all forms (volunteer types). Rendered pages are
+cached under the tokens that were current when rendering started, so bumping
+a token (see signals.py) makes every older page for that form unreachable
+without having to find and delete it. Tokens are random rather than counters
+so that an evicted token can never be recreated with an old value.
+
+Below the page cache, each slot's card is cached on its own, keyed on the
+slot's ``version`` column. Any change to a slot or its signups increments
+that column, so when a page has to be rendered again only the cards of the
+slots that changed are rendered and have their signups loaded.
+
+Active volunteer types, which the admin reads on every form page, are kept
+in process memory. They are reloaded when the volunteer types token in the
+shared cache changes, which any worker does when it saves or deletes a
+type, and at least every ``VOLUNTEER_TYPES_TTL`` seconds regardless.
+"""
+import hashlib
+import threading
+import time
+import uuid
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache, caches
+from django.core.cache.backends.db import DatabaseCache
+from django.db.models import aprefetch_related_objects, prefetch_related_objects
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from .models import VolunteerForm, VolunteerType
+from .pagination import DEFAULT_RANGE
+
+FORM_URL_KEY = 'signups:form-url:{unique_url}'
+FORM_VERSION_KEY = 'signups:form-version:{form_id}'
+GLOBAL_VERSION_KEY = 'signups:form-version:all'
+PAGE_KEY = 'signups:page:{versions}:{path}'
+SLOT_CARD_KEY = 'signups:slot-card:{slot_id}:{version}:{vary}'
+VOLUNTEER_TYPES_VERSION_KEY = 'signups:volunteer-types-version'
+# Seconds a process reuses its volunteer types without a token change; a
+# backstop for writes that skip signals, such as QuerySet.update()
+VOLUNTEER_TYPES_TTL = 60
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+_volunteer_types_lock = threading.Lock()
+_volunteer_types = {'version': None, 'types': (), 'loaded_at': 0.0}
+
+
+def _record(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def get_page_cache_stats():
+    """Return this process's page cache hit and miss counts"""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_page_cache_stats():
+    with _stats_lock:
+        for outcome in _stats:
+            _stats[outcome] = 0
+
+
+def _new_version():
+    return uuid.uuid4().hex
+
+
+def remember_form_url(form):
+    """Map a form's unique_url to its id so cache hits need no database query"""
+    cache.set(FORM_URL_KEY.format(unique_url=form.unique_url), form.pk, None)
+
+
+def bump_form_version(form_id):
+    """Invalidate every cached page for one form"""
+    cache.set(FORM_VERSION_KEY.format(form_id=form_id), _new_version(), None)
+
+
+def bump_all_form_versions():
+    """Invalidate every cached page for every form"""
+    cache.set(GLOBAL_VERSION_KEY, _new_version(), None)
+
+
+def get_form_version(form_id):
+    """Return the combined global and per-form version token for a form"""
+    keys = [GLOBAL_VERSION_KEY, FORM_VERSION_KEY.format(form_id=form_id)]
+    versions = cache.get_many(keys)
+    if len(versions) < len(keys):
+        for key in keys:
+            if key not in versions:
+                # add() keeps whichever token a concurrent worker set first
+                cache.add(key, _new_version(), None)
+        versions = cache.get_many(keys)
+    return ':'.join(versions.get(key, '') for key in keys)
+
+
+def get_form_id(unique_url):
+    """Return the id of the form at unique_url, from the cache when possible"""
+    form_id = cache.get(FORM_URL_KEY.format(unique_url=unique_url))
+    if form_id is None:
+        form = VolunteerForm.objects.filter(unique_url=unique_url).only('pk', 'unique_url').first()
+        if form is None:
+            return None
+        remember_form_url(form)
+        form_id = form.pk
+    return form_id
+
+
+def _is_cacheable(request):
+    """Only anonymous GETs with no flash messages waiting are shared"""
+    return (
+        request.method in ('GET', 'HEAD')
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and CookieStorage.cookie_name not in request.COOKIES
+    )
+
+
+def _page_key(request, unique_url):
+    """Cache key for this request's page, or None when it must not be cached"""
+    if not settings.SIGNUPS_PAGE_CACHE or not _is_cacheable(request):
+        return None
+    form_id = get_form_id(unique_url)
+    if form_id is None:
+        return None
+    # Read the version before rendering, so a signup that lands while we
+    # render bumps past the key we store under instead of hiding behind it
+    path = request.get_full_path()
+    if request.GET.get('range', DEFAULT_RANGE) != DEFAULT_RANGE:
+        # Date ranges are relative to today, so yesterday's page must not be reused
+        path = f'{timezone.localdate().isoformat()}:{path}'
+    path = hashlib.md5(path.encode()).hexdigest()
+    return PAGE_KEY.format(versions=get_form_version(form_id), path=path)
+
+
+def _cached_response(cached):
+    _record('hits')
+    content, content_type = cached
+    response = HttpResponse(content, content_type=content_type)
+    response['X-Page-Cache'] = 'hit'
+    return response
+
+
+def _should_store(response):
+    _record('misses')
+    response['X-Page-Cache'] = 'miss'
+    return response.status_code == 200 and not response.streaming and not response.cookies
+
+
+def cache_form_page(view):
+    """Serve a form page from the cache until the form's version changes"""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, unique_url, *args, **kwargs):
+            key = await sync_to_async(_page_key)(request, unique_url)
+            if key is None:
+                return await view(request, unique_url, *args, **kwargs)
+            cached = await cache.aget(key)
+            if cached is not None:
+                return _cached_response(cached)
+            response = await view(request, unique_url, *args, **kwargs)
+            if _should_store(response):
+                await cache.aset(key, (response.content, response['Content-Type']), settings.SIGNUPS_PAGE_CACHE_TIMEOUT)
+            return response
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, unique_url, *args, **kwargs):
+        key = _page_key(request, unique_url)
+        if key is None:
+            return view(request, unique_url, *args, **kwargs)
+        cached = cache.get(key)
+        if cached is not None:
+            return _cached_response(cached)
+        response = view(request, unique_url, *args, **kwargs)
+        if _should_store(response):
+            cache.set(key, (response.content, response['Content-Type']), settings.SIGNUPS_PAGE_CACHE_TIMEOUT)
+        return response
+    return wrapper
+
+
+def _card_cache_enabled():
+    # A page stores one key per card, which costs several queries each on a database cache
+    return settings.SIGNUPS_PAGE_CACHE and not isinstance(caches['default'], DatabaseCache)
+
+
+def _card_key(slot, template_name, form):
+    # Cards also show the form's URL and the slot type's credit hours, which
+    # change without touching the slot
+    credit_hours = slot.volunteer_type.credit_hours if slot.volunteer_type else None
+    vary = hashlib.md5(f'{template_name}:{form.unique_url}:{credit_hours}'.encode()).hexdigest()
+    return SLOT_CARD_KEY.format(slot_id=slot.pk, version=slot.version, vary=vary)
+
+
+def _card_keys(slots, template_name, form):
+    return {slot.pk: _card_key(slot, template_name, form) for slot in slots}
+
+
+def _render_cards(slots, template_name, form, keys, cached):
+    """Render the cards missing from cached; return every card and the new ones"""
+    cards = []
+    rendered = {}
+    for slot in slots:
+        key = keys[slot.pk]
+        if key in cached:
+            card = cached[key]
+        else:
+            card = rendered[key] = render_to_string(template_name, {'form': form, 'slot': slot})
+        cards.append(mark_safe(card))
+    return cards, rendered
+
+
+def render_slot_cards(slots, template_name, form):
+    """Each slot's card rendered with template_name, from the cache when unchanged.
+
+    Signups are only loaded for the slots whose cards are rendered.
+    """
+    keys = _card_keys(slots, template_name, form)
+    cached = cache.get_many(keys.values()) if _card_cache_enabled() else {}
+    prefetch_related_objects([slot for slot in slots if keys[slot.pk] not in cached], 'signups')
+    cards, rendered = _render_cards(slots, template_name, form, keys, cached)
+    if rendered and _card_cache_enabled():
+        cache.set_many(rendered, settings.SIGNUPS_PAGE_CACHE_TIMEOUT)
+    return cards
+
+
+async def arender_slot_cards(slots, template_name, form):
+    """Async render_slot_cards()"""
+    keys = _card_keys(slots, template_name, form)
+    cached = await cache.aget_many(keys.values()) if _card_cache_enabled() else {}
+    await aprefetch_related_objects([slot for slot in slots if keys[slot.pk] not in cached], 'signups')
+    cards, rendered = _render_cards(slots, template_name, form, keys, cached)
+    if rendered and _card_cache_enabled():
+        await cache.aset_many(rendered, settings.SIGNUPS_PAGE_CACHE_TIMEOUT)
+    return cards
+
+
+def get_volunteer_types_version():
+    """Token that changes whenever any volunteer type is saved or deleted"""
+    version = cache.get(VOLUNTEER_TYPES_VERSION_KEY)
+    if version is None:
+        cache.add(VOLUNTEER_TYPES_VERSION_KEY, _new_version(), None)
+        version = cache.get(VOLUNTEER_TYPES_VERSION_KEY)
+    return version
+
+
+def get_active_volunteer_types():
+    """Active volunteer types as dicts of id, name and description.
+
+    Kept in process memory until the shared volunteer types token changes,
+    or for VOLUNTEER_TYPES_TTL seconds at most.
+    """
+    # Read the token first, so a type saved while we query bumps past what we store
+    version = get_volunteer_types_version()
+    now = time.monotonic()
+    with _volunteer_types_lock:
+        if _volunteer_types['version'] == version and now - _volunteer_types['loaded_at'] < VOLUNTEER_TYPES_TTL:
+            return _volunteer_types['types']
+    types = tuple(VolunteerType.objects.filter(is_active=True).values('id', 'name', 'description'))
+    with _volunteer_types_lock:
+        _volunteer_types.update(version=version, types=types, loaded_at=now)
+    return types
+
+
+def invalidate_volunteer_types():
+    """Make every process reload its volunteer types"""
+    with _volunteer_types_lock:
+        _volunteer_types.update(version=None, types=(), loaded_at=0.0)
+    cache.set(VOLUNTEER_TYPES_VERSION_KEY, _new_version(), None)
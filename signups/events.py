@@ -0,0 +1,100 @@
+"""Publish/subscribe fan-out of live slot availability.
+
+Signal receivers publish a message for a form whenever one of its slots
+changes, and every open event stream for that form receives it. The default
+``InProcessBroker`` only reaches streams served by the same process, which
+is enough for a single ASGI worker. Several workers need a shared broker:
+point ``SIGNUPS_EVENT_BROKER`` at a subclass whose ``publish`` sends to e.g.
+Redis pub/sub, with a listener in each process that hands received messages
+to ``InProcessBroker.publish`` for local fan-out.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# Messages a slow subscriber may fall behind before the oldest are dropped
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+def form_channel(form_id):
+    return f'form:{form_id}'
+
+
+def slot_availability(slot):
+    """The availability payload for one slot, as sent to browsers"""
+    return {
+        'id': slot.pk,
+        'available_spots': slot.available_spots(),
+        'is_full': slot.is_full(),
+    }
+
+
+class InProcessBroker:
+    """Fan messages out to asyncio subscribers in this process.
+
+    publish() may be called from any thread (signal receivers run in sync
+    request threads); delivery is handed to each subscriber's event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, message)
+            except RuntimeError:
+                pass  # The subscriber's loop has already closed
+
+    @staticmethod
+    def _deliver(queue, message):
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(message)
+
+    def subscriber_count(self, channel):
+        with self._lock:
+            return len(self._subscribers.get(channel, ()))
+
+    @contextmanager
+    def subscribe(self, channel):
+        """Yield an asyncio.Queue that receives every message on channel.
+
+        Must be entered from the subscriber's running event loop. Entering and
+        leaving are synchronous so an abandoned stream can always clean up.
+        """
+        entry = (asyncio.get_running_loop(), asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE))
+        with self._lock:
+            self._subscribers[channel].add(entry)
+        try:
+            yield entry[1]
+        finally:
+            with self._lock:
+                self._subscribers[channel].discard(entry)
+                if not self._subscribers[channel]:
+                    del self._subscribers[channel]
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Return the process-wide broker configured by SIGNUPS_EVENT_BROKER"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.SIGNUPS_EVENT_BROKER)()
+    return _broker
+
+
+def publish_form_event(form_id, event, data):
+    get_broker().publish(form_channel(form_id), {'event': event, 'data': data})
@@ -1,5 +1,5 @@
 from django import forms
-from .models import VolunteerSignup
+from .models import VolunteerSignup, VolunteerSlot, WaitlistEntry
 
 class VolunteerSignupForm(forms.ModelForm):
     class Meta:
@@ -9,3 +9,28 @@ class VolunteerSignupForm(forms.ModelForm):
             'name': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Your full name', 'id': 'name-field'}),
             'email': forms.EmailInput(attrs={'class': 'form-control', 'placeholder': 'your.email@example.com', 'id': 'email-field'}),
         }
+
+class BatchSignupForm(VolunteerSignupForm):
+    """Sign up for several slots of one volunteer form at once"""
+    slots = forms.ModelMultipleChoiceField(queryset=VolunteerSlot.objects.none(), widget=forms.MultipleHiddenInput)
+    partial = forms.BooleanField(required=False, label="If some of these slots fill up first, sign me up for the rest")
+
+    def __init__(self, *args, volunteer_form, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['slots'].queryset = (
+            volunteer_form.slots.select_related('volunteer_type').order_by('date', 'title', 'id')
+        )
+
+class WaitlistEntryForm(forms.ModelForm):
+    class Meta:
+        model = WaitlistEntry
+        fields = ['name', 'email']
+        widgets = VolunteerSignupForm.Meta.widgets
+
+class SlotImportForm(forms.Form):
+    file = forms.FileField(help_text="CSV, JSON array or JSON Lines file with title, date, volunteer_type, description and max_volunteers columns")
+    skip_invalid = forms.BooleanField(required=False, help_text="Import the valid rows even when some rows are invalid")
+    dry_run = forms.BooleanField(required=False, help_text="Only validate the file")
+
+class SignupLookupForm(forms.Form):
+    email = forms.EmailField(widget=forms.EmailInput(attrs={'class': 'form-control', 'placeholder': 'your.email@example.com', 'id': 'email-field'}))
@@ -0,0 +1,97 @@
+"""Synthetic data for load testing and benchmarks.
+
+Slots and signups are inserted with batched ``bulk_create`` and each slot's
+``current_signups`` is set up front to the number of signups generated for it,
+so no per-row ``save()``, signal or counter update runs. Signups are built and
+flushed one batch at a time, so memory stays flat however many are requested.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+
+from .models import VolunteerForm, VolunteerSignup, VolunteerSlot, VolunteerType
+from .signals import form_contents_changed
+
+BATCH_SIZE = 5000
+
+FIRST_NAMES = ['Alex', 'Jordan', 'Sam', 'Taylor', 'Morgan', 'Casey', 'Riley', 'Jamie', 'Avery', 'Quinn']
+LAST_NAMES = ['Smith', 'Garcia', 'Nguyen', 'Johnson', 'Brown', 'Lee', 'Martinez', 'Davis', 'Clark', 'Lopez']
+
+
+def get_or_create_types(count):
+    """Return count generated volunteer types worth 0.5 to 2.0 credit hours"""
+    return [
+        VolunteerType.objects.get_or_create(
+            name=f'Generated Type {i + 1}',
+            defaults={
+                'description': 'Generated for load testing',
+                'credit_hours': Decimal('0.5') * (i % 4 + 1),
+            },
+        )[0]
+        for i in range(count)
+    ]
+
+
+def generate_form(form, slot_count, signups_per_slot, volunteer_types, rng, batch_size=BATCH_SIZE, start_date=None):
+    """Add slot_count slots to form and fill them with generated signups.
+
+    signups_per_slot is an inclusive (low, high) range; every slot holds
+    ``high`` volunteers so the generated count always fits. Returns the
+    number of signups created.
+    """
+    low, high = signups_per_slot
+    start_date = start_date or date.today()
+    created = 0
+    with transaction.atomic():
+        for offset in range(0, slot_count, batch_size):
+            slots = []
+            for i in range(offset, min(offset + batch_size, slot_count)):
+                slots.append(VolunteerSlot(
+                    form=form,
+                    volunteer_type=volunteer_types[i % len(volunteer_types)] if volunteer_types else None,
+                    title=f'Slot {i + 1}',
+                    date=start_date + timedelta(days=i // 3),
+                    max_volunteers=max(high, 1),
+                    current_signups=rng.randint(low, high),
+                ))
+            slots = VolunteerSlot.objects.bulk_create(slots)
+
+            signups = []
+            for slot in slots:
+                for _ in range(slot.current_signups):
+                    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                    email = f'{first}.{last}{rng.randrange(10000)}@example.com'.lower()
+                    signups.append(VolunteerSignup(
+                        slot=slot,
+                        name=f'{first} {last}',
+                        email=email,
+                        email_normalized=email,
+                    ))
+                    if len(signups) >= batch_size:
+                        VolunteerSignup.objects.bulk_create(signups)
+                        created += len(signups)
+                        signups = []
+            VolunteerSignup.objects.bulk_create(signups)
+            created += len(signups)
+    form_contents_changed(form.pk)
+    return created
+
+
+def generate_forms(user, forms, slots_per_form, signups_per_slot, volunteer_types, rng,
+                   batch_size=BATCH_SIZE, log=None):
+    """Create forms each holding slots_per_form generated slots; returns (forms, signups)"""
+    total_signups = 0
+    generated = []
+    for n in range(forms):
+        form = VolunteerForm.objects.create(
+            title=f'Generated Form {n + 1}',
+            description='Generated for load testing',
+            created_by=user,
+        )
+        signups = generate_form(form, slots_per_form, signups_per_slot, volunteer_types, rng, batch_size)
+        total_signups += signups
+        generated.append(form)
+        if log:
+            log(f'Created {form.title} with {slots_per_form} slots and {signups} signups')
+    return generated, total_signups
@@ -0,0 +1,199 @@
+"""Streaming bulk import of volunteer slots from CSV or JSON.
+
+Rows are read one at a time from the file, validated against a single
+name -> VolunteerType lookup built up front, and inserted with batched
+``bulk_create`` inside one transaction. Only the current batch and the
+error report are held in memory, so large schedules import in bounded
+memory. Accepted columns are ``title``, ``date`` (YYYY-MM-DD),
+``volunteer_type`` (name, optional), ``description`` and ``max_volunteers``.
+
+JSON input may be an array of objects or JSON Lines (one object per line);
+both are decoded incrementally.
+"""
+import csv
+import json
+from datetime import date
+
+from django.db import transaction
+
+from .models import VolunteerSlot, VolunteerType
+from .signals import form_contents_changed
+
+BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+READ_SIZE = 64 * 1024
+MAX_OBJECT_SIZE = 1024 * 1024  # A single JSON row larger than this is malformed
+WHITESPACE = ' \t\r\n'
+
+TITLE_MAX_LENGTH = VolunteerSlot._meta.get_field('title').max_length
+
+
+class SlotImportError(Exception):
+    """Raised to roll back an import when any row is invalid"""
+
+
+class ImportResult:
+    """Outcome of an import: rows created and per-row validation errors"""
+
+    def __init__(self):
+        self.created = 0
+        self.valid = 0
+        self.rows = 0
+        self.error_count = 0
+        self.errors = []  # (row number, message), capped at MAX_REPORTED_ERRORS
+        self.committed = False
+
+    def add_error(self, row_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((row_number, message))
+
+
+def detect_format(filename):
+    """Guess the import format from a file name, defaulting to CSV"""
+    name = (filename or '').lower()
+    if name.endswith(('.json', '.jsonl', '.ndjson')):
+        return 'json'
+    return 'csv'
+
+
+def iter_csv_rows(stream):
+    for row in csv.DictReader(stream):
+        yield {(key or '').strip().lower(): value for key, value in row.items()}
+
+
+def iter_json_rows(stream):
+    """Yield objects from a JSON array or JSON Lines stream without loading it whole"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+    started = False  # Seen the first character, which tells an array from JSON Lines
+    array = False
+    separated = True  # At the start of the array or just past a ','
+    while True:
+        buffer = buffer.lstrip(WHITESPACE)
+        if buffer and not started:
+            started = True
+            array = buffer.startswith('[')
+            if array:
+                buffer = buffer[1:]
+                continue
+        if array and buffer.startswith(']'):
+            if buffer[1:].strip(WHITESPACE):
+                raise json.JSONDecodeError('Extra data', buffer, 1)
+            return
+        if array and not separated and buffer.startswith(','):
+            buffer = buffer[1:]
+            separated = True
+            continue
+        if not buffer:
+            if eof:
+                if array:
+                    raise json.JSONDecodeError('Unterminated array', buffer, 0)
+                return
+            chunk = stream.read(READ_SIZE)
+            eof = not chunk
+            buffer += chunk
+            continue
+        if array and not separated:
+            raise json.JSONDecodeError("Expecting ',' delimiter", buffer, 0)
+        try:
+            obj, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof or len(buffer) > MAX_OBJECT_SIZE:
+                raise
+            chunk = stream.read(READ_SIZE)
+            eof = not chunk
+            buffer += chunk
+            continue
+        buffer = buffer[end:]
+        separated = False
+        yield {str(key).strip().lower(): value for key, value in obj.items()} if isinstance(obj, dict) else obj
+
+
+def _clean_row(row, type_ids):
+    """Return (slot fields, None) for a valid row or (None, message)"""
+    if not isinstance(row, dict):
+        return None, 'Expected an object with slot fields'
+    title = str(row.get('title') or '').strip()
+    if not title:
+        return None, 'Title is required'
+    if len(title) > TITLE_MAX_LENGTH:
+        return None, f'Title must be at most {TITLE_MAX_LENGTH} characters'
+
+    try:
+        slot_date = date.fromisoformat(str(row.get('date') or '').strip())
+    except ValueError:
+        return None, f"Invalid date {row.get('date')!r}; use YYYY-MM-DD"
+
+    max_volunteers = row.get('max_volunteers')
+    if max_volunteers in (None, ''):
+        max_volunteers = 1
+    try:
+        max_volunteers = int(max_volunteers)
+    except (TypeError, ValueError):
+        return None, f'Invalid max_volunteers {max_volunteers!r}'
+    if max_volunteers < 1:
+        return None, 'max_volunteers must be at least 1'
+
+    type_name = str(row.get('volunteer_type') or '').strip()
+    type_id = None
+    if type_name:
+        type_id = type_ids.get(type_name.lower())
+        if type_id is None:
+            return None, f'Unknown volunteer type {type_name!r}'
+
+    return {
+        'title': title,
+        'date': slot_date,
+        'max_volunteers': max_volunteers,
+        'volunteer_type_id': type_id,
+        'description': str(row.get('description') or '').strip(),
+    }, None
+
+
+def import_slots(form, stream, fmt='csv', skip_invalid=False, dry_run=False, batch_size=BATCH_SIZE):
+    """Import slots for form from a text stream.
+
+    By default the import is all-or-nothing: any invalid row rolls back every
+    inserted slot. With skip_invalid, valid rows are kept and invalid rows are
+    only reported. dry_run validates and rolls back regardless.
+    """
+    result = ImportResult()
+    type_ids = {
+        name.lower(): pk
+        for pk, name in VolunteerType.objects.filter(is_active=True).values_list('pk', 'name')
+    }
+    rows = iter_json_rows(stream) if fmt == 'json' else iter_csv_rows(stream)
+
+    try:
+        with transaction.atomic():
+            batch = []
+            try:
+                for row in rows:
+                    result.rows += 1
+                    fields, error = _clean_row(row, type_ids)
+                    if error:
+                        result.add_error(result.rows, error)
+                        continue
+                    result.valid += 1
+                    batch.append(VolunteerSlot(form=form, **fields))
+                    if len(batch) >= batch_size:
+                        VolunteerSlot.objects.bulk_create(batch)
+                        result.created += len(batch)
+                        batch = []
+            except (csv.Error, json.JSONDecodeError, UnicodeDecodeError) as exc:
+                result.add_error(result.rows + 1, f'Could not parse file: {exc}')
+                raise SlotImportError
+            VolunteerSlot.objects.bulk_create(batch)
+            result.created += len(batch)
+            if dry_run or (result.error_count and not skip_invalid):
+                raise SlotImportError
+    except SlotImportError:
+        result.created = 0
+        return result
+
+    result.committed = True
+    if result.created:
+        form_contents_changed(form.pk)
+    return result
@@ -0,0 +1,238 @@
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from signups.generator import generate_form, get_or_create_types
+from signups.models import VolunteerForm
+
+HOST = 'localhost'
+# A messages cookie makes the page cache step aside, so every request renders
+NO_PAGE_CACHE = 'messages=benchmark'
+
+
+def add_db_latency(latency):
+    """Sleep before every query on every connection to simulate a slow database"""
+    def wrapper(execute, sql, params, many, context):
+        time.sleep(latency)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        # Connection objects are reused across reconnects; wrap each only once
+        if wrapper not in connection.execute_wrappers:
+            connection.execute_wrappers.append(wrapper)
+
+    connection_created.connect(install, weak=False)
+
+
+def wsgi_get(app, path):
+    environ = {
+        'PATH_INFO': path,
+        'HTTP_HOST': HOST,
+        'HTTP_COOKIE': NO_PAGE_CACHE,
+        'wsgi.url_scheme': 'https',
+        'wsgi.input': BytesIO(),
+    }
+    setup_testing_defaults(environ)
+    status = []
+    body = b''.join(app(environ, lambda s, headers, exc_info=None: status.append(s)))
+    return int(status[0].split()[0]), len(body)
+
+
+async def asgi_get(app, path):
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'https',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'headers': [(b'host', HOST.encode()), (b'cookie', NO_PAGE_CACHE.encode())],
+        'client': ('127.0.0.1', 50000),
+        'server': (HOST, 443),
+    }
+    finished = asyncio.Event()
+    sent_request = False
+
+    async def receive():
+        nonlocal sent_request
+        if not sent_request:
+            sent_request = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # Django listens for a disconnect while it responds; only send one at the end
+        await finished.wait()
+        return {'type': 'http.disconnect'}
+
+    status = None
+    size = 0
+
+    async def send(message):
+        nonlocal status, size
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        elif message['type'] == 'http.response.body':
+            size += len(message.get('body', b''))
+            if not message.get('more_body'):
+                finished.set()
+
+    await app(scope, receive, send)
+    finished.set()
+    return status, size
+
+
+async def run_load(request, paths, total, concurrency):
+    """Issue total requests from concurrency clients; return latencies and elapsed"""
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def client(n):
+        nonlocal errors
+        rng = random.Random(n)
+        for _ in remaining:
+            started = time.perf_counter()
+            status, _ = await request(rng.choice(paths))
+            latencies.append((time.perf_counter() - started) * 1000)
+            if status != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(n) for n in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def summarise(mode, latencies, errors, elapsed):
+    percentiles = statistics.quantiles(latencies, n=100)
+    return {
+        'mode': mode,
+        'requests': len(latencies),
+        'errors': errors,
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentiles[49], 2),
+        'p95_ms': round(percentiles[94], 2),
+        'p99_ms': round(percentiles[98], 2),
+        'max_ms': round(max(latencies), 2),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare requests/sec and tail latency of the sync and async public views '
+        'at high concurrency, in a throwaway test database'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=['sync', 'async'], help='Run one mode only (default: run and compare both)')
+        parser.add_argument('--concurrency', type=int, default=200, help='Concurrent clients (default: %(default)s)')
+        parser.add_argument('--requests', type=int, default=2000, help='Total requests per mode (default: %(default)s)')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Sync mode only: request threads, like gunicorn sync workers (default: %(default)s)',
+        )
+        parser.add_argument(
+            '--db-latency-ms',
+            type=float,
+            default=20.0,
+            help='Delay added to every query to simulate a slow database (default: %(default)s)',
+        )
+        parser.add_argument('--slots', type=int, default=50, help='Slots in the benchmark form (default: %(default)s)')
+        parser.add_argument('--output', default='async_benchmark_results.json', help='JSON results file (default: %(default)s)')
+
+    def handle(self, *args, **options):
+        if options['mode']:
+            result = self.run_mode(options)
+            Path(options['output']).write_text(json.dumps(result, indent=2))
+            return
+
+        # URL routing picks sync or async views at startup, so each mode runs
+        # in its own process with SIGNUPS_ASYNC_VIEWS set accordingly
+        results = []
+        for mode in ('sync', 'async'):
+            with tempfile.NamedTemporaryFile(suffix='.json') as output:
+                command = [
+                    sys.executable, sys.argv[0], 'benchmark_async_views', '--mode', mode,
+                    '--concurrency', str(options['concurrency']),
+                    '--requests', str(options['requests']),
+                    '--workers', str(options['workers']),
+                    '--db-latency-ms', str(options['db_latency_ms']),
+                    '--slots', str(options['slots']),
+                    '--output', output.name,
+                ]
+                env = {**os.environ, 'SIGNUPS_ASYNC_VIEWS': str(mode == 'async')}
+                self.stdout.write(f'Running {mode} mode...')
+                if subprocess.run(command, env=env).returncode:
+                    raise CommandError(f'{mode} benchmark failed')
+                results.append(json.loads(Path(output.name).read_text()))
+
+        for result in results:
+            self.stdout.write(
+                f"{result['mode']:>5}: {result['requests_per_second']} req/s, "
+                f"p50 {result['p50_ms']} ms, p95 {result['p95_ms']} ms, p99 {result['p99_ms']} ms, "
+                f"{result['errors']} error(s)"
+            )
+        Path(options['output']).write_text(json.dumps({
+            'settings': {key: options[key] for key in ('concurrency', 'requests', 'workers', 'db_latency_ms', 'slots')},
+            'results': results,
+        }, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Wrote results to {options['output']}"))
+
+    def run_mode(self, options):
+        mode = options['mode']
+        if settings.SIGNUPS_ASYNC_VIEWS != (mode == 'async'):
+            raise CommandError(f'Set SIGNUPS_ASYNC_VIEWS={mode == "async"} to benchmark {mode} views')
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            user = User.objects.create_user(username='benchmark')
+            form = VolunteerForm.objects.create(title='Benchmark form', description='Benchmark', created_by=user)
+            generate_form(form, options['slots'], (0, 5), get_or_create_types(3), random.Random(0))
+            slot_ids = list(form.slots.values_list('pk', flat=True)[:20])
+            paths = [
+                reverse('signups:volunteer_form_view', args=[form.unique_url]),
+                reverse('signups:form_summary', args=[form.unique_url]),
+            ] + [reverse('signups:slot_detail', args=[form.unique_url, slot_id]) for slot_id in slot_ids]
+            # Close this thread's connection so every request opens one with the delay
+            connection.close()
+            add_db_latency(options['db_latency_ms'] / 1000)
+
+            if mode == 'async':
+                app = ASGIHandler()
+                request = lambda path: asgi_get(app, path)
+                latencies, errors, elapsed = asyncio.run(
+                    run_load(request, paths, options['requests'], options['concurrency'])
+                )
+            else:
+                app = WSGIHandler()
+                with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                    async def request(path):
+                        return await asyncio.get_running_loop().run_in_executor(pool, wsgi_get, app, path)
+                    latencies, errors, elapsed = asyncio.run(
+                        run_load(request, paths, options['requests'], options['concurrency'])
+                    )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        return summarise(mode, latencies, errors, elapsed)
@@ -0,0 +1,163 @@
+import importlib.util
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from signups.generator import generate_form, get_or_create_types
+from signups.management.commands.benchmark_async_views import wsgi_get
+from signups.models import VolunteerForm
+
+# Environment for each mode; settings.py turns these into DATABASES options
+MODES = {
+    'per-request': {'DB_CONN_MAX_AGE': '0', 'DB_POOL': 'False'},
+    'persistent': {'DB_CONN_MAX_AGE': '600', 'DB_POOL': 'False'},
+    'pool': {'DB_CONN_MAX_AGE': '0', 'DB_POOL': 'True'},
+}
+
+
+def pool_available():
+    return (
+        connection.vendor == 'postgresql'
+        and importlib.util.find_spec('psycopg') is not None
+        and importlib.util.find_spec('psycopg_pool') is not None
+    )
+
+
+def count_connections(latency):
+    """Count connections opened, sleeping in each to simulate connection setup"""
+    opened = []
+
+    def connected(sender, connection, **kwargs):
+        opened.append(1)
+        if latency:
+            time.sleep(latency)
+
+    connection_created.connect(connected, weak=False)
+    return opened
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare per-request latency of small pages with a new database connection per '
+        'request, persistent connections and (on PostgreSQL with psycopg[pool]) pooling'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=MODES, help='Run one mode only (default: run and compare all)')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per mode (default: %(default)s)')
+        parser.add_argument(
+            '--connect-latency-ms',
+            type=float,
+            help=(
+                'Delay added to every new connection to stand in for network and authentication '
+                'cost (default: 5 on SQLite, 0 on PostgreSQL, which pays the real cost)'
+            ),
+        )
+        parser.add_argument('--slots', type=int, default=10, help='Slots in the benchmark form (default: %(default)s)')
+        parser.add_argument('--output', default='db_connection_benchmark_results.json', help='JSON results file (default: %(default)s)')
+
+    def handle(self, *args, **options):
+        if options['connect_latency_ms'] is None:
+            options['connect_latency_ms'] = 5.0 if connection.vendor == 'sqlite' else 0.0
+        if options['mode']:
+            result = self.run_mode(options)
+            Path(options['output']).write_text(json.dumps(result, indent=2))
+            return
+
+        # Connection settings are read at startup, so each mode runs in its own process
+        modes = list(MODES)
+        if not pool_available():
+            modes.remove('pool')
+            self.stdout.write(self.style.WARNING('Skipping pool mode: it needs PostgreSQL and psycopg[pool]'))
+        results = []
+        for mode in modes:
+            with tempfile.NamedTemporaryFile(suffix='.json') as output:
+                command = [
+                    sys.executable, sys.argv[0], 'benchmark_db_connections', '--mode', mode,
+                    '--requests', str(options['requests']),
+                    '--connect-latency-ms', str(options['connect_latency_ms']),
+                    '--slots', str(options['slots']),
+                    '--output', output.name,
+                ]
+                self.stdout.write(f'Running {mode} mode...')
+                if subprocess.run(command, env={**os.environ, **MODES[mode]}).returncode:
+                    raise CommandError(f'{mode} benchmark failed')
+                results.append(json.loads(Path(output.name).read_text()))
+
+        baseline = results[0]['mean_ms']
+        for result in results:
+            self.stdout.write(
+                f"{result['mode']:>11}: mean {result['mean_ms']} ms ({baseline / result['mean_ms']:.1f}x), "
+                f"p50 {result['p50_ms']} ms, p95 {result['p95_ms']} ms, "
+                f"{result['connections_opened']} connection(s) opened"
+            )
+        Path(options['output']).write_text(json.dumps({
+            'settings': {key: options[key] for key in ('requests', 'connect_latency_ms', 'slots')},
+            'database': connection.vendor,
+            'results': results,
+        }, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Wrote results to {options['output']}"))
+
+    def run_mode(self, options):
+        mode = options['mode']
+        pooled = bool(connection.settings_dict['OPTIONS'].get('pool'))
+        if pooled != (mode == 'pool'):
+            raise CommandError(f'DB_POOL must be {mode == "pool"} to benchmark {mode} mode')
+        if pooled and options['connect_latency_ms']:
+            # Every checkout from the pool sends connection_created too
+            raise CommandError('Pool mode measures real connection cost; use --connect-latency-ms 0')
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            user = User.objects.create_user(username='benchmark')
+            form = VolunteerForm.objects.create(title='Benchmark form', description='Benchmark', created_by=user)
+            generate_form(form, options['slots'], (0, 3), get_or_create_types(3), random.Random(0))
+            slot_ids = list(form.slots.values_list('pk', flat=True))
+            paths = [
+                reverse('signups:volunteer_form_view', args=[form.unique_url]),
+                reverse('signups:form_availability', args=[form.unique_url]),
+            ] + [reverse('signups:slot_detail', args=[form.unique_url, slot_id]) for slot_id in slot_ids]
+            connection.close()
+            opened = count_connections(options['connect_latency_ms'] / 1000)
+
+            # Requests run one after another through the real handler, whose
+            # request_started/finished signals close or keep the connection
+            app = WSGIHandler()
+            rng = random.Random(0)
+            latencies = []
+            errors = 0
+            for _ in range(options['requests']):
+                started = time.perf_counter()
+                status, _ = wsgi_get(app, rng.choice(paths))
+                latencies.append((time.perf_counter() - started) * 1000)
+                errors += status != 200
+        finally:
+            connection.close()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        percentiles = statistics.quantiles(latencies, n=100)
+        return {
+            'mode': mode,
+            'requests': len(latencies),
+            'errors': errors,
+            'connections_opened': len(opened),
+            'mean_ms': round(statistics.mean(latencies), 2),
+            'p50_ms': round(percentiles[49], 2),
+            'p95_ms': round(percentiles[94], 2),
+            'p99_ms': round(percentiles[98], 2),
+        }
@@ -0,0 +1,102 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from signups.benchmarks import (
+    DEFAULT_SIGNUPS_PER_SLOT,
+    DEFAULT_SIZES,
+    DEFAULT_TOLERANCE,
+    check_results,
+    run_benchmarks,
+)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark query count, latency and response size of the signups views in a throwaway test database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default=','.join(str(size) for size in DEFAULT_SIZES),
+            help='Comma separated slot counts to seed, one form per size (default: %(default)s)',
+        )
+        parser.add_argument(
+            '--max-signups',
+            type=int,
+            default=DEFAULT_SIGNUPS_PER_SLOT[1],
+            help='Each slot gets between 0 and this many signups (default: %(default)s)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Requests per view; the median is compared (default: %(default)s)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed for signup counts',
+        )
+        parser.add_argument(
+            '--output',
+            default='benchmark_results.json',
+            help='Where to write the JSON results (default: %(default)s)',
+        )
+        parser.add_argument(
+            '--baseline',
+            help='JSON results from an earlier run to check for timing regressions',
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=DEFAULT_TOLERANCE,
+            help='Fail when a median is this many times slower than the baseline (default: %(default)s)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        except ValueError:
+            raise CommandError('--sizes must be a comma separated list of integers')
+
+        baseline = None
+        if options['baseline']:
+            baseline_path = Path(options['baseline'])
+            if not baseline_path.exists():
+                raise CommandError(f'Baseline file {baseline_path} not found')
+            baseline = json.loads(baseline_path.read_text())['results']
+
+        # Never seed benchmark data into a real database
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            results = run_benchmarks(
+                sizes=sizes,
+                signups_per_slot=(0, options['max_signups']),
+                repeat=options['repeat'],
+                seed=options['seed'],
+                log=self.stdout.write,
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        failures = check_results(results, baseline, options['tolerance'])
+        Path(options['output']).write_text(json.dumps({
+            'generated_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'results': results,
+            'failures': failures,
+        }, indent=2))
+        self.stdout.write(f"Wrote {len(results)} results to {options['output']}")
+
+        if failures:
+            for failure in failures:
+                self.stdout.write(self.style.ERROR(failure))
+            raise CommandError(f'{len(failures)} benchmark check(s) failed')
+        self.stdout.write(self.style.SUCCESS('All views are within their query budgets'))
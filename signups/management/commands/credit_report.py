@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from signups.models import VolunteerSignup
+
+
+class Command(BaseCommand):
+    help = 'Report credit hours earned, aggregated by the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--by',
+            choices=['email', 'type', 'form', 'slot'],
+            default='email',
+            help='How to group the report (default: email)',
+        )
+        parser.add_argument(
+            '--form-id',
+            type=int,
+            help='Only include signups for a specific form ID',
+        )
+        parser.add_argument(
+            '--active-only',
+            action='store_true',
+            help='Only include signups for active forms',
+        )
+
+    def handle(self, *args, **options):
+        signups = VolunteerSignup.objects.all()
+        if options['form_id']:
+            signups = signups.filter(slot__form_id=options['form_id'])
+        if options['active_only']:
+            signups = signups.filter(slot__form__is_active=True)
+
+        grouping = options['by']
+        if grouping == 'email':
+            rows = signups.credit_hours_by_email()
+            label = lambda row: row['volunteer_email']
+        elif grouping == 'type':
+            rows = signups.credit_hours_by_type()
+            label = lambda row: row['slot__volunteer_type__name'] or 'No type set'
+        elif grouping == 'form':
+            rows = signups.credit_hours_by_form()
+            label = lambda row: f"{row['slot__form__title']} (ID: {row['slot__form']})"
+        else:
+            rows = signups.credit_hours_by_slot()
+            label = lambda row: f"{row['slot__title']} - {row['slot__date']} (ID: {row['slot']})"
+
+        count = 0
+        for row in rows.iterator():
+            count += 1
+            self.stdout.write(
+                f"{label(row)}: {row['credit_hours']:.2f} hours ({row['signups']} signup(s))"
+            )
+
+        if not count:
+            self.stdout.write(self.style.WARNING('No signups found'))
+            return
+
+        self.stdout.write('')
+        self.stdout.write(
+            self.style.SUCCESS(f'Total: {signups.total_credit_hours():.2f} hours across {count} {grouping} group(s)')
+        )
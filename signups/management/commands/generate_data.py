@@ -0,0 +1,68 @@
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from signups.generator import BATCH_SIZE, generate_forms, get_or_create_types
+
+
+def signup_range(value):
+    """Parse "N" or "LOW-HIGH" into an inclusive (low, high) range"""
+    low, _, high = value.partition('-')
+    try:
+        low, high = int(low), int(high or low)
+    except ValueError:
+        raise ValueError(f'Expected N or LOW-HIGH, got {value!r}')
+    if low < 0 or high < low:
+        raise ValueError(f'Invalid signup range {value!r}')
+    return low, high
+
+
+class Command(BaseCommand):
+    help = 'Generate synthetic forms, slots and signups in bulk for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--forms', type=int, default=1, help='Number of forms to create (default: %(default)s)')
+        parser.add_argument('--slots-per-form', type=int, default=100, help='Slots per form (default: %(default)s)')
+        parser.add_argument(
+            '--signups-per-slot',
+            default='0-5',
+            help='Signups per slot, either N or a LOW-HIGH range (default: %(default)s)',
+        )
+        parser.add_argument('--types', type=int, default=4, help='Volunteer types to spread slots across (default: %(default)s)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for repeatable data (default: %(default)s)')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Rows per bulk insert (default: %(default)s)')
+
+    def handle(self, *args, **options):
+        try:
+            signups_per_slot = signup_range(options['signups_per_slot'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        if options['forms'] < 1 or options['slots_per_form'] < 1:
+            raise CommandError('--forms and --slots-per-form must be at least 1')
+
+        # Get an existing superuser or prompt to create one
+        user = User.objects.filter(is_superuser=True).first()
+        if user is None:
+            self.stdout.write(self.style.WARNING('No superuser found. Please create one first using:'))
+            self.stdout.write('python manage.py createsuperuser')
+            self.stdout.write('Then run this command again.')
+            return
+
+        started = time.perf_counter()
+        volunteer_types = get_or_create_types(options['types'])
+        forms, signups = generate_forms(
+            user,
+            options['forms'],
+            options['slots_per_form'],
+            signups_per_slot,
+            volunteer_types,
+            random.Random(options['seed']),
+            batch_size=options['batch_size'],
+            log=self.stdout.write,
+        )
+        elapsed = time.perf_counter() - started
+        slots = len(forms) * options['slots_per_form']
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(forms)} form(s), {slots} slot(s) and {signups} signup(s) in {elapsed:.1f}s'
+        ))
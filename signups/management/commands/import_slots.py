@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand, CommandError
+from signups.importer import detect_format, import_slots
+from signups.models import VolunteerForm
+
+
+class Command(BaseCommand):
+    help = 'Import volunteer slots into a form from a CSV or JSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('form_id', type=int, help='ID of the form to add slots to')
+        parser.add_argument('path', help='CSV, JSON array or JSON Lines file with one slot per row')
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'json'],
+            help='File format (default: guessed from the file extension)',
+        )
+        parser.add_argument(
+            '--skip-invalid',
+            action='store_true',
+            help='Import the valid rows even when some rows are invalid',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Validate the file without creating any slots',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            form = VolunteerForm.objects.get(id=options['form_id'])
+        except VolunteerForm.DoesNotExist:
+            raise CommandError(f'Form with ID {options["form_id"]} not found')
+
+        fmt = options['format'] or detect_format(options['path'])
+        try:
+            stream = open(options['path'], encoding='utf-8-sig', newline='')
+        except OSError as exc:
+            raise CommandError(f'Could not open {options["path"]}: {exc}')
+        with stream:
+            result = import_slots(
+                form,
+                stream,
+                fmt=fmt,
+                skip_invalid=options['skip_invalid'],
+                dry_run=options['dry_run'],
+            )
+
+        for row_number, message in result.errors:
+            self.stdout.write(self.style.ERROR(f'Row {row_number}: {message}'))
+        if result.error_count > len(result.errors):
+            self.stdout.write(self.style.ERROR(f'... and {result.error_count - len(result.errors)} more error(s)'))
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(
+                f'Dry run: {result.valid} of {result.rows} row(s) are valid; no slots were created'
+            ))
+        elif result.committed:
+            self.stdout.write(self.style.SUCCESS(
+                f'Imported {result.created} slot(s) into {form.title} ({result.error_count} invalid row(s) skipped)'
+            ))
+        else:
+            raise CommandError(
+                f'{result.error_count} invalid row(s); no slots were imported. '
+                'Fix the file or use --skip-invalid.'
+            )
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from signups.models import FormStats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-form stats rows from the slot and signup tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--form-id',
+            type=int,
+            help='Only rebuild stats for a specific form ID',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            created = FormStats.objects.create_missing()
+            stats = FormStats.objects.all()
+            if options['form_id']:
+                stats = stats.filter(pk=options['form_id'])
+            rebuilt = stats.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {rebuilt} form(s) ({created} new)'))
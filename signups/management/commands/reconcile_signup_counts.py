@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from signups.cache import bump_all_form_versions, bump_form_version
+from signups.models import FormStats, VolunteerSlot
+
+
+class Command(BaseCommand):
+    help = 'Find slots whose current_signups has drifted from their real signup count and fix them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report drifted slots; exit with an error if any are found',
+        )
+        parser.add_argument(
+            '--form-id',
+            type=int,
+            help='Only reconcile slots for a specific form ID',
+        )
+
+    def handle(self, *args, **options):
+        slots = VolunteerSlot.objects.all()
+        stats = FormStats.objects.all()
+        if options['form_id']:
+            slots = slots.filter(form_id=options['form_id'])
+            stats = stats.filter(pk=options['form_id'])
+
+        if not options['check']:
+            with transaction.atomic():
+                fixed = slots.reconcile_signup_counts()
+                if fixed:
+                    # Filled slot totals are derived from the corrected counters
+                    stats.rebuild()
+            if fixed and options['form_id']:
+                bump_form_version(options['form_id'])
+            elif fixed:
+                bump_all_form_versions()
+            self.stdout.write(self.style.SUCCESS(f'Reconciled {fixed} drifted slot(s)'))
+            return
+
+        drifted = 0
+        rows = slots.drifted().order_by('form_id', 'date', 'pk').values_list(
+            'pk', 'form_id', 'title', 'date', 'current_signups', 'actual_signups',
+        )
+        for pk, form_id, title, slot_date, stored, actual in rows.iterator():
+            drifted += 1
+            self.stdout.write(
+                f'{title} - {slot_date} (ID: {pk}, form {form_id}): '
+                f'current_signups is {stored}, {actual} signup(s) exist'
+            )
+        if drifted:
+            raise CommandError(f'{drifted} slot(s) have drifted; run without --check to fix them')
+        self.stdout.write(self.style.SUCCESS('No drifted slots found'))
@@ -0,0 +1,69 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from signups.slow_queries import read_log, summarise
+
+
+class Command(BaseCommand):
+    help = 'List the slowest query shapes collected in the slow-query log'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--log',
+            default=settings.SIGNUPS_SLOW_QUERY_LOG,
+            help='Slow-query log to read (default: SIGNUPS_SLOW_QUERY_LOG)',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=10,
+            help='Number of query shapes to show (default: %(default)s)',
+        )
+        parser.add_argument(
+            '--sort',
+            choices=['total', 'count', 'max', 'mean'],
+            default='total',
+            help='Rank query shapes by total, count, max or mean time (default: total)',
+        )
+        parser.add_argument(
+            '--plans',
+            action='store_true',
+            help='Show the most recent EXPLAIN plan for each query shape',
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Empty the log after listing it',
+        )
+
+    def handle(self, *args, **options):
+        records = read_log(options['log'])
+        if not records:
+            self.stdout.write(self.style.WARNING(f"No slow queries logged in {options['log']}"))
+            return
+
+        key = 'count' if options['sort'] == 'count' else f"{options['sort']}_ms"
+        groups = sorted(summarise(records), key=lambda group: group[key], reverse=True)
+        for rank, group in enumerate(groups[:options['limit']], 1):
+            self.stdout.write(
+                f"{rank}. [{group['fingerprint']}] {group['count']} call(s), "
+                f"total {group['total_ms']:.1f} ms, mean {group['mean_ms']:.1f} ms, max {group['max_ms']:.1f} ms"
+            )
+            self.stdout.write(f"   {group['sql']}")
+            callers = ', '.join(f'{caller} ({count})' for caller, count in group['callers'].most_common(3))
+            self.stdout.write(f'   Called from: {callers}')
+            if group['locations']:
+                locations = ', '.join(f'{location} ({count})' for location, count in group['locations'].most_common(3))
+                self.stdout.write(f'   At: {locations}')
+            if options['plans'] and group['plan']:
+                for line in group['plan'].splitlines():
+                    self.stdout.write(f'   | {line}')
+            self.stdout.write('')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(records)} slow queries in {len(groups)} shape(s); showing the top {min(len(groups), options["limit"])}'
+        ))
+        if options['clear']:
+            Path(options['log']).write_text('')
+            self.stdout.write(f"Cleared {options['log']}")
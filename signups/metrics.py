@@ -0,0 +1,277 @@
+"""In-process metrics with Prometheus text exposition.
+
+Counters and latency histograms are kept in memory by each process. With
+``SIGNUPS_METRICS_DIR`` set, every process also writes its values to its own
+file in that directory, at most once per ``FLUSH_INTERVAL`` and when it
+exits. ``collect()`` then sums the files of every worker, so whichever
+gunicorn worker answers a scrape reports the whole server. When a worker
+exits its file is folded into one file of exited workers, so counters never
+go backwards, and the directory is cleared when the server starts (see
+gunicorn.conf.py). Without a directory each process reports only itself.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+import uuid
+from functools import wraps
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.exceptions import BadRequest, PermissionDenied, SuspiciousOperation
+from django.http import Http404
+
+# Upper bounds in seconds; tuned for page and query latencies
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FLUSH_INTERVAL = 1.0  # Seconds between writes of this process's metrics file
+EXITED_FILE = 'metrics-exited.json'  # Values of workers that have exited
+
+
+class Metric:
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} takes labels {self.labelnames}, got {tuple(labels)}')
+        return json.dumps([[name, str(labels[name])] for name in self.labelnames])
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        self.registry._update(self.name, self._key(labels), lambda value: (value or 0) + amount)
+
+
+class Histogram(Metric):
+    """Observations counted into buckets, plus their sum and count"""
+    type = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        def add(sample):
+            # Per-bucket counts, then sum and count; made cumulative when rendered
+            sample = list(sample or [0] * (len(self.buckets) + 3))
+            index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+            sample[index] += 1
+            sample[-2] += value
+            sample[-1] += 1
+            return sample
+        self.registry._update(self.name, self._key(labels), add)
+
+
+class Registry:
+    def __init__(self, directory=None):
+        self.directory = Path(directory) if directory else None
+        self.metrics = {}
+        self._values = {}
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+        self._pid = None
+        self._path = None
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def _update(self, name, key, update):
+        with self._lock:
+            samples = self._values.setdefault(name, {})
+            samples[key] = update(samples.get(key))
+        if self.directory and time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+            self.flush()
+
+    def snapshot(self):
+        """This process's values, as {metric name: {label key: value}}"""
+        with self._lock:
+            return {name: dict(samples) for name, samples in self._values.items()}
+
+    def flush(self):
+        """Write this process's values to its file in the shared directory"""
+        if not self.directory:
+            return
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._values:
+                return  # Nothing to add, e.g. the gunicorn master
+            data = json.dumps({name: dict(samples) for name, samples in self._values.items()})
+            if self._path is None or self._pid != os.getpid():
+                # A forked worker starts a file of its own
+                self._pid = os.getpid()
+                self._path = self.directory / f'metrics-{self._pid}-{uuid.uuid4().hex[:8]}.json'
+            self.directory.mkdir(parents=True, exist_ok=True)
+            _write(self._path, data)
+
+    def collect(self):
+        """Values summed across every process sharing the directory"""
+        if not self.directory:
+            return self.snapshot()
+        self.flush()
+        return _sum_files(self.directory.glob('metrics-*.json'))
+
+    def value(self, name, **labels):
+        """This process's current value for one metric and label set"""
+        metric = self.metrics[name]
+        return self.snapshot().get(name, {}).get(metric._key(labels))
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format"""
+        values = self.collect()
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.type}')
+            for key, value in sorted(values.get(name, {}).items()):
+                labels = json.loads(key)
+                if metric.type == 'counter':
+                    lines.append(f'{name}{_labels(labels)} {_number(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets + ('+Inf',), value):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_labels(labels + [["le", str(bound)]])} {cumulative}')
+                lines.append(f'{name}_sum{_labels(labels)} {_number(value[-2])}')
+                lines.append(f'{name}_count{_labels(labels)} {value[-1]}')
+        return '\n'.join(lines) + '\n'
+
+
+def _write(path, data):
+    temporary = path.with_suffix('.tmp')
+    temporary.write_text(data)
+    os.replace(temporary, path)  # Readers never see a partial file
+
+
+def _sum_files(paths):
+    totals = {}
+    for path in paths:
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue  # Removed or replaced while we listed the directory
+        for name, samples in data.items():
+            merged = totals.setdefault(name, {})
+            for key, value in samples.items():
+                if isinstance(value, list):
+                    current = merged.get(key) or [0] * len(value)
+                    merged[key] = [a + b for a, b in zip(current, value)]
+                else:
+                    merged[key] = merged.get(key, 0) + value
+    return totals
+
+
+def clear_directory(directory):
+    """Remove every process's metrics file, for a server that is starting"""
+    for path in Path(directory).glob('metrics-*'):
+        path.unlink(missing_ok=True)
+
+
+def retire_worker(directory, pid):
+    """Fold an exited worker's files into the file of exited workers
+
+    Only the gunicorn master calls this, so the exited file has one writer.
+    """
+    directory = Path(directory)
+    paths = list(directory.glob(f'metrics-{pid}-*.json'))
+    if not paths:
+        return
+    exited = directory / EXITED_FILE
+    _write(exited, json.dumps(_sum_files([exited, *paths])))
+    for path in paths:
+        path.unlink(missing_ok=True)
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    escaped = (
+        (name, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = Registry(settings.SIGNUPS_METRICS_DIR)
+atexit.register(registry.flush)
+
+REQUESTS = registry.counter(
+    'signups_requests_total', 'Requests answered by the public signup views', ['view', 'method', 'status'],
+)
+REQUEST_LATENCY = registry.histogram(
+    'signups_request_duration_seconds', 'Time taken to answer public signup view requests', ['view'],
+)
+SIGNUP_ATTEMPTS = registry.counter(
+    'signups_slot_signup_attempts_total', 'Signup and waitlist form submissions on slot pages, by outcome', ['outcome'],
+)
+SIGNUPS_CREATED = registry.counter('signups_created_total', 'Volunteer signups created')
+SIGNUPS_DELETED = registry.counter(
+    'signups_deleted_total', 'Volunteer signups deleted, not counting those removed with their slot or form',
+)
+SLOTS_FILLED = registry.counter('signups_slots_filled_total', 'Signups that took the last spot in their slot')
+SIGNUP_SAVE_LATENCY = registry.histogram(
+    'signups_signup_save_duration_seconds', 'Time taken to claim a seat and save a new signup',
+)
+
+
+def _status_for(error):
+    """The status Django answers an exception raised by a view with"""
+    if isinstance(error, Http404):
+        return 404
+    if isinstance(error, PermissionDenied):
+        return 403
+    if isinstance(error, (BadRequest, SuspiciousOperation)):
+        return 400
+    return 500
+
+
+def _record_request(name, request, status, started):
+    REQUESTS.inc(view=name, method=request.method, status=status)
+    REQUEST_LATENCY.observe(time.perf_counter() - started, view=name)
+
+
+def instrument_view(name):
+    """Count a view's requests by status and time them under name"""
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    response = await view(request, *args, **kwargs)
+                except Exception as error:
+                    _record_request(name, request, _status_for(error), started)
+                    raise
+                _record_request(name, request, response.status_code, started)
+                return response
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                response = view(request, *args, **kwargs)
+            except Exception as error:
+                _record_request(name, request, _status_for(error), started)
+                raise
+            _record_request(name, request, response.status_code, started)
+            return response
+        return wrapper
+    return decorator
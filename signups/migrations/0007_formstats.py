@@ -0,0 +1,60 @@
+# Generated by Django 5.2.5 on 2026-10-17 19:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def build_form_stats(apps, schema_editor):
+    VolunteerForm = apps.get_model('signups', 'VolunteerForm')
+    VolunteerSlot = apps.get_model('signups', 'VolunteerSlot')
+    VolunteerSignup = apps.get_model('signups', 'VolunteerSignup')
+    FormStats = apps.get_model('signups', 'FormStats')
+
+    def count(queryset, group):
+        counts = queryset.order_by().values(group).annotate(total=Count('pk')).values('total')
+        return Coalesce(Subquery(counts), Value(0))
+
+    FormStats.objects.bulk_create(
+        [FormStats(form_id=pk) for pk in VolunteerForm.objects.values_list('pk', flat=True)]
+    )
+    slots = VolunteerSlot.objects.filter(form=OuterRef('pk'))
+    signups = VolunteerSignup.objects.filter(slot__form=OuterRef('pk'))
+    credit_hours = signups.order_by().values('slot__form').annotate(
+        total=Sum('slot__volunteer_type__credit_hours')
+    ).values('total')
+    FormStats.objects.update(
+        total_slots=count(slots, 'form'),
+        filled_slots=count(slots.filter(current_signups__gte=F('max_volunteers')), 'form'),
+        total_signups=count(signups, 'slot__form'),
+        credit_hours=Coalesce(
+            Subquery(credit_hours), Value(0),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('signups', '0006_volunteertype_credit_hours'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FormStats',
+            fields=[
+                ('form', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='signups.volunteerform')),
+                ('total_slots', models.PositiveIntegerField(default=0)),
+                ('filled_slots', models.PositiveIntegerField(default=0, help_text='Slots with no spots left')),
+                ('total_signups', models.PositiveIntegerField(default=0)),
+                ('credit_hours', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'form stats',
+            },
+        ),
+        migrations.RunPython(build_form_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-17 19:39
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('signups', '0007_formstats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='volunteerform',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['unique_url'], name='signups_form_active_url_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='volunteersignup',
+            index=models.Index(fields=['slot', 'signed_up_at'], name='signups_signup_slot_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='volunteersignup',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='signups_signup_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='volunteerslot',
+            index=models.Index(fields=['form', 'date', 'title', 'id'], name='signups_slot_form_order_idx'),
+        ),
+    ]
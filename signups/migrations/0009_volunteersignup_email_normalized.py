@@ -0,0 +1,42 @@
+from django.db import migrations, models
+
+from signups.models import normalize_email
+
+BATCH_SIZE = 1000
+
+
+def normalize_emails(apps, schema_editor):
+    # In Python, as save() does: SQL TRIM and LOWER only handle spaces and ASCII
+    VolunteerSignup = apps.get_model('signups', 'VolunteerSignup')
+    signups = VolunteerSignup.objects.only('email').order_by('pk')
+    last_pk = 0
+    while batch := list(signups.filter(pk__gt=last_pk)[:BATCH_SIZE]):
+        for signup in batch:
+            signup.email_normalized = normalize_email(signup.email)
+        VolunteerSignup.objects.bulk_update(batch, ['email_normalized'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('signups', '0008_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='volunteersignup',
+            name='email_normalized',
+            field=models.EmailField(default='', editable=False, help_text="Trimmed, lowercased email used to find a volunteer's signups", max_length=254),
+            preserve_default=False,
+        ),
+        migrations.RunPython(normalize_emails, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='volunteersignup',
+            name='signups_signup_email_idx',
+        ),
+        migrations.AddIndex(
+            model_name='volunteersignup',
+            index=models.Index(fields=['email_normalized'], name='signups_signup_email_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-17 19:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('signups', '0009_volunteersignup_email_normalized'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Name of the volunteer', max_length=100)),
+                ('email', models.EmailField(help_text='Email address of the volunteer', max_length=254)),
+                ('phone', models.CharField(blank=True, help_text='Phone number (optional)', max_length=20)),
+                ('notes', models.TextField(blank=True, help_text='Any additional notes from the volunteer')),
+                ('joined_at', models.DateTimeField(auto_now_add=True)),
+                ('slot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist', to='signups.volunteerslot')),
+            ],
+            options={
+                'verbose_name_plural': 'waitlist entries',
+                'ordering': ['joined_at', 'id'],
+                'indexes': [models.Index(fields=['slot', 'joined_at', 'id'], name='signups_waitlist_order_idx')],
+            },
+        ),
+    ]
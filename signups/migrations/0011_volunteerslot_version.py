@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 20:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('signups', '0010_waitlistentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='volunteerslot',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Incremented whenever the slot or its signups change'),
+        ),
+    ]
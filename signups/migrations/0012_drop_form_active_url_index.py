@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-17 20:29
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('signups', '0011_volunteerslot_version'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='volunteerform',
+            name='signups_form_active_url_idx',
+        ),
+    ]
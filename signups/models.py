@@ -1,9 +1,259 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Now
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
 from django.utils.text import slugify
 from django.urls import reverse
+import time
 import uuid
 
+from .metrics import SIGNUP_SAVE_LATENCY, SIGNUPS_CREATED, SLOTS_FILLED
+
+
+def normalize_email(email):
+    """The form of an email address signups are matched on across forms"""
+    return (email or '').strip().lower()
+
+
+class SlotFullError(Exception):
+    """Raised when a signup is attempted on a slot with no spots left"""
+    
+    def __init__(self, message, slot_ids=()):
+        super().__init__(message)
+        self.slot_ids = list(slot_ids)
+
+
+# Wide enough to total credit hours across every signup in the database
+CREDIT_HOURS_TOTAL = DecimalField(max_digits=12, decimal_places=2)
+
+
+def credit_hours_sum(lookup):
+    """SUM() of a credit hours column that is 0 rather than NULL when empty"""
+    return Coalesce(Sum(lookup), Value(0), output_field=CREDIT_HOURS_TOTAL)
+
+
+def subquery_count(queryset, group):
+    """Correlated COUNT() of queryset rows, grouped on the outer row's key; 0 when empty"""
+    counts = queryset.order_by().values(group).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts), Value(0))
+
+
+def signup_count():
+    """Correlated COUNT() of the signups actually stored for the outer slot"""
+    return subquery_count(VolunteerSignup.objects.filter(slot=OuterRef('pk')), 'slot')
+
+
+def waitlist_count():
+    """Correlated COUNT() of the entries waiting on the outer slot"""
+    return subquery_count(WaitlistEntry.objects.filter(slot=OuterRef('pk')), 'slot')
+
+
+class VolunteerFormQuerySet(models.QuerySet):
+    def with_credit_hours(self):
+        """Annotate each form with total_credit_hours across all its signups"""
+        signup_hours = (
+            VolunteerSignup.objects
+            .filter(slot__form=OuterRef('pk'))
+            .order_by()
+            .values('slot__form')
+            .annotate(total=Sum('slot__volunteer_type__credit_hours'))
+            .values('total')
+        )
+        return self.annotate(
+            total_credit_hours=Coalesce(Subquery(signup_hours), Value(0), output_field=CREDIT_HOURS_TOTAL)
+        )
+
+
+class VolunteerSlotQuerySet(models.QuerySet):
+    def with_credit_hours(self):
+        """Annotate each slot with total_credit_hours for its current signups"""
+        return self.annotate(
+            total_credit_hours=Coalesce(
+                F('current_signups') * F('volunteer_type__credit_hours'),
+                Value(0),
+                output_field=CREDIT_HOURS_TOTAL,
+            )
+        )
+    
+    def drifted(self):
+        """Slots whose current_signups differs from their real signup count,
+        annotated with that count as actual_signups"""
+        return self.annotate(actual_signups=signup_count()).exclude(current_signups=F('actual_signups'))
+    
+    def bump_version(self):
+        """Mark these slots as changed, so their cached cards are re-rendered"""
+        return self.update(version=F('version') + 1)
+    
+    def reconcile_signup_counts(self):
+        """Reset current_signups to the real signup count for every drifted slot.
+        
+        Runs as a single UPDATE with the count computed by a subquery, and
+        returns the number of slots corrected.
+        """
+        return self.exclude(current_signups=signup_count()).update(
+            current_signups=signup_count(),
+            version=F('version') + 1,
+        )
+
+
+class VolunteerSignupQuerySet(models.QuerySet):
+    def with_credit_hours(self):
+        """Annotate each signup with the credit_hours of its slot's volunteer type"""
+        return self.annotate(
+            credit_hours=Coalesce(
+                F('slot__volunteer_type__credit_hours'),
+                Value(0),
+                output_field=CREDIT_HOURS_TOTAL,
+            )
+        )
+    
+    def total_credit_hours(self):
+        """Total credit hours earned by the signups in this queryset"""
+        return self.aggregate(total=credit_hours_sum('slot__volunteer_type__credit_hours'))['total']
+    
+    async def atotal_credit_hours(self):
+        """Async total_credit_hours()"""
+        return (await self.aaggregate(total=credit_hours_sum('slot__volunteer_type__credit_hours')))['total']
+    
+    def credit_hours_by_form(self):
+        """Signup count and credit hours per form"""
+        return (
+            self.order_by()
+            .values('slot__form', 'slot__form__title')
+            .annotate(signups=Count('id'), credit_hours=credit_hours_sum('slot__volunteer_type__credit_hours'))
+            .order_by('slot__form__title', 'slot__form')
+        )
+    
+    def credit_hours_by_slot(self):
+        """Signup count and credit hours per slot"""
+        return (
+            self.order_by()
+            .values('slot', 'slot__title', 'slot__date')
+            .annotate(signups=Count('id'), credit_hours=credit_hours_sum('slot__volunteer_type__credit_hours'))
+            .order_by('slot__date', 'slot__title', 'slot')
+        )
+    
+    def credit_hours_by_type(self):
+        """Signup count and credit hours per volunteer type (None for untyped slots)"""
+        return (
+            self.order_by()
+            .values('slot__volunteer_type', 'slot__volunteer_type__name')
+            .annotate(signups=Count('id'), credit_hours=credit_hours_sum('slot__volunteer_type__credit_hours'))
+            .order_by('slot__volunteer_type__name')
+        )
+    
+    def for_email(self, email):
+        """One volunteer's signups on active forms, with slot, form and credit
+        hours loaded by a single query on the normalized email index"""
+        return (
+            self.filter(email_normalized=normalize_email(email), slot__form__is_active=True)
+            .select_related('slot__form', 'slot__volunteer_type')
+            .with_credit_hours()
+            .order_by('slot__date', 'slot__title', 'slot_id', 'signed_up_at')
+        )
+    
+    def create_for_slots(self, slots, partial=False, **fields):
+        """Sign one volunteer up for several slots in a single transaction.
+        
+        Capacity is checked and claimed for the whole set at once: the slots
+        with room are locked in primary key order, one UPDATE claims a seat
+        in each, and one INSERT adds the signups. Unless partial is set,
+        nothing is claimed when any slot is full. SlotFullError, naming the
+        full slots, is raised then and whenever no slot has room. Returns the
+        new signups and the ids of the slots that were skipped.
+        
+        Like bulk_create(), this sends no signals; the caller invalidates
+        cached pages for the form.
+        """
+        slot_ids = {slot.pk for slot in slots}
+        with transaction.atomic():
+            # The capacity check is re-evaluated once a row's lock is granted,
+            # so a slot filled by a concurrent signup drops out here
+            open_slots = list(
+                VolunteerSlot.objects
+                .select_for_update()
+                .filter(pk__in=slot_ids, current_signups__lt=F('max_volunteers'))
+                .order_by('pk')
+            )
+            full_ids = sorted(slot_ids - {slot.pk for slot in open_slots})
+            if full_ids and (not partial or not open_slots):
+                raise SlotFullError(f'Slots {full_ids} are already full', full_ids)
+            open_ids = [slot.pk for slot in open_slots]
+            VolunteerSlot.objects.filter(pk__in=open_ids).update(
+                current_signups=F('current_signups') + 1,
+                version=F('version') + 1,
+            )
+            signups = []
+            for slot in open_slots:
+                slot.current_signups += 1
+                signup = VolunteerSignup(slot=slot, **fields)
+                signup.email_normalized = normalize_email(signup.email)
+                signups.append(signup)
+            self.bulk_create(signups)
+            FormStats.objects.add_signups(open_ids)
+            filled = sum(slot.current_signups == slot.max_volunteers for slot in open_slots)
+            transaction.on_commit(lambda: SIGNUPS_CREATED.inc(len(signups)))
+            transaction.on_commit(lambda: SLOTS_FILLED.inc(filled))
+        return signups, full_ids
+    
+    def credit_hours_by_email(self):
+        """Signup count and credit hours per volunteer, matching emails case-insensitively"""
+        return (
+            self.order_by()
+            .annotate(volunteer_email=F('email_normalized'))
+            .values('volunteer_email')
+            .annotate(signups=Count('id'), credit_hours=credit_hours_sum('slot__volunteer_type__credit_hours'))
+            .order_by('volunteer_email')
+        )
+
+
+class FormStatsQuerySet(models.QuerySet):
+    def rebuild(self):
+        """Recompute every stats row in this queryset from the slot and signup
+        tables with a single UPDATE; returns the number of rows rebuilt"""
+        slots = VolunteerSlot.objects.filter(form=OuterRef('pk'))
+        signups = VolunteerSignup.objects.filter(slot__form=OuterRef('pk'))
+        credit_hours = (
+            signups.order_by()
+            .values('slot__form')
+            .annotate(total=Sum('slot__volunteer_type__credit_hours'))
+            .values('total')
+        )
+        return self.update(
+            total_slots=subquery_count(slots, 'form'),
+            filled_slots=subquery_count(slots.filter(current_signups__gte=F('max_volunteers')), 'form'),
+            total_signups=subquery_count(signups, 'slot__form'),
+            credit_hours=Coalesce(Subquery(credit_hours), Value(0), output_field=CREDIT_HOURS_TOTAL),
+            updated_at=Now(),
+        )
+    
+    def add_signups(self, slot_ids):
+        """Count one new signup on each of slot_ids, whose seats have just been
+        claimed, with a single UPDATE of the forms they belong to"""
+        slots = VolunteerSlot.objects.filter(pk__in=slot_ids, form=OuterRef('pk'))
+        credit_hours = (
+            slots.order_by()
+            .values('form')
+            .annotate(total=Sum('volunteer_type__credit_hours'))
+            .values('total')
+        )
+        forms = VolunteerSlot.objects.filter(pk__in=slot_ids).values('form_id')
+        return self.filter(pk__in=forms).update(
+            total_signups=F('total_signups') + subquery_count(slots, 'form'),
+            # Each slot had room before its seat was claimed
+            filled_slots=F('filled_slots') + subquery_count(slots.filter(current_signups=F('max_volunteers')), 'form'),
+            credit_hours=F('credit_hours') + Coalesce(Subquery(credit_hours), Value(0), output_field=CREDIT_HOURS_TOTAL),
+            updated_at=Now(),
+        )
+    
+    def create_missing(self):
+        """Add empty stats rows for forms that have none; returns the forms added"""
+        missing = VolunteerForm.objects.filter(stats__isnull=True).values_list('pk', flat=True)
+        created = self.bulk_create([FormStats(form_id=pk) for pk in missing], ignore_conflicts=True)
+        return len(created)
+
+
 class VolunteerType(models.Model):
     """Predefined volunteer task types with descriptions"""
     name = models.CharField(max_length=200, help_text="Name of the volunteer task type")
@@ -32,6 +282,8 @@ class VolunteerForm(models.Model):
     is_active = models.BooleanField(default=True, help_text="Whether this form is currently accepting signups")
     unique_url = models.CharField(max_length=50, unique=True, blank=True, help_text="Unique URL identifier for this form")
     
+    objects = VolunteerFormQuerySet.as_manager()
+    
     def save(self, *args, **kwargs):
         if not self.unique_url:
             # Generate a unique URL using a combination of slugified title and UUID
@@ -44,13 +296,30 @@ class VolunteerForm(models.Model):
         """Generate the full URL for this volunteer form"""
         return reverse('signups:volunteer_form_view', kwargs={'unique_url': self.unique_url})
     
+    def _known_total_credit_hours(self):
+        """The total if it was already loaded with the form, else None"""
+        if hasattr(self, 'total_credit_hours'):  # Annotated by with_credit_hours()
+            return self.total_credit_hours
+        if VolunteerForm.stats.is_cached(self):  # Loaded by select_related('stats')
+            try:
+                return self.stats.credit_hours
+            except FormStats.DoesNotExist:
+                pass  # Not built yet; see the rebuild_form_stats command
+        return None
+    
     def get_total_credit_hours(self):
         """Calculate total credit hours earned across all signups"""
-        total_hours = 0
-        for slot in self.slots.all():
-            for signup in slot.signups.all():
-                total_hours += signup.get_credit_hours()
-        return total_hours
+        total = self._known_total_credit_hours()
+        if total is None:
+            total = VolunteerSignup.objects.filter(slot__form=self).total_credit_hours()
+        return total
+    
+    async def aget_total_credit_hours(self):
+        """Async get_total_credit_hours()"""
+        total = self._known_total_credit_hours()
+        if total is None:
+            total = await VolunteerSignup.objects.filter(slot__form=self).atotal_credit_hours()
+        return total
     
     def __str__(self):
         return self.title
@@ -67,10 +336,27 @@ class VolunteerSlot(models.Model):
     date = models.DateField(help_text="Date when this volunteer slot occurs")
     max_volunteers = models.PositiveIntegerField(default=1, help_text="Maximum number of volunteers for this slot")
     current_signups = models.PositiveIntegerField(default=0, help_text="Current number of signups")
+    version = models.PositiveIntegerField(default=0, editable=False, help_text="Incremented whenever the slot or its signups change")
+    
+    objects = VolunteerSlotQuerySet.as_manager()
     
     def __str__(self):
         return f"{self.title} - {self.date}"
     
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            return super().save(*args, **kwargs)
+        # Incremented in the database, so saving a stale copy can never reuse an old version
+        self.version = F('version') + 1
+        # current_signups only ever changes through conditional UPDATEs; writing
+        # back the loaded value would undo seats claimed since and allow overbooking
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            update_fields = [field.name for field in self._meta.concrete_fields if not field.primary_key]
+        kwargs['update_fields'] = {*update_fields, 'version'} - {'current_signups'}
+        super().save(*args, **kwargs)
+        self.refresh_from_db(fields=['version', 'current_signups'])
+    
     def is_full(self):
         return self.current_signups >= self.max_volunteers
     
@@ -79,43 +365,158 @@ class VolunteerSlot(models.Model):
     
     def get_total_credit_hours(self):
         """Calculate total credit hours for this slot based on signups"""
+        if hasattr(self, 'total_credit_hours'):  # Annotated by with_credit_hours()
+            return self.total_credit_hours
         if self.volunteer_type:
             return self.current_signups * self.volunteer_type.credit_hours
         return 0
     
     class Meta:
         ordering = ['date']
+        indexes = [
+            # A form's slots in page order, matching the keyset pagination cursor
+            models.Index(fields=['form', 'date', 'title', 'id'], name='signups_slot_form_order_idx'),
+        ]
 
 class VolunteerSignup(models.Model):
     """Individual volunteer signups for slots"""
     slot = models.ForeignKey(VolunteerSlot, on_delete=models.CASCADE, related_name='signups')
     name = models.CharField(max_length=100, help_text="Name of the volunteer")
     email = models.EmailField(help_text="Email address of the volunteer")
+    email_normalized = models.EmailField(editable=False, help_text="Trimmed, lowercased email used to find a volunteer's signups")
     phone = models.CharField(max_length=20, blank=True, help_text="Phone number (optional)")
     notes = models.TextField(blank=True, help_text="Any additional notes from the volunteer")
     signed_up_at = models.DateTimeField(auto_now_add=True)
     
+    objects = VolunteerSignupQuerySet.as_manager()
+    
     def __str__(self):
         return f"{self.name} - {self.slot.title}"
     
     def get_credit_hours(self):
         """Get the credit hours earned for this signup"""
+        if hasattr(self, 'credit_hours'):  # Annotated by with_credit_hours()
+            return self.credit_hours
         if self.slot.volunteer_type:
             return self.slot.volunteer_type.credit_hours
         return 0
     
+    def clean(self):
+        super().clean()
+        # Friendly early check for forms; save() is the race-free guard
+        if not self.pk and self.slot_id and self.slot.is_full():
+            raise ValidationError('Sorry, this slot is already full.')
+    
     def save(self, *args, **kwargs):
-        # Update the current_signups count when a signup is created
+        self.email_normalized = normalize_email(self.email)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'email' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'email_normalized'}
+        # Claim a seat with one conditional UPDATE when a signup is created.
+        # The database evaluates the capacity check and the increment under
+        # the row lock, so concurrent requests (across gunicorn workers) can
+        # never push current_signups past max_volunteers.
         if not self.pk:  # Only on creation
-            self.slot.current_signups += 1
-            self.slot.save()
+            started = time.perf_counter()
+            with transaction.atomic():
+                claimed = VolunteerSlot.objects.filter(
+                    pk=self.slot_id,
+                    current_signups__lt=F('max_volunteers'),
+                ).update(current_signups=F('current_signups') + 1, version=F('version') + 1)
+                if not claimed:
+                    raise SlotFullError(f'Slot {self.slot_id} is already full')
+                # Refresh before saving so post_save receivers see the new count
+                self.slot.refresh_from_db(fields=['current_signups'])
+                super().save(*args, **kwargs)
+            SIGNUP_SAVE_LATENCY.observe(time.perf_counter() - started)
+            return
         super().save(*args, **kwargs)
     
-    def delete(self, *args, **kwargs):
-        # Update the current_signups count when a signup is deleted
-        self.slot.current_signups -= 1
-        self.slot.save()
-        super().delete(*args, **kwargs)
+    # Seats are released by a post_delete receiver (see signals.py) rather
+    # than in delete(), so queryset and admin bulk deletes release them too
     
     class Meta:
         ordering = ['signed_up_at']
+        indexes = [
+            # A slot's signups in signup order
+            models.Index(fields=['slot', 'signed_up_at'], name='signups_signup_slot_order_idx'),
+            # Signups are matched by email case-insensitively
+            models.Index(fields=['email_normalized'], name='signups_signup_email_idx'),
+        ]
+
+
+
+class WaitlistEntryQuerySet(models.QuerySet):
+    def promote_next(self, slot):
+        """Sign up the first person waiting for slot, if it has a free seat.
+        
+        Call this in the transaction that freed the seat, so nobody else can
+        take it first. The entry is locked while it is promoted, and it is
+        found by an index seek however long the waitlist is. Returns the new
+        signup, or None when nobody is waiting or the slot is still full.
+        """
+        with transaction.atomic():
+            entry = self.select_for_update().filter(slot=slot).order_by('joined_at', 'id').first()
+            if entry is None:
+                return None
+            signup = VolunteerSignup(slot=slot, name=entry.name, email=entry.email, phone=entry.phone, notes=entry.notes)
+            try:
+                signup.save()
+            except SlotFullError:
+                return None
+            entry.delete()
+            return signup
+
+
+class WaitlistEntry(models.Model):
+    """A volunteer waiting for a seat in a full slot, signed up in turn as seats free up"""
+    slot = models.ForeignKey(VolunteerSlot, on_delete=models.CASCADE, related_name='waitlist')
+    name = models.CharField(max_length=100, help_text="Name of the volunteer")
+    email = models.EmailField(help_text="Email address of the volunteer")
+    phone = models.CharField(max_length=20, blank=True, help_text="Phone number (optional)")
+    notes = models.TextField(blank=True, help_text="Any additional notes from the volunteer")
+    joined_at = models.DateTimeField(auto_now_add=True)
+    
+    objects = WaitlistEntryQuerySet.as_manager()
+    
+    def __str__(self):
+        return f"{self.name} - {self.slot.title} (waitlist)"
+    
+    def position(self):
+        """1 for the next person to be promoted"""
+        ahead = WaitlistEntry.objects.filter(slot_id=self.slot_id).filter(
+            models.Q(joined_at__lt=self.joined_at) | models.Q(joined_at=self.joined_at, id__lt=self.id)
+        )
+        return ahead.count() + 1
+    
+    class Meta:
+        ordering = ['joined_at', 'id']
+        verbose_name_plural = 'waitlist entries'
+        indexes = [
+            # Promotion reads the head of one slot's waitlist
+            models.Index(fields=['slot', 'joined_at', 'id'], name='signups_waitlist_order_idx'),
+        ]
+
+class FormStats(models.Model):
+    """Per-form totals kept up to date as signups and slots change.
+    
+    Signup creates and deletes adjust the row in the same transaction (see
+    signals.py), and slot or volunteer type edits recompute it, so summaries
+    read one row instead of aggregating every signup. ``rebuild_form_stats``
+    recomputes all rows after writes that skip signals.
+    """
+    form = models.OneToOneField(VolunteerForm, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    total_slots = models.PositiveIntegerField(default=0)
+    filled_slots = models.PositiveIntegerField(default=0, help_text="Slots with no spots left")
+    total_signups = models.PositiveIntegerField(default=0)
+    credit_hours = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    objects = FormStatsQuerySet.as_manager()
+    
+    def __str__(self):
+        return f"Stats for {self.form_id}"
+    
+    class Meta:
+        verbose_name_plural = 'form stats'
+
@@ -0,0 +1,123 @@
+"""Date-range filtering and keyset pagination of a form's slots.
+
+Public pages show one page of slots at a time, ordered by ``(date, title,
+id)``. Each page ends with a cursor holding the last slot's sort key, and the
+next page is everything strictly after it. That is a range read on the slot
+index rather than an OFFSET scan, so every page costs the same however deep
+into a year-long form it is, and slots added while someone is paging never
+shift or repeat what they see.
+"""
+import base64
+import binascii
+import calendar
+import json
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.exceptions import BadRequest
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import VolunteerSlot
+
+SLOT_ORDER = ('date', 'title', 'id')
+
+# Query string value -> label, in the order the filter links are shown
+DATE_RANGES = {
+    'all': 'All dates',
+    'upcoming': 'Upcoming',
+    'this-month': 'This month',
+    'next-4-weeks': 'Next 4 weeks',
+}
+DEFAULT_RANGE = 'all'
+
+
+def date_bounds(range_name, today):
+    """Inclusive (start, end) dates for a named range; None means unbounded"""
+    if range_name == 'upcoming':
+        return today, None
+    if range_name == 'this-month':
+        last_day = calendar.monthrange(today.year, today.month)[1]
+        return today.replace(day=1), today.replace(day=last_day)
+    if range_name == 'next-4-weeks':
+        return today, today + timedelta(weeks=4)
+    return None, None
+
+
+def encode_cursor(slot):
+    key = json.dumps([slot.date.isoformat(), slot.title, slot.pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return the (date, title, id) sort key in a cursor, or raise BadRequest"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        slot_date, title, pk = json.loads(base64.urlsafe_b64decode(padded))
+        return date.fromisoformat(slot_date), str(title), int(pk)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise BadRequest('Invalid page cursor')
+
+
+class SlotPage:
+    """One page of a form's slots, plus what is needed to link to the next"""
+
+    def __init__(self, slots, range_name, has_more):
+        self.slots = slots
+        self.range_name = range_name
+        self.has_more = has_more
+        self.next_cursor = encode_cursor(slots[-1]) if has_more else None
+
+    @property
+    def ranges(self):
+        return [(value, label, value == self.range_name) for value, label in DATE_RANGES.items()]
+
+
+def slot_page_queryset(form, range_name=DEFAULT_RANGE, cursor=None, page_size=None):
+    """The slots of one page, with one extra row to tell whether another follows"""
+    page_size = page_size or settings.SIGNUPS_SLOTS_PER_PAGE
+    slots = (
+        VolunteerSlot.objects
+        .filter(form=form)
+        .select_related('volunteer_type')
+        .order_by(*SLOT_ORDER)
+    )
+    start, end = date_bounds(range_name, timezone.localdate())
+    if start:
+        slots = slots.filter(date__gte=start)
+    if end:
+        slots = slots.filter(date__lte=end)
+    if cursor:
+        after_date, after_title, after_id = decode_cursor(cursor)
+        slots = slots.filter(
+            Q(date__gt=after_date)
+            | Q(date=after_date, title__gt=after_title)
+            | Q(date=after_date, title=after_title, id__gt=after_id)
+        )
+    return slots[:page_size + 1]
+
+
+def page_params(request):
+    """The range name and cursor requested in the query string"""
+    range_name = request.GET.get('range', DEFAULT_RANGE)
+    if range_name not in DATE_RANGES:
+        raise BadRequest('Unknown date range')
+    return range_name, request.GET.get('after') or None
+
+
+def _make_page(slots, range_name):
+    page_size = settings.SIGNUPS_SLOTS_PER_PAGE
+    return SlotPage(slots[:page_size], range_name, has_more=len(slots) > page_size)
+
+
+def get_slot_page(request, form):
+    """Load the page of form's slots requested by request's query string"""
+    range_name, cursor = page_params(request)
+    return _make_page(list(slot_page_queryset(form, range_name, cursor)), range_name)
+
+
+async def aget_slot_page(request, form):
+    """Async get_slot_page()"""
+    range_name, cursor = page_params(request)
+    slots = [slot async for slot in slot_page_queryset(form, range_name, cursor)]
+    return _make_page(slots, range_name)
@@ -0,0 +1,178 @@
+"""Optional per-request profiling.
+
+``ProfilingMiddleware`` times every request and splits the time into SQL,
+template rendering and the rest ("view": view code and the middleware below
+this one). The numbers go out as a ``Server-Timing`` header, which browser
+dev tools show in the network panel, and as one structured log line per
+request on the ``signups.profiling`` logger.
+
+Queries are counted by one execute wrapper on every database connection,
+which adds them to the profile in the current context. Async views run
+their ORM calls in ``sync_to_async`` threads with connections of their
+own, and the context follows them there.
+
+Set ``SIGNUPS_PROFILING=true`` to turn it on. When it is off the middleware
+removes itself from the chain at startup, so requests pay nothing for it.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import Template
+
+logger = logging.getLogger('signups.profiling')
+
+_current_profile = ContextVar('signups_request_profile', default=None)
+
+
+class RequestProfile:
+    """Time spent by one request, in seconds"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total_time = 0.0
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.page_cache = None
+
+    @property
+    def view_time(self):
+        return max(self.total_time - self.sql_time - self.template_time, 0.0)
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.sql_count += 1
+
+    @contextmanager
+    def activate(self):
+        """Attribute queries and template renders in this context to the profile"""
+        token = _current_profile.set(self)
+        try:
+            yield self
+        finally:
+            _current_profile.reset(token)
+            self.total_time = time.perf_counter() - self.started
+
+    def server_timing(self):
+        metrics = [
+            f'db;dur={self.sql_time * 1000:.1f};desc="{self.sql_count} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f};desc="Templates"',
+            f'view;dur={self.view_time * 1000:.1f};desc="View"',
+            f'total;dur={self.total_time * 1000:.1f}',
+        ]
+        if self.page_cache:
+            metrics.append(f'cache;desc="{self.page_cache}"')
+        return ', '.join(metrics)
+
+    def as_dict(self):
+        return {
+            'total_ms': round(self.total_time * 1000, 2),
+            'view_ms': round(self.view_time * 1000, 2),
+            'sql_count': self.sql_count,
+            'sql_ms': round(self.sql_time * 1000, 2),
+            'template_ms': round(self.template_time * 1000, 2),
+            'page_cache': self.page_cache,
+        }
+
+
+def _record_query(execute, sql, params, many, context):
+    profile = _current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    return profile.record_query(execute, sql, params, many, context)
+
+
+def _wrap_connection(sender, connection, **kwargs):
+    # Last in the list, so no other wrapper's time is counted as SQL
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def install_query_recorder():
+    """Count the queries of profiled requests on every connection, in every thread"""
+    connection_created.connect(_wrap_connection, weak=False, dispatch_uid='signups.profiling')
+    for connection in connections.all(initialized_only=True):
+        _wrap_connection(None, connection)
+
+
+def _timed_render(render):
+    """Add a template's render time, less the queries it ran, to the current profile.
+
+    Only the top-level render goes through the template backend, so includes
+    and extended templates are not counted twice.
+    """
+    @wraps(render)
+    def wrapper(self, *args, **kwargs):
+        profile = _current_profile.get()
+        if profile is None:
+            return render(self, *args, **kwargs)
+        started = time.perf_counter()
+        sql_before = profile.sql_time
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            profile.template_time += elapsed - (profile.sql_time - sql_before)
+    wrapper.profiled = True
+    return wrapper
+
+
+def install_template_timer():
+    if not getattr(Template.render, 'profiled', False):
+        Template.render = _timed_render(Template.render)
+
+
+class ProfilingMiddleware:
+    """Report where each request's time went; list it first in MIDDLEWARE
+    so the total covers every other middleware too"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.SIGNUPS_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        install_query_recorder()
+        install_template_timer()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with RequestProfile().activate() as profile:
+            response = self.get_response(request)
+        return self.finish(request, response, profile)
+
+    async def __acall__(self, request):
+        with RequestProfile().activate() as profile:
+            response = await self.get_response(request)
+        return self.finish(request, response, profile)
+
+    def finish(self, request, response, profile):
+        # The page cache marks whether it answered the request
+        profile.page_cache = response.get('X-Page-Cache')
+        response['Server-Timing'] = profile.server_timing()
+        data = profile.as_dict()
+        logger.info(
+            'request method=%s path=%s status=%s %s',
+            request.method,
+            request.path,
+            response.status_code,
+            ' '.join(f'{key}={value}' for key, value in data.items()),
+            extra={'profile': dict(data, method=request.method, path=request.path, status=response.status_code)},
+        )
+        return response
@@ -0,0 +1,144 @@
+from django.db import transaction
+from django.db.models import F, QuerySet, Subquery, Value
+from django.db.models.functions import Coalesce, Now
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_all_form_versions, bump_form_version, invalidate_volunteer_types, remember_form_url
+from .events import publish_form_event, slot_availability
+from .metrics import SIGNUPS_CREATED, SIGNUPS_DELETED, SLOTS_FILLED
+from .models import CREDIT_HOURS_TOTAL, FormStats, VolunteerForm, VolunteerSignup, VolunteerSlot, VolunteerType, WaitlistEntry
+
+
+def adjust_form_stats(slot, signups, filled):
+    """Apply one signup's change to its form's stats row, in the caller's transaction"""
+    # Read the slot's credit hours in the UPDATE itself rather than loading its type
+    hours = VolunteerSlot.objects.filter(pk=slot.pk).values('volunteer_type__credit_hours')
+    hours = Coalesce(Subquery(hours), Value(0), output_field=CREDIT_HOURS_TOTAL)
+    FormStats.objects.filter(pk=slot.form_id).update(
+        total_signups=F('total_signups') + signups,
+        filled_slots=F('filled_slots') + filled,
+        credit_hours=F('credit_hours') + hours * signups,
+        updated_at=Now(),
+    )
+
+
+def form_contents_changed(form_id):
+    """Recompute a form's stats row and drop its cached pages. bulk_create
+    skips signals, so bulk inserts call this once they are done."""
+    FormStats.objects.filter(pk=form_id).rebuild()
+    bump_form_version(form_id)
+
+
+def publish_on_commit(form_id, event, data):
+    """Tell live streams about a change once it is visible to other connections"""
+    transaction.on_commit(lambda: publish_form_event(form_id, event, data))
+
+
+def volunteer_types_changed():
+    """Drop cached volunteer types now, and again on commit in case another
+    worker reloaded the old rows before this change was visible"""
+    invalidate_volunteer_types()
+    transaction.on_commit(invalidate_volunteer_types)
+
+
+@receiver(post_save, sender=VolunteerForm)
+def form_saved(sender, instance, created, raw=False, **kwargs):
+    if created:
+        FormStats.objects.get_or_create(form_id=instance.pk)
+    remember_form_url(instance)
+    bump_form_version(instance.pk)
+
+
+@receiver(post_delete, sender=VolunteerForm)
+def form_deleted(sender, instance, **kwargs):
+    bump_form_version(instance.pk)
+
+
+@receiver(post_save, sender=VolunteerSlot)
+def slot_saved(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        # save() never writes current_signups, so read the count it kept
+        instance.refresh_from_db(fields=['current_signups'])
+        # Seats added by raising max_volunteers go to the waitlist first
+        while not instance.is_full() and WaitlistEntry.objects.promote_next(instance):
+            pass
+    # Slot edits are rare, so recompute the form's stats rather than track deltas
+    form_contents_changed(instance.form_id)
+    publish_on_commit(instance.form_id, 'availability', slot_availability(instance))
+
+
+@receiver(post_delete, sender=VolunteerSlot)
+def slot_deleted(sender, instance, **kwargs):
+    form_contents_changed(instance.form_id)
+    publish_on_commit(instance.form_id, 'removed', {'id': instance.pk})
+
+
+def is_signup_delete(origin):
+    """Whether a delete started from signups rather than cascading from their slot or form"""
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model is VolunteerSignup
+
+
+@receiver(post_save, sender=VolunteerSignup)
+def signup_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        # loaddata bypasses save(), so recount the slot instead of claiming a seat
+        VolunteerSlot.objects.filter(pk=instance.slot_id).reconcile_signup_counts()
+        FormStats.objects.filter(form__slots=instance.slot_id).rebuild()
+        return
+    slot = instance.slot
+    bump_form_version(slot.form_id)
+    if not created:
+        # The card shows the signup's details; a new signup's seat claim bumped it already
+        VolunteerSlot.objects.filter(pk=slot.pk).bump_version()
+    if created:  # Edits to an existing signup do not change availability
+        # save() has just claimed the seat, so the slot filled up if it is now at capacity
+        filled = slot.current_signups == slot.max_volunteers
+        adjust_form_stats(slot, 1, int(filled))
+        transaction.on_commit(SIGNUPS_CREATED.inc)
+        if filled:
+            transaction.on_commit(SLOTS_FILLED.inc)
+        publish_on_commit(slot.form_id, 'availability', slot_availability(slot))
+
+
+@receiver(post_delete, sender=VolunteerSignup)
+def signup_deleted(sender, instance, origin=None, **kwargs):
+    # Runs inside the delete's transaction for single, queryset and admin
+    # bulk deletes alike. Cascades skip it: the slot is about to go too.
+    if not is_signup_delete(origin):
+        return
+    transaction.on_commit(SIGNUPS_DELETED.inc)
+    released = VolunteerSlot.objects.filter(
+        pk=instance.slot_id,
+        current_signups__gt=0,
+    ).update(current_signups=F('current_signups') - 1, version=F('version') + 1)
+    if VolunteerSignup.slot.is_cached(instance):
+        instance.slot.refresh_from_db(fields=['current_signups'])
+    slot = instance.slot
+    # The slot stopped being full if releasing the seat took it below capacity
+    adjust_form_stats(slot, -1, -int(released and slot.current_signups + 1 == slot.max_volunteers))
+    if released:
+        # Hand the freed seat to the waitlist before anyone else can see it.
+        # The UPDATE above holds the slot's row lock until commit, so two
+        # cancellations in one slot promote one after the other.
+        WaitlistEntry.objects.promote_next(slot)
+    bump_form_version(slot.form_id)
+    publish_on_commit(slot.form_id, 'availability', slot_availability(slot))
+
+
+@receiver(post_save, sender=VolunteerType)
+def volunteer_type_saved(sender, instance, **kwargs):
+    forms = VolunteerSlot.objects.filter(volunteer_type=instance).values('form_id')
+    FormStats.objects.filter(pk__in=forms).rebuild()
+    # Type names and credit hours appear on every form that uses them
+    bump_all_form_versions()
+    volunteer_types_changed()
+
+
+@receiver(post_delete, sender=VolunteerType)
+def volunteer_type_deleted(sender, instance, **kwargs):
+    # Its slots have already been detached, so they can no longer be found
+    FormStats.objects.rebuild()
+    bump_all_form_versions()
+    volunteer_types_changed()
@@ -0,0 +1,255 @@
+"""Opt-in slow-query log.
+
+``SlowQueryLog`` is a database execute wrapper. Any query that takes at
+least ``SIGNUPS_SLOW_QUERY_MS`` milliseconds is logged with its SQL,
+parameters, the project code that ran it and the database's EXPLAIN plan.
+The record goes to the ``signups.slow_queries`` logger, and is appended as a
+JSON line to ``SIGNUPS_SLOW_QUERY_LOG``, which every worker shares.
+
+Each record names the view or management command that ran the query,
+which ``SlowQueryCallerMiddleware`` keeps in a context variable, and the
+innermost project line on the stack.
+
+Queries that differ only in their parameters or in the length of an IN list
+share a fingerprint. ``summarise`` groups the log by fingerprint, and the
+``slow_queries`` management command prints the worst groups.
+
+The log is installed on every new connection when ``SIGNUPS_SLOW_QUERY_MS``
+is set (see apps.py). Otherwise nothing is wrapped and the middleware
+removes itself.
+"""
+import hashlib
+import json
+import logging
+import re
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from contextlib import nullcontext
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, transaction
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+logger = logging.getLogger('signups.slow_queries')
+
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+MAX_LOGGED_PARAMS = 20
+
+_PLACEHOLDER = re.compile(r'%s|\$\d+')
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_ROWS = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+_SPACE = re.compile(r'\s+')
+
+# Instrumentation that sits between project code and the database
+_INSTRUMENTATION = {__file__, *(str(Path(__file__).with_name(name)) for name in ('profiling.py', 'metrics.py'))}
+
+_current_caller = ContextVar('signups_slow_query_caller', default=None)
+_explaining = ContextVar('signups_slow_query_explaining', default=False)
+
+
+def normalize_sql(sql):
+    """The shape of a query: parameters, literals and list lengths removed"""
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _LITERAL.sub('?', sql)
+    sql = _LIST.sub('(...)', sql)
+    sql = _ROWS.sub('(...)', sql)  # Multi-row INSERTs of any size
+    return _SPACE.sub(' ', sql).strip()
+
+
+def fingerprint(sql):
+    return hashlib.md5(normalize_sql(sql).encode()).hexdigest()[:12]
+
+
+def find_caller():
+    """The view handling the current request, or the management command running"""
+    caller = _current_caller.get()
+    if caller:
+        return caller
+    if len(sys.argv) > 1 and Path(sys.argv[0]).name == 'manage.py':
+        return f'manage.py {sys.argv[1]}'
+    return 'unknown'
+
+
+def find_location():
+    """The innermost line of project code on the stack, past any instrumentation"""
+    base_dir = str(settings.BASE_DIR)
+    entry_point = str(Path(base_dir) / 'manage.py')
+    for frame in reversed(traceback.extract_stack()):
+        filename = frame.filename
+        if (
+            filename in _INSTRUMENTATION or filename == entry_point
+            or not filename.startswith(base_dir) or 'site-packages' in filename
+        ):
+            continue
+        return f'{Path(filename).relative_to(base_dir)}:{frame.lineno} in {frame.name}'
+    return None
+
+
+def explain(connection, sql, params):
+    """The database's plan for sql, or None for statements it cannot explain.
+
+    Uses a cursor straight from the backend, so the EXPLAIN neither runs
+    through the execute wrappers nor disturbs the original cursor's results.
+    Inside a transaction it runs in a savepoint, so a failed EXPLAIN cannot
+    abort the caller's transaction on PostgreSQL.
+    """
+    if not sql.lstrip()[:6].upper().startswith(EXPLAINABLE):
+        return None
+    prefix = connection.ops.explain_query_prefix()
+    # The savepoint's own statements do go through the wrappers
+    token = _explaining.set(True)
+    try:
+        with transaction.atomic(using=connection.alias) if connection.in_atomic_block else nullcontext():
+            cursor = connection.create_cursor()
+            try:
+                with connection.wrap_database_errors:  # Driver errors as DatabaseError
+                    cursor.execute(f'{prefix} {sql}', params)
+                # SQLite puts the plan text last; PostgreSQL has a single column
+                return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+            finally:
+                cursor.close()
+    except DatabaseError:
+        return None
+    finally:
+        _explaining.reset(token)
+
+
+def _loggable_params(params):
+    if isinstance(params, dict):
+        return {key: str(value) for key, value in list(params.items())[:MAX_LOGGED_PARAMS]}
+    return [str(value) for value in list(params or ())[:MAX_LOGGED_PARAMS]]
+
+
+class SlowQueryLog:
+    """Execute wrapper recording every query slower than threshold_ms to path"""
+
+    def __init__(self, threshold_ms, path):
+        self.threshold_ms = threshold_ms
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration_ms = (time.perf_counter() - started) * 1000
+        if duration_ms >= self.threshold_ms and not _explaining.get():
+            self.record(context['connection'], sql, params, many, duration_ms)
+        return result
+
+    def record(self, connection, sql, params, many, duration_ms):
+        entry = {
+            'time': timezone.now().isoformat(),
+            'database': connection.alias,
+            'duration_ms': round(duration_ms, 3),
+            'fingerprint': fingerprint(sql),
+            'sql': sql,
+            'params': None if many else _loggable_params(params),
+            'caller': find_caller(),
+            'location': find_location(),
+            'plan': None if many else explain(connection, sql, params),
+        }
+        logger.warning(
+            'slow query %.1f ms fingerprint=%s caller=%s: %s',
+            duration_ms, entry['fingerprint'], entry['caller'], sql,
+            extra={'slow_query': entry},
+        )
+        line = json.dumps(entry) + '\n'
+        with self._lock, self.path.open('a') as log:
+            log.write(line)
+
+
+class SlowQueryCallerMiddleware:
+    """Name the view handling each request as the caller of its slow queries"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if settings.SIGNUPS_SLOW_QUERY_MS is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _current_caller.set(None)
+        try:
+            return self.get_response(request)
+        finally:
+            _current_caller.reset(token)
+
+    async def __acall__(self, request):
+        token = _current_caller.set(None)
+        try:
+            return await self.get_response(request)
+        finally:
+            _current_caller.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _current_caller.set(request.resolver_match.view_name)
+
+
+def read_log(path):
+    """The records in a slow-query log, skipping any line cut short by a crash"""
+    try:
+        lines = Path(path).read_text().splitlines()
+    except FileNotFoundError:
+        return []
+    records = []
+    for line in lines:
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return records
+
+
+def summarise(records):
+    """Group slow-query records by fingerprint, slowest total first"""
+    groups = {}
+    for record in records:
+        group = groups.setdefault(record['fingerprint'], {
+            'fingerprint': record['fingerprint'],
+            'sql': normalize_sql(record['sql']),
+            'count': 0,
+            'total_ms': 0.0,
+            'max_ms': 0.0,
+            'callers': Counter(),
+            'locations': Counter(),
+            'plan': None,
+        })
+        group['count'] += 1
+        group['total_ms'] += record['duration_ms']
+        group['max_ms'] = max(group['max_ms'], record['duration_ms'])
+        group['callers'][record['caller']] += 1
+        if record.get('location'):  # Missing from records logged before it was added
+            group['locations'][record['location']] += 1
+        group['plan'] = record['plan'] or group['plan']  # The most recent plan
+    for group in groups.values():
+        group['mean_ms'] = group['total_ms'] / group['count']
+    return sorted(groups.values(), key=lambda group: group['total_ms'], reverse=True)
+
+
+def install():
+    """Log slow queries on every connection opened from now on"""
+    slow_query_log = SlowQueryLog(settings.SIGNUPS_SLOW_QUERY_MS, settings.SIGNUPS_SLOW_QUERY_LOG)
+
+    def wrap(sender, connection, **kwargs):
+        # Connection objects are reused across reconnects; wrap each only once.
+        # The connection may open inside a connection.execute_wrapper() block,
+        # which pops the last wrapper on exit, so go first in the list.
+        if slow_query_log not in connection.execute_wrappers:
+            connection.execute_wrappers.insert(0, slow_query_log)
+
+    connection_created.connect(wrap, weak=False, dispatch_uid='signups.slow_queries')
@@ -1,9 +1,46 @@
-from django.test import TestCase, Client
+from django.core.files.uploadedfile import SimpleUploadedFile
+from asgiref.sync import sync_to_async
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.apps import apps as django_apps
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.exceptions import BadRequest, PermissionDenied, SuspiciousOperation
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.db.models import Count, F
+from django.http import Http404
 from django.urls import reverse
+from django.utils import timezone
 from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+import asyncio
+import csv
+import importlib
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
 
-from .models import VolunteerForm, VolunteerSlot
+from . import metrics, views
+from .benchmarks import QUERY_BUDGETS, check_results, run_benchmarks
+from .cache import VOLUNTEER_TYPES_VERSION_KEY, get_page_cache_stats, render_slot_cards, reset_page_cache_stats
+from .events import InProcessBroker
+from .importer import import_slots
+from .pagination import encode_cursor
+from . import profiling
+from .profiling import ProfilingMiddleware, RequestProfile, install_query_recorder
+from .slow_queries import SlowQueryLog, explain, fingerprint, install as install_slow_query_log, normalize_sql, read_log, summarise
+from .models import FormStats, VolunteerForm, VolunteerSlot, VolunteerSignup, VolunteerType, WaitlistEntry, SlotFullError
 
 
 class CSRFProtectionTests(TestCase):
@@ -100,3 +137,1859 @@ class SecretKeySecurityTests(TestCase):
             insecure_fallback,
             "SECRET_KEY should not be the insecure hardcoded fallback"
         )
+
+
+class CacheSettingsTests(TestCase):
+    """Test that production never keeps page cache tokens in per-process memory"""
+    
+    def cache_settings(self, **environ):
+        environ = {key: value for key, value in os.environ.items() if key not in ('REDIS_URL', 'SIGNUPS_PAGE_CACHE')} | environ
+        result = subprocess.run(
+            [sys.executable, '-W', 'ignore', '-c',
+             'from mysite import settings; print(settings.CACHES["default"]["BACKEND"], settings.SIGNUPS_PAGE_CACHE)'],
+            env={**environ, 'SECRET_KEY': 'x'}, capture_output=True, text=True, check=True,
+        )
+        backend, page_cache = result.stdout.split()
+        return backend.rsplit('.', 1)[-1], page_cache == 'True'
+    
+    def test_page_cache_needs_a_shared_cache_in_production(self):
+        self.assertEqual(self.cache_settings(DEBUG='False'), ('LocMemCache', False))
+        self.assertEqual(self.cache_settings(DEBUG='False', REDIS_URL='redis://localhost:6379/0'), ('RedisCache', True))
+        self.assertEqual(self.cache_settings(DEBUG='False', SIGNUPS_PAGE_CACHE='true'), ('LocMemCache', True))
+        self.assertEqual(self.cache_settings(DEBUG='True'), ('LocMemCache', True))
+    
+    @override_settings(SIGNUPS_PAGE_CACHE=False)
+    def test_page_and_card_caches_can_be_turned_off(self):
+        user = User.objects.create_user(username='testuser', password='testpass')
+        form = VolunteerForm.objects.create(title='Test Form', description='D', created_by=user)
+        VolunteerSlot.objects.create(form=form, title='Slot', date=date.today(), max_volunteers=1)
+        url = reverse('signups:volunteer_form_view', kwargs={'unique_url': form.unique_url})
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertFalse(response.has_header('X-Page-Cache'))
+        self.assertIn('signups/slot_card.html', [t.name for t in response.templates])
+
+class SlotReservationTests(TestCase):
+    """Test that signups claim seats through the database, not Python state"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.volunteer_form = VolunteerForm.objects.create(
+            title='Test Form',
+            description='Test Description',
+            created_by=self.user,
+        )
+        self.slot = VolunteerSlot.objects.create(
+            form=self.volunteer_form,
+            title='Test Slot',
+            date=date.today() + timedelta(days=7),
+            max_volunteers=2,
+        )
+    
+    def test_stale_slot_instance_does_not_lose_increments(self):
+        """Two signups through separately loaded slot objects both count"""
+        first = VolunteerSlot.objects.get(pk=self.slot.pk)
+        second = VolunteerSlot.objects.get(pk=self.slot.pk)
+        VolunteerSignup(slot=first, name='A', email='a@example.com').save()
+        VolunteerSignup(slot=second, name='B', email='b@example.com').save()
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.current_signups, 2)
+    
+    def test_saving_stale_slot_keeps_claimed_seats(self):
+        """Editing a slot loaded before signups never writes back its old count"""
+        stale = VolunteerSlot.objects.get(pk=self.slot.pk)
+        VolunteerSignup(slot=self.slot, name='A', email='a@example.com').save()
+        stale.title = 'Renamed Slot'
+        stale.save()
+        self.assertEqual(stale.current_signups, 1)
+        VolunteerSignup(slot=self.slot, name='B', email='b@example.com').save()
+        with self.assertRaises(SlotFullError):
+            VolunteerSignup(slot=stale, name='C', email='c@example.com').save()
+        self.slot.refresh_from_db()
+        self.assertEqual((self.slot.title, self.slot.current_signups), ('Renamed Slot', 2))
+        self.assertEqual(FormStats.objects.get(pk=self.volunteer_form.pk).filled_slots, 1)
+    
+    def test_full_slot_raises_and_creates_nothing(self):
+        """A stale slot that looks open is still rejected by the database"""
+        stale = VolunteerSlot.objects.get(pk=self.slot.pk)
+        VolunteerSlot.objects.filter(pk=self.slot.pk).update(current_signups=2)
+        with self.assertRaises(SlotFullError):
+            VolunteerSignup(slot=stale, name='C', email='c@example.com').save()
+        self.assertEqual(self.slot.signups.count(), 0)
+    
+    def test_delete_releases_seat(self):
+        """Deleting a signup decrements the counter and never goes negative"""
+        signup = VolunteerSignup(slot=self.slot, name='A', email='a@example.com')
+        signup.save()
+        VolunteerSlot.objects.filter(pk=self.slot.pk).update(current_signups=0)
+        signup.delete()
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.current_signups, 0)
+    
+    def test_view_reports_full_slot(self):
+        """The slot detail view shows an error instead of overbooking"""
+        VolunteerSlot.objects.filter(pk=self.slot.pk).update(current_signups=2)
+        url = reverse('signups:slot_detail', kwargs={
+            'unique_url': self.volunteer_form.unique_url,
+            'slot_id': self.slot.id
+        })
+        response = self.client.post(url, {'name': 'Late', 'email': 'late@example.com'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'already full')
+        self.assertEqual(self.slot.signups.count(), 0)
+
+
+class SlotReservationContentionTests(TransactionTestCase):
+    """Test that concurrent submitters can never overbook a slot"""
+    
+    submitters = 120
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.volunteer_form = VolunteerForm.objects.create(
+            title='Popular Form',
+            description='Everyone wants in',
+            created_by=self.user,
+        )
+        self.slot = VolunteerSlot.objects.create(
+            form=self.volunteer_form,
+            title='Popular Slot',
+            date=date.today() + timedelta(days=7),
+            max_volunteers=10,
+        )
+    
+    def test_concurrent_signups_never_overbook(self):
+        """Many threads racing for one slot fill it exactly to capacity"""
+        barrier = threading.Barrier(self.submitters)
+        
+        def submit(i):
+            try:
+                barrier.wait()
+                VolunteerSignup(
+                    slot=VolunteerSlot.objects.get(pk=self.slot.pk),
+                    name=f'Parent {i}',
+                    email=f'parent{i}@example.com',
+                ).save()
+                return True
+            except SlotFullError:
+                return False
+            finally:
+                connection.close()
+        
+        with ThreadPoolExecutor(max_workers=self.submitters) as pool:
+            results = list(pool.map(submit, range(self.submitters)))
+        
+        self.slot.refresh_from_db()
+        self.assertEqual(sum(results), self.slot.max_volunteers)
+        self.assertEqual(self.slot.current_signups, self.slot.max_volunteers)
+        self.assertEqual(self.slot.signups.count(), self.slot.max_volunteers)
+
+    
+    def test_concurrent_batch_signups_never_overbook(self):
+        """Batch signups racing for overlapping slots fill each exactly to capacity"""
+        slots = [self.slot] + [
+            VolunteerSlot.objects.create(form=self.volunteer_form, title=f'Slot {i}', date=self.slot.date, max_volunteers=10)
+            for i in range(3)
+        ]
+        submitters = 40
+        barrier = threading.Barrier(submitters)
+        
+        def submit(i):
+            try:
+                barrier.wait()
+                # Every submitter wants a different, overlapping selection, in shuffled order
+                wanted = slots[i % 2:] if i % 3 else slots[::-1]
+                signups, _ = VolunteerSignup.objects.create_for_slots(
+                    wanted, partial=bool(i % 2), name=f'Parent {i}', email=f'parent{i}@example.com',
+                )
+                return len(signups)
+            except SlotFullError:
+                return 0
+            finally:
+                connection.close()
+        
+        with ThreadPoolExecutor(max_workers=submitters) as pool:
+            claimed = sum(pool.map(submit, range(submitters)))
+        
+        self.assertEqual(claimed, VolunteerSignup.objects.count())
+        self.assertFalse(VolunteerSlot.objects.drifted().exists())
+        for slot in VolunteerSlot.objects.filter(pk__in=[slot.pk for slot in slots]):
+            self.assertLessEqual(slot.current_signups, slot.max_volunteers)
+        # Partial submitters take whatever is left of slots 1-3
+        self.assertEqual(
+            VolunteerSlot.objects.filter(pk__in=[slot.pk for slot in slots[1:]], current_signups=10).count(), 3,
+        )
+    
+    def test_concurrent_cancellations_promote_each_entry_once(self):
+        """Cancellations racing in one slot promote distinct waitlist entries"""
+        signups = []
+        for i in range(self.slot.max_volunteers):
+            signup = VolunteerSignup(slot=self.slot, name=f'Parent {i}', email=f'parent{i}@example.com')
+            signup.save()
+            signups.append(signup.pk)
+        for i in range(20):
+            WaitlistEntry.objects.create(slot=self.slot, name=f'Waiting {i}', email=f'waiting{i}@example.com')
+        barrier = threading.Barrier(len(signups))
+        
+        def cancel(pk):
+            try:
+                barrier.wait()
+                VolunteerSignup.objects.get(pk=pk).delete()
+            finally:
+                connection.close()
+        
+        with ThreadPoolExecutor(max_workers=len(signups)) as pool:
+            list(pool.map(cancel, signups))
+        
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.current_signups, self.slot.max_volunteers)
+        self.assertEqual(
+            sorted(self.slot.signups.values_list('name', flat=True)),
+            sorted(f'Waiting {i}' for i in range(10)),
+        )
+        self.assertEqual(self.slot.waitlist.count(), 10)
+
+class FormPageQueryBudgetTests(TestCase):
+    """Test that public form pages run a fixed number of queries"""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.volunteer_type = VolunteerType.objects.create(
+            name='Trash Duty',
+            description='Empty all trash cans',
+            credit_hours=0.5,
+        )
+        self.volunteer_form = VolunteerForm.objects.create(
+            title='Test Form',
+            description='Test Description',
+            created_by=self.user,
+        )
+    
+    def add_slots(self, count, signups_per_slot):
+        for i in range(count):
+            slot = VolunteerSlot.objects.create(
+                form=self.volunteer_form,
+                volunteer_type=self.volunteer_type,
+                title=f'Slot {i}',
+                date=date.today() + timedelta(days=i),
+                max_volunteers=signups_per_slot + 1,
+            )
+            for j in range(signups_per_slot):
+                VolunteerSignup(slot=slot, name=f'Volunteer {j}', email=f'v{j}@example.com').save()
+    
+    def assert_constant_queries(self, url_name):
+        url = reverse(url_name, kwargs={'unique_url': self.volunteer_form.unique_url})
+        self.add_slots(2, 1)
+        with self.assertNumQueries(3):
+            small = self.client.get(url)
+        self.add_slots(20, 3)
+        with self.assertNumQueries(3):
+            large = self.client.get(url)
+        self.assertEqual(small.status_code, 200)
+        self.assertEqual(large.status_code, 200)
+        return large
+    
+    def test_volunteer_form_view_query_budget(self):
+        """Form, slots with types, and signups are loaded in three queries"""
+        response = self.assert_constant_queries('signups:volunteer_form_view')
+        # 2 slots x 1 signup + 20 slots x 3 signups at 0.5 hours each
+        self.assertEqual(response.context['total_credit_hours'], 31)
+    
+    def test_form_summary_query_budget(self):
+        """The summary page uses the same fixed query budget"""
+        self.assert_constant_queries('signups:form_summary')
+
+
+
+
+class WaitlistTests(TestCase):
+    """Test joining a full slot's waitlist and promotion as seats free up"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.volunteer_form = VolunteerForm.objects.create(title='Test Form', description='D', created_by=self.user)
+        self.slot = VolunteerSlot.objects.create(
+            form=self.volunteer_form, title='Popular Slot', date=date(2025, 9, 1), max_volunteers=2,
+        )
+        self.signups = []
+        for name in ['Ann', 'Bob']:
+            signup = VolunteerSignup(slot=self.slot, name=name, email=f'{name.lower()}@example.com')
+            signup.save()
+            self.signups.append(signup)
+        self.url = reverse('signups:slot_detail', kwargs={
+            'unique_url': self.volunteer_form.unique_url, 'slot_id': self.slot.id,
+        })
+    
+    def wait(self, *names):
+        for name in names:
+            WaitlistEntry.objects.create(slot=self.slot, name=name, email=f'{name.lower()}@example.com')
+    
+    def signed_up(self):
+        return list(self.slot.signups.order_by('signed_up_at', 'id').values_list('name', flat=True))
+    
+    def test_full_slot_offers_waitlist(self):
+        self.wait('Cat')
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Join Waitlist')
+        self.assertContains(response, '1 person is already waiting')
+        
+        response = self.client.post(self.url, {'waitlist': '1', 'name': 'Dan', 'email': 'dan@example.com'}, follow=True)
+        self.assertContains(response, 'number 2 on the waitlist')
+        self.assertEqual(list(self.slot.waitlist.values_list('name', flat=True)), ['Cat', 'Dan'])
+    
+    def test_signup_race_loser_is_offered_waitlist(self):
+        """A signup that loses the last seat gets a prefilled waitlist form"""
+        VolunteerSlot.objects.filter(pk=self.slot.pk).update(max_volunteers=3, current_signups=3)
+        response = self.client.post(self.url, {'name': 'Eve', 'email': 'eve@example.com'})
+        self.assertContains(response, 'join the waitlist instead')
+        self.assertEqual(response.context['waitlist_form'].initial['email'], 'eve@example.com')
+    
+    def test_cancellation_promotes_first_in_line(self):
+        self.wait('Cat', 'Dan')
+        self.signups[0].delete()
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.current_signups, 2)
+        self.assertEqual(self.signed_up(), ['Bob', 'Cat'])
+        self.assertEqual(list(self.slot.waitlist.values_list('name', flat=True)), ['Dan'])
+        stats = FormStats.objects.get(pk=self.volunteer_form.pk)
+        self.assertEqual((stats.total_signups, stats.filled_slots), (2, 1))
+    
+    def test_bulk_cancellation_promotes_one_per_seat(self):
+        self.wait('Cat', 'Dan', 'Eve')
+        VolunteerSignup.objects.filter(slot=self.slot).delete()
+        self.assertEqual(self.signed_up(), ['Cat', 'Dan'])
+        self.assertEqual(self.slot.waitlist.count(), 1)
+    
+    def test_promotion_cost_does_not_grow_with_waitlist(self):
+        def cancel_and_count():
+            signup = self.slot.signups.first()
+            with CaptureQueriesContext(connection) as queries:
+                signup.delete()
+            return len(queries)
+        
+        self.wait('Cat')
+        short = cancel_and_count()
+        self.wait(*[f'Waiting{i}' for i in range(50)])
+        self.assertEqual(cancel_and_count(), short)
+    
+    def test_more_capacity_promotes_waitlist(self):
+        self.wait('Cat', 'Dan', 'Eve')
+        self.slot.max_volunteers = 4
+        self.slot.save()
+        self.assertEqual(self.signed_up(), ['Ann', 'Bob', 'Cat', 'Dan'])
+    
+    def test_joining_when_a_seat_is_free_signs_up(self):
+        """Someone joining the waitlist just after a seat frees up gets it"""
+        VolunteerSlot.objects.filter(pk=self.slot.pk).update(max_volunteers=3)
+        response = self.client.post(self.url, {'waitlist': '1', 'name': 'Dan', 'email': 'dan@example.com'}, follow=True)
+        self.assertContains(response, 'A spot opened up')
+        self.assertEqual(self.signed_up(), ['Ann', 'Bob', 'Dan'])
+        self.assertFalse(self.slot.waitlist.exists())
+
+class BatchSignupTests(TestCase):
+    """Test signing up for several slots of a form in one transaction"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.volunteer_form = VolunteerForm.objects.create(title='Test Form', description='D', created_by=self.user)
+        self.volunteer_type = VolunteerType.objects.create(name='Trash', description='D', credit_hours=Decimal('1.5'))
+        self.slots = [
+            VolunteerSlot.objects.create(
+                form=self.volunteer_form, title=f'Trash week {week}', date=date(2025, 9, 1) + timedelta(weeks=week),
+                volunteer_type=self.volunteer_type, max_volunteers=1,
+            )
+            for week in range(5)
+        ]
+        self.url = reverse('signups:batch_signup', kwargs={'unique_url': self.volunteer_form.unique_url})
+    
+    def fill(self, slot):
+        VolunteerSignup(slot=slot, name='Early Bird', email='early@example.com').save()
+    
+    def post(self, slots, **data):
+        data = {'name': 'Ann', 'email': 'Ann@Example.com', 'slots': [slot.pk for slot in slots], **data}
+        return self.client.post(self.url, data, follow=True)
+    
+    def test_form_page_links_selected_slots_to_batch_signup(self):
+        response = self.client.get(reverse('signups:volunteer_form_view', kwargs={'unique_url': self.volunteer_form.unique_url}))
+        self.assertContains(response, f'action="{self.url}"')
+        self.assertContains(response, f'name="slots" value="{self.slots[0].pk}" form="batch-signup"')
+        
+        response = self.client.get(self.url, {'slots': [self.slots[0].pk, self.slots[2].pk]})
+        self.assertEqual(list(response.context['slots']), [self.slots[0], self.slots[2]])
+        self.assertContains(response, 'Sign Up for 2 Slots')
+    
+    def test_selection_must_belong_to_form(self):
+        other_form = VolunteerForm.objects.create(title='Other', description='D', created_by=self.user)
+        other_slot = VolunteerSlot.objects.create(form=other_form, title='Other', date=date(2025, 9, 1))
+        for slots in ([], [other_slot.pk], ['nope']):
+            response = self.client.get(self.url, {'slots': slots}, follow=True)
+            self.assertContains(response, 'tick at least one open slot')
+        self.post([self.slots[0], other_slot])
+        self.assertFalse(VolunteerSignup.objects.exists())
+    
+    def test_signs_up_for_every_slot_in_one_transaction(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(self.slots)
+        self.assertContains(response, 'Successfully signed up for Trash week 0 (Sep 1), Trash week 1 (Sep 8)')
+        writes = [q['sql'] for q in queries if q['sql'].startswith(('INSERT', 'UPDATE'))]
+        self.assertEqual(len(writes), 3)  # Claim the seats, insert the signups, count them in the stats
+        
+        signups = VolunteerSignup.objects.filter(email_normalized='ann@example.com')
+        self.assertEqual(signups.count(), 5)
+        self.assertFalse(VolunteerSlot.objects.drifted().exists())
+        stats = FormStats.objects.get(pk=self.volunteer_form.pk)
+        self.assertEqual(
+            (stats.total_signups, stats.filled_slots, stats.credit_hours),
+            (5, 5, Decimal('7.5')),
+        )
+        FormStats.objects.rebuild()
+        stats.refresh_from_db()
+        self.assertEqual((stats.total_signups, stats.filled_slots, stats.credit_hours), (5, 5, Decimal('7.5')))
+    
+    def test_all_or_nothing_claims_nothing_when_a_slot_is_full(self):
+        self.fill(self.slots[3])
+        response = self.post(self.slots)
+        self.assertContains(response, 'Trash week 3 (Sep 22) is already full')
+        self.assertFalse(VolunteerSignup.objects.filter(name='Ann').exists())
+        self.assertEqual(
+            list(VolunteerSlot.objects.order_by('date').values_list('current_signups', flat=True)),
+            [0, 0, 0, 1, 0],
+        )
+    
+    def test_partial_mode_signs_up_for_open_slots(self):
+        self.fill(self.slots[3])
+        response = self.post(self.slots, partial='on')
+        self.assertContains(response, 'Trash week 3 (Sep 22) filled up first')
+        self.assertEqual(
+            sorted(VolunteerSignup.objects.filter(name='Ann').values_list('slot__title', flat=True)),
+            ['Trash week 0', 'Trash week 1', 'Trash week 2', 'Trash week 4'],
+        )
+        self.assertEqual(FormStats.objects.get(pk=self.volunteer_form.pk).filled_slots, 5)
+    
+    def test_partial_mode_fails_when_every_slot_is_full(self):
+        self.fill(self.slots[0])
+        with self.assertRaises(SlotFullError) as raised:
+            VolunteerSignup.objects.create_for_slots([self.slots[0]], partial=True, name='Ann', email='ann@example.com')
+        self.assertEqual(raised.exception.slot_ids, [self.slots[0].pk])
+
+
+class SignupCounterReconciliationTests(TestCase):
+    """Test that current_signups survives bulk operations and can be reconciled"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.volunteer_form = VolunteerForm.objects.create(title='Test Form', description='D', created_by=self.user)
+        self.slots = [
+            VolunteerSlot.objects.create(
+                form=self.volunteer_form, title=f'Slot {i}', date=date(2025, 9, 1 + i), max_volunteers=5,
+            )
+            for i in range(3)
+        ]
+        for slot in self.slots:
+            for j in range(3):
+                VolunteerSignup(slot=slot, name=f'V{j}', email=f'v{j}@example.com').save()
+    
+    def counts(self):
+        return list(VolunteerSlot.objects.order_by('date').values_list('current_signups', flat=True))
+    
+    def test_queryset_delete_releases_seats(self):
+        """Bulk deletes (as the admin's delete action does) keep every counter right"""
+        VolunteerSignup.objects.filter(name__in=['V0', 'V1'], slot__in=self.slots[:2]).delete()
+        self.assertEqual(self.counts(), [1, 1, 3])
+        self.slots[2].signups.all().delete()
+        self.assertEqual(self.counts(), [1, 1, 0])
+    
+    def test_cascade_delete_does_not_touch_counters(self):
+        """Deleting a slot removes its signups without per-signup counter updates"""
+        with CaptureQueriesContext(connection) as queries:
+            self.slots[0].delete()
+        self.assertFalse(any(query['sql'].startswith('UPDATE "signups_volunteerslot"') for query in queries))
+        self.assertEqual(self.counts(), [3, 3])
+    
+    def test_reconcile_fixes_all_drift_in_one_update(self):
+        VolunteerSlot.objects.filter(pk=self.slots[0].pk).update(current_signups=5)
+        VolunteerSlot.objects.filter(pk=self.slots[1].pk).update(current_signups=0)
+        self.assertEqual(VolunteerSlot.objects.drifted().count(), 2)
+        with self.assertNumQueries(1):
+            fixed = VolunteerSlot.objects.reconcile_signup_counts()
+        self.assertEqual(fixed, 2)
+        self.assertEqual(self.counts(), [3, 3, 3])
+    
+    def test_raw_fixture_signups_are_counted(self):
+        """Signups loaded with raw saves (loaddata) recount their slot"""
+        slot = self.slots[0]
+        VolunteerSignup.objects.filter(slot=slot).delete()
+        signup = VolunteerSignup(slot=slot, name='Fixture', email='fixture@example.com', signed_up_at=timezone.now())
+        signup.save_base(raw=True)
+        slot.refresh_from_db()
+        self.assertEqual(slot.current_signups, 1)
+    
+    def test_command_check_reports_without_fixing(self):
+        VolunteerSlot.objects.filter(pk=self.slots[0].pk).update(current_signups=1)
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('reconcile_signup_counts', '--check', stdout=out)
+        self.assertIn('current_signups is 1, 3 signup(s) exist', out.getvalue())
+        self.assertEqual(self.counts(), [1, 3, 3])
+        
+        call_command('reconcile_signup_counts', stdout=out)
+        self.assertIn('Reconciled 1 drifted slot(s)', out.getvalue())
+        call_command('reconcile_signup_counts', '--check', stdout=out)
+        self.assertIn('No drifted slots found', out.getvalue())
+
+
+class FormStatsTests(TestCase):
+    """Test that the per-form stats row is kept in step with slots and signups"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.volunteer_type = VolunteerType.objects.create(name='Setup', description='S', credit_hours=Decimal('1.5'))
+        self.volunteer_form = VolunteerForm.objects.create(title='Test Form', description='D', created_by=self.user)
+        self.slot = VolunteerSlot.objects.create(
+            form=self.volunteer_form, volunteer_type=self.volunteer_type,
+            title='Slot', date=date(2025, 9, 1), max_volunteers=2,
+        )
+        VolunteerSlot.objects.create(form=self.volunteer_form, title='Untyped', date=date(2025, 9, 2))
+    
+    def stats(self):
+        return FormStats.objects.values_list('total_slots', 'filled_slots', 'total_signups', 'credit_hours').get(
+            pk=self.volunteer_form.pk
+        )
+    
+    def assert_matches_rebuild(self):
+        """The incrementally maintained row equals a from-scratch rebuild"""
+        maintained = self.stats()
+        FormStats.objects.rebuild()
+        self.assertEqual(maintained, self.stats())
+        return maintained
+    
+    def test_signups_update_stats_incrementally(self):
+        first = VolunteerSignup(slot=self.slot, name='A', email='a@example.com')
+        first.save()
+        self.assertEqual(self.assert_matches_rebuild(), (2, 0, 1, Decimal('1.5')))
+        with self.assertNumQueries(6):  # Savepoint, claim seat, refresh, insert, stats, release
+            VolunteerSignup(slot=self.slot, name='B', email='b@example.com').save()
+        self.assertEqual(self.assert_matches_rebuild(), (2, 1, 2, Decimal('3')))
+        first.delete()
+        self.assertEqual(self.assert_matches_rebuild(), (2, 0, 1, Decimal('1.5')))
+        VolunteerSignup.objects.all().delete()
+        self.assertEqual(self.assert_matches_rebuild(), (2, 0, 0, 0))
+    
+    def test_slot_and_type_edits_recompute_stats(self):
+        VolunteerSignup(slot=self.slot, name='A', email='a@example.com').save()
+        self.slot.max_volunteers = 1
+        self.slot.save()
+        self.assertEqual(self.stats(), (2, 1, 1, Decimal('1.5')))
+        self.volunteer_type.credit_hours = Decimal('2.25')
+        self.volunteer_type.save()
+        self.assertEqual(self.stats(), (2, 1, 1, Decimal('2.25')))
+        self.volunteer_type.delete()
+        self.assertEqual(self.stats(), (2, 1, 1, 0))
+        self.slot.delete()
+        self.assertEqual(self.stats(), (1, 0, 0, 0))
+    
+    def test_summary_reads_stats_row(self):
+        VolunteerSignup(slot=self.slot, name='A', email='a@example.com').save()
+        FormStats.objects.filter(pk=self.volunteer_form.pk).update(credit_hours=Decimal('9'))
+        cache.clear()
+        response = self.client.get(reverse('signups:form_summary', kwargs={'unique_url': self.volunteer_form.unique_url}))
+        self.assertEqual(response.context['total_credit_hours'], Decimal('9'))
+        self.assertContains(response, '<strong>Slots Filled:</strong> 0 of 2', html=False)
+    
+    def test_rebuild_command_adds_missing_rows(self):
+        FormStats.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_form_stats', stdout=out)
+        self.assertIn('Rebuilt stats for 1 form(s) (1 new)', out.getvalue())
+        self.assertEqual(self.stats(), (2, 0, 0, 0))
+
+
+@override_settings(SIGNUPS_SLOTS_PER_PAGE=5)
+class SlotPaginationTests(TestCase):
+    """Test keyset pagination and date-range filtering of form pages"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.volunteer_form = VolunteerForm.objects.create(title='Test Form', description='D', created_by=self.user)
+        self.today = timezone.localdate()
+        # Several slots share a date and title, so the id must break ties
+        VolunteerSlot.objects.bulk_create([
+            VolunteerSlot(form=self.volunteer_form, title=f'Shift {i % 2}', date=self.today + timedelta(days=i // 4 * 7))
+            for i in range(24)
+        ])
+        VolunteerSlot.objects.create(form=self.volunteer_form, title='Past', date=self.today - timedelta(days=40))
+    
+    def url(self, name='signups:volunteer_form_view'):
+        return reverse(name, kwargs={'unique_url': self.volunteer_form.unique_url})
+    
+    def walk(self, name, **params):
+        """Follow the cursors through every page, returning slot ids in order"""
+        seen = []
+        while True:
+            response = self.client.get(self.url(name), params)
+            self.assertEqual(response.status_code, 200)
+            page = response.context['page']
+            seen.extend(slot.pk for slot in page.slots)
+            if not page.has_more:
+                return seen
+            params = {**params, 'after': page.next_cursor}
+    
+    def test_pages_cover_every_slot_once_in_order(self):
+        expected = list(
+            VolunteerSlot.objects.filter(form=self.volunteer_form).order_by('date', 'title', 'id').values_list('pk', flat=True)
+        )
+        self.assertEqual(self.walk('signups:volunteer_form_view'), expected)
+        self.assertEqual(self.walk('signups:form_summary'), expected)
+    
+    def test_date_ranges(self):
+        within = lambda days: VolunteerSlot.objects.filter(
+            form=self.volunteer_form, date__gte=self.today, date__lte=self.today + timedelta(days=days),
+        ).count()
+        self.assertEqual(len(self.walk('signups:volunteer_form_view', range='upcoming')), 24)
+        self.assertEqual(len(self.walk('signups:volunteer_form_view', range='next-4-weeks')), within(28))
+        this_month = self.walk('signups:form_summary', range='this-month')
+        self.assertTrue(all(
+            slot.date.month == self.today.month for slot in VolunteerSlot.objects.filter(pk__in=this_month)
+        ))
+        self.assertEqual(self.client.get(self.url(), {'range': 'someday'}).status_code, 400)
+    
+    def test_deep_pages_cost_the_same(self):
+        """Later pages run the same queries and are about the size of the first"""
+        with self.assertNumQueries(3):
+            first = self.client.get(self.url())
+        cursor = first.context['page'].next_cursor
+        for _ in range(3):
+            with self.assertNumQueries(3):
+                response = self.client.get(self.url(), {'after': cursor})
+            cursor = response.context['page'].next_cursor
+        self.assertLess(abs(len(response.content) - len(first.content)), len(first.content) // 10)
+    
+    def test_load_more_fragment(self):
+        """The fragment holds only the next slots and the following Load more link"""
+        page = self.client.get(self.url()).context['page']
+        response = self.client.get(self.url(), {'after': page.next_cursor, 'fragment': '1'})
+        content = response.content.decode()
+        self.assertNotIn('<html', content)
+        self.assertEqual(content.count('class="slot-card"'), 5)
+        self.assertIn(f"after={response.context['page'].next_cursor}", content)
+    
+    def test_invalid_cursor_is_bad_request(self):
+        self.assertEqual(self.client.get(self.url(), {'after': 'not-a-cursor'}).status_code, 400)
+
+class CreditHourAggregationTests(TestCase):
+    """Test that credit hour totals are computed by the database"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.mowing = VolunteerType.objects.create(name='Lawn Mowing', description='Mow', credit_hours=1.5)
+        self.towels = VolunteerType.objects.create(name='Towel Washing', description='Wash', credit_hours=0.5)
+        self.form_a = VolunteerForm.objects.create(title='Form A', description='A', created_by=self.user)
+        self.form_b = VolunteerForm.objects.create(title='Form B', description='B', created_by=self.user)
+        self.mow_slot = self.make_slot(self.form_a, self.mowing)
+        self.towel_slot = self.make_slot(self.form_a, self.towels)
+        self.untyped_slot = self.make_slot(self.form_b, None)
+        self.other_mow_slot = self.make_slot(self.form_b, self.mowing)
+        self.sign_up(self.mow_slot, 'ann@example.com')
+        self.sign_up(self.mow_slot, 'bob@example.com')
+        self.sign_up(self.towel_slot, 'Ann@Example.com')
+        self.sign_up(self.untyped_slot, 'ann@example.com')
+        self.sign_up(self.other_mow_slot, 'ann@example.com')
+    
+    def make_slot(self, form, volunteer_type):
+        return VolunteerSlot.objects.create(
+            form=form,
+            volunteer_type=volunteer_type,
+            title=f'{form.title} slot',
+            date=date.today(),
+            max_volunteers=5,
+        )
+    
+    def sign_up(self, slot, email):
+        VolunteerSignup(slot=slot, name=email.split('@')[0], email=email).save()
+    
+    def test_form_totals(self):
+        """Form totals match the per-signup sum, annotated or aggregated"""
+        self.assertEqual(self.form_a.get_total_credit_hours(), Decimal('3.50'))
+        self.assertEqual(self.form_b.get_total_credit_hours(), Decimal('1.50'))
+        with self.assertNumQueries(1):
+            totals = {form.title: form.get_total_credit_hours() for form in VolunteerForm.objects.with_credit_hours()}
+        self.assertEqual(totals, {'Form A': Decimal('3.50'), 'Form B': Decimal('1.50')})
+    
+    def test_form_without_signups_totals_zero(self):
+        """Forms with no signups annotate to zero rather than None"""
+        empty = VolunteerForm.objects.create(title='Empty', description='E', created_by=self.user)
+        self.assertEqual(VolunteerForm.objects.with_credit_hours().get(pk=empty.pk).total_credit_hours, 0)
+    
+    def test_slot_totals(self):
+        """Slot totals are annotated, including zero for untyped slots"""
+        totals = {slot.pk: slot.get_total_credit_hours() for slot in VolunteerSlot.objects.with_credit_hours()}
+        self.assertEqual(totals[self.mow_slot.pk], Decimal('3.00'))
+        self.assertEqual(totals[self.towel_slot.pk], Decimal('0.50'))
+        self.assertEqual(totals[self.untyped_slot.pk], 0)
+    
+    def test_signup_annotation(self):
+        """Annotated signups report credit hours without loading their slot"""
+        with self.assertNumQueries(1):
+            hours = sorted(signup.get_credit_hours() for signup in VolunteerSignup.objects.with_credit_hours())
+        self.assertEqual(hours, [0, Decimal('0.50'), Decimal('1.50'), Decimal('1.50'), Decimal('1.50')])
+    
+    def test_rollup_by_type(self):
+        """Credit hours are grouped per volunteer type"""
+        rows = {row['slot__volunteer_type__name']: row for row in VolunteerSignup.objects.credit_hours_by_type()}
+        self.assertEqual(rows['Lawn Mowing']['credit_hours'], Decimal('4.50'))
+        self.assertEqual(rows['Lawn Mowing']['signups'], 3)
+        self.assertEqual(rows['Towel Washing']['credit_hours'], Decimal('0.50'))
+        self.assertEqual(rows[None]['credit_hours'], 0)
+    
+    def test_rollup_by_email_across_forms(self):
+        """Per-volunteer totals span forms and ignore email case"""
+        rows = {row['volunteer_email']: row for row in VolunteerSignup.objects.credit_hours_by_email()}
+        self.assertEqual(set(rows), {'ann@example.com', 'bob@example.com'})
+        self.assertEqual(rows['ann@example.com']['signups'], 4)
+        self.assertEqual(rows['ann@example.com']['credit_hours'], Decimal('3.50'))
+        self.assertEqual(rows['bob@example.com']['credit_hours'], Decimal('1.50'))
+    
+    def test_credit_report_command(self):
+        """The credit report prints one line per volunteer and a grand total"""
+        out = StringIO()
+        call_command('credit_report', '--by', 'email', stdout=out)
+        output = out.getvalue()
+        self.assertIn('ann@example.com: 3.50 hours (4 signup(s))', output)
+        self.assertIn('Total: 5.00 hours across 2 email group(s)', output)
+
+
+class FormPageCacheTests(TestCase):
+    """Test that public form pages are cached until their form changes"""
+    
+    def setUp(self):
+        cache.clear()
+        reset_page_cache_stats()
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.volunteer_form = VolunteerForm.objects.create(
+            title='Test Form',
+            description='Test Description',
+            created_by=self.user,
+        )
+        self.slot = VolunteerSlot.objects.create(
+            form=self.volunteer_form,
+            title='Test Slot',
+            date=date.today() + timedelta(days=7),
+            max_volunteers=5,
+        )
+        self.url = reverse('signups:volunteer_form_view', kwargs={'unique_url': self.volunteer_form.unique_url})
+    
+    def test_repeat_get_is_served_from_cache(self):
+        """The second anonymous GET runs no queries"""
+        first = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(first['X-Page-Cache'], 'miss')
+        self.assertEqual(second['X-Page-Cache'], 'hit')
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(get_page_cache_stats(), {'hits': 1, 'misses': 1})
+    
+    def test_signup_invalidates_page(self):
+        """A new signup shows up on the next request"""
+        self.client.get(self.url)
+        VolunteerSignup(slot=self.slot, name='New Volunteer', email='new@example.com').save()
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'New Volunteer')
+    
+    def test_slot_and_form_edits_invalidate_page(self):
+        """Admin edits to the slot or form are never hidden by the cache"""
+        self.client.get(self.url)
+        self.slot.title = 'Renamed Slot'
+        self.slot.save()
+        self.assertContains(self.client.get(self.url), 'Renamed Slot')
+        self.volunteer_form.is_active = False
+        self.volunteer_form.save()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+    
+    def test_volunteer_type_edit_invalidates_all_forms(self):
+        """Changing a volunteer type refreshes every form page"""
+        volunteer_type = VolunteerType.objects.create(name='Mowing', description='Mow', credit_hours=1)
+        self.slot.volunteer_type = volunteer_type
+        self.slot.save()
+        self.client.get(self.url)
+        volunteer_type.credit_hours = 2.5
+        volunteer_type.save()
+        self.assertContains(self.client.get(self.url), '2.50 hours')
+    
+    def test_date_range_pages_expire_at_midnight(self):
+        """Relative date ranges are cached per day, so yesterday's slots drop off"""
+        VolunteerSlot.objects.create(form=self.volunteer_form, title='Today Slot', date=date.today(), max_volunteers=1)
+        self.assertContains(self.client.get(self.url, {'range': 'upcoming'}), 'Today Slot')
+        self.assertEqual(self.client.get(self.url, {'range': 'upcoming'})['X-Page-Cache'], 'hit')
+        with mock.patch('django.utils.timezone.localdate', return_value=date.today() + timedelta(days=1)):
+            response = self.client.get(self.url, {'range': 'upcoming'})
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertNotContains(response, 'Today Slot')
+    
+    def test_summary_is_cached_separately(self):
+        """The summary page has its own cache entry for the same form"""
+        summary_url = reverse('signups:form_summary', kwargs={'unique_url': self.volunteer_form.unique_url})
+        self.client.get(self.url)
+        self.assertEqual(self.client.get(summary_url)['X-Page-Cache'], 'miss')
+        self.assertEqual(self.client.get(summary_url)['X-Page-Cache'], 'hit')
+    
+    def test_requests_with_messages_bypass_cache(self):
+        """Flash messages after a signup are never served from or stored in the cache"""
+        self.client.get(self.url)
+        detail_url = reverse('signups:slot_detail', kwargs={
+            'unique_url': self.volunteer_form.unique_url,
+            'slot_id': self.slot.id
+        })
+        response = self.client.post(detail_url, {'name': 'Flash', 'email': 'flash@example.com'}, follow=True)
+        self.assertContains(response, 'Successfully signed up')
+        self.assertNotContains(self.client.get(self.url), 'Successfully signed up')
+
+
+class SlotCardCacheTests(TestCase):
+    """Test that slot cards are cached per slot and re-rendered only when their slot changes"""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.volunteer_form = VolunteerForm.objects.create(
+            title='Test Form',
+            description='Test Description',
+            created_by=self.user,
+        )
+        self.slots = [
+            VolunteerSlot.objects.create(
+                form=self.volunteer_form,
+                title=f'Slot {i}',
+                date=date.today() + timedelta(days=i),
+                max_volunteers=5,
+            )
+            for i in range(5)
+        ]
+        self.url = reverse('signups:volunteer_form_view', kwargs={'unique_url': self.volunteer_form.unique_url})
+    
+    def card_renders(self, response):
+        return [t.name for t in response.templates].count('signups/slot_card.html')
+    
+    def test_new_signup_rerenders_one_card(self):
+        """Only the card of the slot signed up for is rendered again"""
+        self.assertEqual(self.card_renders(self.client.get(self.url)), 5)
+        VolunteerSignup(slot=self.slots[2], name='New Volunteer', email='new@example.com').save()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertEqual(self.card_renders(response), 1)
+        self.assertContains(response, 'New Volunteer')
+        self.assertContains(response, 'Slot 4')
+        # Form, slots, and the signups of the one changed slot
+        self.assertEqual(len(queries), 3)
+        self.assertIn(f'IN ({self.slots[2].pk})', queries[-1]['sql'])
+    
+    def test_cards_are_not_cached_in_a_database_cache(self):
+        """Card keys would each cost several queries on the database cache backend"""
+        slots = list(VolunteerSlot.objects.filter(form=self.volunteer_form))
+        database_cache = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cards'}}
+        with override_settings(CACHES=database_cache), CaptureQueriesContext(connection) as queries:
+            cards = render_slot_cards(slots, 'signups/slot_card.html', self.volunteer_form)
+        self.assertEqual(len(cards), 5)
+        self.assertEqual(len(queries), 1)  # Only the signups prefetch
+    
+    def test_signup_changes_bump_slot_version(self):
+        """Claiming, editing and releasing a seat each change the slot's version"""
+        slot = self.slots[0]
+        versions = [slot.version]
+        signup = VolunteerSignup(slot=slot, name='Volunteer', email='v@example.com')
+        signup.save()
+        versions.append(VolunteerSlot.objects.get(pk=slot.pk).version)
+        signup.name = 'Renamed Volunteer'
+        signup.save()
+        versions.append(VolunteerSlot.objects.get(pk=slot.pk).version)
+        signup.delete()
+        versions.append(VolunteerSlot.objects.get(pk=slot.pk).version)
+        self.assertEqual(len(set(versions)), 4)
+    
+    def test_saving_stale_slot_never_reuses_version(self):
+        """A slot saved from an out-of-date copy still gets a new version"""
+        stale = VolunteerSlot.objects.get(pk=self.slots[0].pk)
+        self.slots[0].title = 'Renamed Slot'
+        self.slots[0].save()
+        stale.description = 'Edited elsewhere'
+        stale.save()
+        self.assertEqual(stale.version, 2)
+        self.assertEqual(VolunteerSlot.objects.get(pk=stale.pk).version, 2)
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Edited elsewhere')
+
+
+@override_settings(SIGNUPS_PROFILING=True)
+class ProfilingMiddlewareTests(TestCase):
+    """Test the optional per-request profiling middleware"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.volunteer_form = VolunteerForm.objects.create(title='Test Form', description='D', created_by=self.user)
+        VolunteerSlot.objects.create(form=self.volunteer_form, title='Test Slot', date=date.today(), max_volunteers=5)
+        self.url = reverse('signups:volunteer_form_view', kwargs={'unique_url': self.volunteer_form.unique_url})
+        # As apps.ready does at startup when profiling is on
+        install_query_recorder()
+        self.addCleanup(connection_created.disconnect, dispatch_uid='signups.profiling')
+        self.addCleanup(lambda: connection.execute_wrappers.remove(profiling._record_query))
+    
+    def timings(self, response):
+        return {
+            name: dict(param.split('=', 1) for param in params)
+            for name, *params in (metric.split(';') for metric in response['Server-Timing'].split(', '))
+        }
+    
+    def test_reports_queries_templates_and_cache(self):
+        with self.assertLogs('signups.profiling', 'INFO') as logs:
+            with CaptureQueriesContext(connection) as queries:
+                first = self.client.get(self.url)
+            query_count = len(queries)
+            second = self.client.get(self.url)
+        
+        timings = self.timings(first)
+        self.assertEqual(timings['db']['desc'], f'"{query_count} queries"')
+        self.assertGreater(float(timings['tpl']['dur']), 0)
+        self.assertEqual(timings['cache']['desc'], '"miss"')
+        self.assertGreaterEqual(
+            float(timings['total']['dur']) + 0.2,
+            sum(float(timings[name]['dur']) for name in ('db', 'tpl', 'view')),
+        )
+        self.assertEqual(self.timings(second)['db']['desc'], '"0 queries"')
+        self.assertEqual(self.timings(second)['cache']['desc'], '"hit"')
+        
+        self.assertEqual(len(logs.records), 2)
+        profile = logs.records[0].profile
+        self.assertEqual((profile['path'], profile['status'], profile['sql_count']), (self.url, 200, query_count))
+        self.assertIn(f'path={self.url} status=200', logs.output[0])
+    
+    async def test_async_requests_are_profiled(self):
+        with self.assertLogs('signups.profiling', 'INFO'):
+            response = await self.async_client.get(self.url)
+        self.assertNotEqual(self.timings(response)['db']['desc'], '"0 queries"')
+    
+    async def test_async_view_queries_in_other_threads_are_counted(self):
+        """Async views query from sync_to_async threads, on connections of their own"""
+        unique_url = self.volunteer_form.unique_url
+        
+        async def get_response(request):
+            return await views.async_form_summary(request, unique_url)
+        
+        with self.assertLogs('signups.profiling', 'INFO') as logs:
+            response = await ProfilingMiddleware(get_response)(AsyncRequestFactory().get(self.url))
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(logs.records[0].profile['sql_count'], 0)
+        self.assertNotEqual(self.timings(response)['db']['desc'], '"0 queries"')
+    
+    @override_settings(SIGNUPS_PROFILING=False)
+    def test_disabled_middleware_is_not_loaded(self):
+        response = self.client.get(self.url)
+        self.assertNotIn('Server-Timing', response)
+
+
+class SlowQueryLogTests(TestCase):
+    """Test the opt-in slow-query log and its report command"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.volunteer_form = VolunteerForm.objects.create(title='Test Form', description='D', created_by=self.user)
+        log_file = tempfile.NamedTemporaryFile(suffix='.jsonl', delete=False)
+        log_file.close()
+        self.addCleanup(os.unlink, log_file.name)
+        self.path = log_file.name
+    
+    def run_logged(self, threshold_ms, queries):
+        with self.assertLogs('signups.slow_queries', 'WARNING') as logs:
+            with connection.execute_wrapper(SlowQueryLog(threshold_ms, self.path)):
+                queries()
+        return logs
+    
+    def test_same_query_shapes_share_a_fingerprint(self):
+        self.assertEqual(
+            normalize_sql('SELECT * FROM "t1" WHERE "id" IN (%s, %s, %s) AND "name" = \'x\' LIMIT 21'),
+            'SELECT * FROM "t1" WHERE "id" IN (...) AND "name" = ? LIMIT ?',
+        )
+        self.assertEqual(
+            fingerprint('INSERT INTO "t" ("a", "b") VALUES (%s, %s), (%s, %s)'),
+            fingerprint('INSERT INTO "t" ("a", "b") VALUES (%s, %s)'),
+        )
+        self.assertNotEqual(fingerprint('SELECT "a" FROM "t"'), fingerprint('SELECT "b" FROM "t"'))
+    
+    def test_logs_sql_params_caller_and_plan(self):
+        def queries():
+            list(VolunteerSlot.objects.filter(form=self.volunteer_form, pk__in=[1, 2]))
+            list(VolunteerSlot.objects.filter(form=self.volunteer_form, pk__in=[3, 4, 5]))
+        
+        logs = self.run_logged(0, queries)
+        records = read_log(self.path)
+        self.assertEqual(len(records), 2)
+        self.assertEqual(len(logs.records), 2)
+        self.assertEqual(records[0]['fingerprint'], records[1]['fingerprint'])
+        self.assertEqual(records[1]['params'], [str(self.volunteer_form.pk), '3', '4', '5'])
+        self.assertEqual(records[0]['caller'], 'manage.py test')
+        self.assertRegex(records[0]['location'], r'^signups/tests\.py:\d+ in queries$')
+        self.assertIn('signups_volunteerslot', records[0]['plan'])
+        
+        group, = summarise(records)
+        self.assertEqual(group['count'], 2)
+        self.assertAlmostEqual(group['total_ms'], records[0]['duration_ms'] + records[1]['duration_ms'])
+    
+    def test_fast_queries_are_not_logged(self):
+        with connection.execute_wrapper(SlowQueryLog(60_000, self.path)):
+            list(VolunteerSlot.objects.all())
+        self.assertEqual(read_log(self.path), [])
+    
+    @override_settings(SIGNUPS_PROFILING=True)
+    def test_survives_profiling_of_the_request_that_connects(self):
+        """A connection opened during a profiled request keeps its slow-query log"""
+        with override_settings(SIGNUPS_SLOW_QUERY_MS=0, SIGNUPS_SLOW_QUERY_LOG=self.path):
+            install_slow_query_log()
+        self.addCleanup(connection_created.disconnect, dispatch_uid='signups.slow_queries')
+        wrappers = list(connection.execute_wrappers)
+        self.addCleanup(setattr, connection, 'execute_wrappers', wrappers)
+        
+        with RequestProfile().activate():
+            # As if the request opened the connection lazily
+            connection_created.send(sender=type(connection), connection=connection)
+        self.assertEqual(len(connection.execute_wrappers), len(wrappers) + 1)
+        self.assertIsInstance(connection.execute_wrappers[0], SlowQueryLog)
+        self.addCleanup(connection_created.disconnect, dispatch_uid='signups.profiling')
+        with self.assertLogs('signups.slow_queries', 'WARNING'):
+            self.client.get(reverse('signups:volunteer_form_view', kwargs={'unique_url': self.volunteer_form.unique_url}))
+        self.assertIsInstance(connection.execute_wrappers[0], SlowQueryLog)
+        self.assertEqual(sum(isinstance(wrapper, SlowQueryLog) for wrapper in connection.execute_wrappers), 1)
+        self.assertTrue(read_log(self.path))
+    
+    @override_settings(SIGNUPS_PROFILING=True, SIGNUPS_SLOW_QUERY_MS=0)
+    def test_caller_is_the_view_not_the_instrumentation(self):
+        """Requests record their view name, and profiling frames are skipped"""
+        self.addCleanup(connection_created.disconnect, dispatch_uid='signups.profiling')
+        self.addCleanup(setattr, connection, 'execute_wrappers', list(connection.execute_wrappers))
+        url = reverse('signups:form_summary', kwargs={'unique_url': self.volunteer_form.unique_url})
+        with self.assertLogs('signups.slow_queries', 'WARNING'):
+            with connection.execute_wrapper(SlowQueryLog(0, self.path)):
+                Client().get(url)
+        records = read_log(self.path)
+        self.assertEqual({record['caller'] for record in records}, {'signups:form_summary'})
+        self.assertFalse([record for record in records if 'profiling.py' in (record['location'] or '')])
+    
+    def test_failed_explain_leaves_the_transaction_usable(self):
+        self.assertIsNone(explain(connection, 'SELECT * FROM "no_such_table"', ()))
+        self.assertTrue(VolunteerForm.objects.filter(pk=self.volunteer_form.pk).exists())
+    
+    def test_command_lists_top_offenders(self):
+        def queries():
+            for _ in range(3):
+                VolunteerForm.objects.filter(pk=self.volunteer_form.pk).exists()
+            list(VolunteerSlot.objects.all())
+        
+        self.run_logged(0, queries)
+        with open(self.path, 'a') as log:
+            log.write('{"truncated')
+        out = StringIO()
+        call_command('slow_queries', log=self.path, sort='count', limit=1, plans=True, stdout=out)
+        output = out.getvalue()
+        self.assertIn('1. [', output)
+        self.assertIn('3 call(s)', output)
+        self.assertIn('Called from: manage.py test (3)', output)
+        self.assertIn('At: signups/tests.py:', output)
+        self.assertIn('FROM "signups_volunteerform"', output)
+        self.assertNotIn('FROM "signups_volunteerslot"', output)
+        self.assertIn('4 slow queries in 2 shape(s)', output)
+        
+        call_command('slow_queries', log=self.path, clear=True, stdout=StringIO())
+        out = StringIO()
+        call_command('slow_queries', log=self.path, stdout=out)
+        self.assertIn('No slow queries logged', out.getvalue())
+
+
+class MetricsTests(TestCase):
+    """Test the metrics registry, its instrumentation and its endpoint"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.volunteer_form = VolunteerForm.objects.create(title='Test Form', description='D', created_by=self.user)
+        self.slot = VolunteerSlot.objects.create(
+            form=self.volunteer_form, title='Test Slot', date=date.today(), max_volunteers=1,
+        )
+        self.slot_url = reverse('signups:slot_detail', kwargs={
+            'unique_url': self.volunteer_form.unique_url, 'slot_id': self.slot.pk,
+        })
+    
+    def value(self, name, **labels):
+        return metrics.registry.value(name, **labels) or 0
+    
+    def test_public_views_count_requests_and_latency(self):
+        before = self.value('signups_requests_total', view='volunteer_slot_detail', method='GET', status=200)
+        latency = metrics.registry.value('signups_request_duration_seconds', view='volunteer_slot_detail')
+        self.client.get(self.slot_url)
+        self.assertEqual(
+            self.value('signups_requests_total', view='volunteer_slot_detail', method='GET', status=200), before + 1,
+        )
+        self.assertEqual(
+            metrics.registry.value('signups_request_duration_seconds', view='volunteer_slot_detail')[-1],
+            (latency[-1] if latency else 0) + 1,
+        )
+        
+        missing = reverse('signups:volunteer_form_view', kwargs={'unique_url': 'missing'})
+        before = self.value('signups_requests_total', view='volunteer_form_view', method='GET', status=404)
+        self.client.get(missing)
+        self.assertEqual(
+            self.value('signups_requests_total', view='volunteer_form_view', method='GET', status=404), before + 1,
+        )
+    
+    def test_signup_outcomes_and_model_counters(self):
+        outcomes = ['signed_up', 'full', 'invalid']
+        before = {outcome: self.value('signups_slot_signup_attempts_total', outcome=outcome) for outcome in outcomes}
+        created, filled, deleted = (self.value(name) for name in (
+            'signups_created_total', 'signups_slots_filled_total', 'signups_deleted_total',
+        ))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.slot_url, {'name': 'Ann', 'email': 'ann@example.com'})
+            self.client.post(self.slot_url, {'name': 'Bob', 'email': 'bob@example.com'})
+            self.client.post(self.slot_url, {'name': '', 'email': 'nope'})
+        self.assertEqual(
+            {outcome: self.value('signups_slot_signup_attempts_total', outcome=outcome) - before[outcome] for outcome in outcomes},
+            {'signed_up': 1, 'full': 1, 'invalid': 1},
+        )
+        self.assertEqual(self.value('signups_created_total'), created + 1)
+        self.assertEqual(self.value('signups_slots_filled_total'), filled + 1)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            VolunteerSignup.objects.filter(slot=self.slot).delete()
+        self.assertEqual(self.value('signups_deleted_total'), deleted + 1)
+    
+    def test_endpoint_requires_staff(self):
+        url = reverse('signups:metrics')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.get(self.slot_url)
+        
+        admin = User.objects.create_user(username='admin', password='adminpass', is_staff=True)
+        self.client.force_login(admin)
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        self.assertContains(response, '# TYPE signups_requests_total counter')
+        self.assertContains(response, 'signups_requests_total{view="volunteer_slot_detail",method="GET",status="200"} ')
+        self.assertContains(response, 'signups_request_duration_seconds_bucket{view="volunteer_slot_detail",le="+Inf"} ')
+    
+    def test_workers_are_summed_through_shared_directory(self):
+        with tempfile.TemporaryDirectory() as directory:
+            workers = [metrics.Registry(directory) for _ in range(2)]
+            for count, worker in enumerate(workers, 1):
+                worker.counter('jobs_total', 'Jobs', ['queue']).inc(count, queue='a')
+                latency = worker.histogram('job_seconds', 'Job time', buckets=(0.1, 1))
+                latency.observe(0.05 * count)
+            workers[1].flush()
+            totals = workers[0].collect()
+            self.assertEqual(totals['jobs_total'], {'[["queue", "a"]]': 3})
+            self.assertEqual(totals['job_seconds']['[]'][:3], [2, 0, 0])
+            self.assertEqual(totals['job_seconds']['[]'][-1], 2)
+            output = workers[0].render()
+            self.assertIn('jobs_total{queue="a"} 3', output)
+            self.assertIn('job_seconds_bucket{le="1"} 2', output)
+            self.assertIn('job_seconds_count 2', output)
+    
+    def test_exited_workers_are_folded_into_one_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for pid in (101, 102, 103):
+                Path(directory, f'metrics-{pid}-abcd1234.json').write_text(json.dumps({'jobs_total': {'[]': pid}}))
+            metrics.retire_worker(directory, 101)
+            metrics.retire_worker(directory, 102)
+            self.assertEqual(
+                sorted(path.name for path in Path(directory).iterdir()),
+                ['metrics-103-abcd1234.json', metrics.EXITED_FILE],
+            )
+            self.assertEqual(metrics.Registry(directory).collect(), {'jobs_total': {'[]': 306}})
+            
+            metrics.clear_directory(directory)
+            self.assertEqual(list(Path(directory).iterdir()), [])
+    
+    def test_exceptions_are_counted_with_the_status_django_answers(self):
+        for error, status in [
+            (Http404, 404), (PermissionDenied, 403), (BadRequest, 400),
+            (SuspiciousOperation, 400), (ValueError, 500),
+        ]:
+            @metrics.instrument_view('failing')
+            def view(request):
+                raise error()
+            before = self.value('signups_requests_total', view='failing', method='GET', status=status)
+            with self.assertRaises(error):
+                view(RequestFactory().get('/'))
+            self.assertEqual(
+                self.value('signups_requests_total', view='failing', method='GET', status=status), before + 1,
+            )
+
+
+class AdminChangelistQueryTests(TestCase):
+    """Test that admin changelists do not run queries per row"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_superuser(username='admin', password='adminpass', email='admin@example.com')
+        self.client.force_login(self.user)
+        self.volunteer_type = VolunteerType.objects.create(name='Trash Duty', description='Trash', credit_hours=0.5)
+    
+    def add_forms(self, count):
+        for i in range(count):
+            form = VolunteerForm.objects.create(title=f'Form {i}', description='D', created_by=self.user)
+            for j in range(3):
+                slot = VolunteerSlot.objects.create(
+                    form=form,
+                    volunteer_type=self.volunteer_type,
+                    title=f'Slot {j}',
+                    date=date.today() + timedelta(days=j),
+                    max_volunteers=3,
+                )
+                for k in range(2):
+                    VolunteerSignup(slot=slot, name=f'V{k}', email=f'v{k}@example.com').save()
+    
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+    
+    def assert_constant_queries(self, url_name):
+        url = reverse(url_name)
+        self.add_forms(1)
+        small = self.count_queries(url)
+        self.add_forms(4)
+        self.assertEqual(self.count_queries(url), small)
+        return url
+    
+    def test_form_changelist(self):
+        """Slot and signup totals come from annotations"""
+        url = self.assert_constant_queries('admin:signups_volunteerform_changelist')
+        response = self.client.get(url, {'o': '-7'})
+        self.assertContains(response, '<td class="field-total_slots">3</td>', html=True)
+        self.assertContains(response, '<td class="field-total_signups">6</td>', html=True)
+    
+    def test_slot_changelist(self):
+        """Slot credit hours use the joined volunteer type"""
+        url = self.assert_constant_queries('admin:signups_volunteerslot_changelist')
+        self.assertEqual(self.client.get(url, {'o': '7'}).status_code, 200)
+    
+    def test_signup_changelist(self):
+        """Signup credit hours are annotated and sortable"""
+        url = self.assert_constant_queries('admin:signups_volunteersignup_changelist')
+        response = self.client.get(url, {'o': '5'})
+        self.assertContains(response, '0.50 hours')
+
+
+class VolunteerTypeCacheTests(TestCase):
+    """Test that admin pages share a process-local volunteer type cache"""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_superuser(username='admin', password='adminpass', email='admin@example.com')
+        self.client.force_login(self.user)
+        self.volunteer_type = VolunteerType.objects.create(name='Trash Duty', description='Trash', credit_hours=0.5)
+        VolunteerType.objects.create(name='Retired', description='Old', is_active=False)
+        self.url = reverse('admin:volunteer-types')
+    
+    def test_types_are_loaded_once(self):
+        """The endpoint and the form pages query volunteer types only once between changes"""
+        self.assertEqual([t['name'] for t in self.client.get(self.url).json()], ['Trash Duty'])
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+            self.client.get(reverse('admin:signups_volunteerform_add'))
+        # The inlines' type dropdowns still list every type
+        self.assertFalse([q for q in queries if 'WHERE "signups_volunteertype"."is_active"' in q['sql']])
+    
+    def test_save_and_delete_invalidate(self):
+        """Saving or deleting a type is seen on the next request"""
+        self.client.get(self.url)
+        self.volunteer_type.description = 'Empty the bins'
+        self.volunteer_type.save()
+        self.assertEqual(self.client.get(self.url).json()[0]['description'], 'Empty the bins')
+        self.volunteer_type.delete()
+        self.assertEqual(self.client.get(self.url).json(), [])
+    
+    def test_token_change_from_another_worker_reloads(self):
+        """A token bumped in the shared cache by any process is seen here"""
+        self.client.get(self.url)
+        VolunteerType.objects.filter(pk=self.volunteer_type.pk).update(description='Changed elsewhere')
+        self.assertEqual(self.client.get(self.url).json()[0]['description'], 'Trash')
+        cache.set(VOLUNTEER_TYPES_VERSION_KEY, 'bumped-by-another-worker', None)
+        self.assertEqual(self.client.get(self.url).json()[0]['description'], 'Changed elsewhere')
+    
+    def test_ttl_bounds_staleness(self):
+        """Writes that skip signals are still seen once the local copy expires"""
+        self.client.get(self.url)
+        VolunteerType.objects.filter(pk=self.volunteer_type.pk).update(description='Changed quietly')
+        with mock.patch('signups.cache.VOLUNTEER_TYPES_TTL', 0):
+            self.assertEqual(self.client.get(self.url).json()[0]['description'], 'Changed quietly')
+    
+    def test_etag_and_cache_control(self):
+        """Unchanged types get a 304, and only versioned URLs may be reused without asking"""
+        response = self.client.get(self.url)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        
+        page = self.client.get(reverse('admin:signups_volunteerform_add'))
+        version = page.context['volunteer_types_version']
+        self.assertContains(page, f'volunteer-types/?v={version}')
+        versioned = self.client.get(self.url, {'v': version})
+        self.assertIn('max-age=3600', versioned['Cache-Control'])
+        self.assertIn('private', versioned['Cache-Control'])
+        
+        VolunteerType.objects.create(name='Mowing', description='Mow')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+        self.assertNotEqual(self.client.get(reverse('admin:signups_volunteerform_add')).context['volunteer_types_version'], version)
+
+
+
+class QueryPlanTests(TestCase):
+    """Test that hot queries are answered from indexes, not full table scans.
+    
+    Each view is requested with its queries captured, and every captured
+    query against a signups table is run through EXPLAIN. PostgreSQL is told
+    to avoid sequential scans, since it rightly prefers them on tables this
+    small; one it still picks means no usable index exists.
+    """
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        volunteer_type = VolunteerType.objects.create(name='Setup', description='S', credit_hours=1)
+        self.volunteer_form = VolunteerForm.objects.create(title='Test Form', description='D', created_by=self.user)
+        self.slot = VolunteerSlot.objects.create(
+            form=self.volunteer_form, volunteer_type=volunteer_type,
+            title='Slot', date=timezone.localdate(), max_volunteers=3,
+        )
+        VolunteerSignup(slot=self.slot, name='Ann', email='Ann@Example.com').save()
+    
+    def full_scans(self, sql):
+        """Tables in the signups app that the plan for sql reads in full"""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute(f'EXPLAIN {sql}')
+                plan = '\n'.join(row[0] for row in cursor.fetchall())
+                return re.findall(r'Seq Scan on (signups_\w+)', plan)
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plan = '\n'.join(row[-1] for row in cursor.fetchall())
+                # SQLite reads every row for "SCAN t", with or without USING INDEX
+                return re.findall(r'\bSCAN (signups_\w+)', plan)
+        self.skipTest(f'No query plan check for {connection.vendor}')
+    
+    def assert_indexed(self, queries):
+        checked = 0
+        for query in queries:
+            sql = query['sql']
+            if sql.startswith('SELECT') and 'signups_' in sql:
+                checked += 1
+                self.assertEqual(self.full_scans(sql), [], sql)
+        self.assertTrue(checked)
+    
+    def assert_view_indexed(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+        self.assert_indexed(queries)
+        return response
+    
+    def test_public_pages(self):
+        kwargs = {'unique_url': self.volunteer_form.unique_url}
+        page = self.assert_view_indexed(reverse('signups:volunteer_form_view', kwargs=kwargs)).context['page']
+        cache.clear()
+        self.assert_view_indexed(reverse('signups:volunteer_form_view', kwargs=kwargs), after=encode_cursor(page.slots[0]))
+        self.assert_view_indexed(reverse('signups:form_summary', kwargs=kwargs), range='next-4-weeks')
+        self.assert_view_indexed(reverse('signups:slot_detail', kwargs={**kwargs, 'slot_id': self.slot.id}))
+        self.assert_view_indexed(reverse('signups:form_availability', kwargs=kwargs))
+    
+    def test_export(self):
+        User.objects.create_superuser(username='admin', password='adminpass', email='admin@example.com')
+        self.client.login(username='admin', password='adminpass')
+        self.assert_view_indexed(reverse('signups:export_csv', kwargs={'unique_url': self.volunteer_form.unique_url}))
+    
+    def test_signups_by_email(self):
+        response = self.assert_view_indexed(reverse('signups:my_signups_api'), email='ANN@example.com')
+        self.assertEqual(len(response.json()['signups']), 1)
+
+
+class MySignupsLookupTests(TestCase):
+    """Test finding one volunteer's signups across forms by email"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        volunteer_type = VolunteerType.objects.create(name='Setup', description='S', credit_hours=Decimal('1.5'))
+        forms = [
+            VolunteerForm.objects.create(title=f'Form {i}', description='D', created_by=self.user)
+            for i in range(3)
+        ]
+        VolunteerForm.objects.filter(pk=forms[2].pk).update(is_active=False)
+        for i, form in enumerate(forms):
+            slot = VolunteerSlot.objects.create(
+                form=form, volunteer_type=volunteer_type if i else None,
+                title=f'Slot {i}', date=date(2025, 9, 10 - i), max_volunteers=3,
+            )
+            VolunteerSignup(slot=slot, name='Ann', email=' Ann@Example.COM ' if i else 'ann@example.com').save()
+            VolunteerSignup(slot=slot, name='Bob', email='bob@example.com').save()
+    
+    def test_email_is_normalized_on_save(self):
+        self.assertEqual(
+            set(VolunteerSignup.objects.filter(name='Ann').values_list('email_normalized', flat=True)),
+            {'ann@example.com'},
+        )
+    
+    def test_backfill_matches_save(self):
+        """The migration that added email_normalized normalizes like save()"""
+        migration = importlib.import_module('signups.migrations.0009_volunteersignup_email_normalized')
+        VolunteerSignup.objects.filter(name='Ann').update(email='\u00a0ÅNN@Example.COM\t', email_normalized='')
+        with mock.patch.object(migration, 'BATCH_SIZE', 2):
+            migration.normalize_emails(django_apps, None)
+        self.assertEqual(
+            set(VolunteerSignup.objects.values_list('email_normalized', flat=True)),
+            {'ånn@example.com', 'bob@example.com'},
+        )
+    
+    def test_lookup_is_one_query_across_active_forms(self):
+        with self.assertNumQueries(1):
+            signups = list(VolunteerSignup.objects.for_email('ANN@example.com'))
+            rows = [(s.slot.form.title, s.slot.date, s.get_credit_hours()) for s in signups]
+        self.assertEqual(rows, [
+            ('Form 1', date(2025, 9, 9), Decimal('1.5')),
+            ('Form 0', date(2025, 9, 10), 0),
+        ])
+    
+    def test_page(self):
+        response = self.client.get(reverse('signups:my_signups'), {'email': 'ann@example.com'})
+        self.assertContains(response, '2 signups')
+        self.assertContains(response, 'Form 1')
+        self.assertNotContains(response, 'Form 2')
+        self.assertContains(response, '1.50 hours')
+        self.assertIsNone(self.client.get(reverse('signups:my_signups')).context['signups'])
+    
+    def test_api(self):
+        response = self.client.get(reverse('signups:my_signups_api'), {'email': 'Ann@Example.com'})
+        data = response.json()
+        self.assertEqual(data['email'], 'ann@example.com')
+        self.assertEqual(Decimal(data['total_credit_hours']), Decimal('1.5'))
+        self.assertEqual([row['form'] for row in data['signups']], ['Form 1', 'Form 0'])
+        self.assertEqual(data['signups'][0]['date'], '2025-09-09')
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertEqual(self.client.get(reverse('signups:my_signups_api'), {'email': 'nope'}).status_code, 400)
+
+class ViewBenchmarkTests(TestCase):
+    """Test the view benchmark suite at a small size"""
+    
+    def setUp(self):
+        cache.clear()
+    
+    def test_views_stay_within_query_budgets(self):
+        """Every benchmarked view answers 200 within its query budget"""
+        results = run_benchmarks(sizes=[5, 25], signups_per_slot=(0, 3), repeat=1)
+        self.assertEqual(len(results), 2 * len(QUERY_BUDGETS))
+        self.assertEqual(check_results(results), [])
+        # Query counts do not grow with the size of the form
+        by_view = {}
+        for result in results:
+            by_view.setdefault(result['view'], set()).add(result['queries'])
+        self.assertTrue(all(len(counts) == 1 for counts in by_view.values()), by_view)
+    
+    def test_repeats_measure_the_uncached_render(self):
+        """Later repeats load every slot's signups instead of reusing cached cards"""
+        results = run_benchmarks(sizes=[5], signups_per_slot=(1, 2), repeat=3)
+        for result in results:
+            if result['view'] in ('volunteer_form_view', 'form_summary'):
+                self.assertEqual(result['queries'], result['query_budget'], result)
+    
+    def test_regressions_against_baseline_fail(self):
+        """Timings well past the baseline and query budget overruns are reported"""
+        result = {'view': 'form_summary', 'slots': 10, 'status': 200, 'queries': 4,
+                  'query_budget': 3, 'median_ms': 100.0, 'max_ms': 120.0, 'bytes': 1000}
+        baseline = [dict(result, median_ms=20.0)]
+        failures = check_results([result], baseline, tolerance=1.5)
+        self.assertEqual(len(failures), 2)
+        self.assertIn('exceeds budget', failures[0])
+        self.assertIn('regressed', failures[1])
+        self.assertEqual(check_results([dict(result, queries=3, median_ms=21.0)], baseline), [])
+
+
+class GenerateDataCommandTests(TestCase):
+    """Test the bulk synthetic data generator"""
+    
+    def test_requires_superuser(self):
+        """Like the other data commands, generation needs an existing superuser"""
+        out = StringIO()
+        call_command('generate_data', stdout=out)
+        self.assertIn('No superuser found', out.getvalue())
+        self.assertFalse(VolunteerForm.objects.exists())
+    
+    def test_generates_consistent_counts(self):
+        """Slots, signups and current_signups all line up, in a few queries"""
+        User.objects.create_superuser(username='admin', password='adminpass', email='admin@example.com')
+        out = StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command(
+                'generate_data', '--forms', '2', '--slots-per-form', '30',
+                '--signups-per-slot', '1-4', '--types', '3', '--seed', '7', '--batch-size', '50',
+                stdout=out,
+            )
+        self.assertLess(len(queries), 60)
+        self.assertEqual(VolunteerForm.objects.count(), 2)
+        self.assertEqual(VolunteerSlot.objects.count(), 60)
+        self.assertEqual(VolunteerType.objects.count(), 3)
+        drifted = VolunteerSlot.objects.annotate(actual=Count('signups')).exclude(current_signups=F('actual'))
+        self.assertFalse(drifted.exists())
+        self.assertTrue(all(1 <= slot.current_signups <= 4 for slot in VolunteerSlot.objects.all()))
+        self.assertIn(f'{VolunteerSignup.objects.count()} signup(s)', out.getvalue())
+    
+    def test_rejects_bad_signup_range(self):
+        User.objects.create_superuser(username='admin', password='adminpass', email='admin@example.com')
+        with self.assertRaises(CommandError):
+            call_command('generate_data', '--signups-per-slot', '5-2', stdout=StringIO())
+
+
+class SlotImportTests(TestCase):
+    """Test streaming slot import from the command line and the admin"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_superuser(username='admin', password='adminpass', email='admin@example.com')
+        self.volunteer_form = VolunteerForm.objects.create(title='Test Form', description='D', created_by=self.user)
+        VolunteerType.objects.create(name='Trash Duty', description='Trash', credit_hours=0.5)
+    
+    def test_csv_import_resolves_types(self):
+        """Valid CSV rows become slots with their volunteer type attached"""
+        csv_text = (
+            'title,date,volunteer_type,description,max_volunteers\n'
+            'Trash Week 1,2025-09-01,trash duty,Bins,2\n'
+            'Open Helper,2025-09-02,,,\n'
+        )
+        result = import_slots(self.volunteer_form, StringIO(csv_text), batch_size=1)
+        self.assertTrue(result.committed)
+        self.assertEqual(result.created, 2)
+        first, second = self.volunteer_form.slots.order_by('date')
+        self.assertEqual(first.volunteer_type.name, 'Trash Duty')
+        self.assertEqual(first.max_volunteers, 2)
+        self.assertIsNone(second.volunteer_type)
+        self.assertEqual(second.max_volunteers, 1)
+    
+    def test_invalid_rows_roll_back_by_default(self):
+        """Any invalid row rolls back the whole import and is reported by row"""
+        csv_text = (
+            'title,date,volunteer_type,max_volunteers\n'
+            'Good,2025-09-01,,1\n'
+            ',2025-09-02,,1\n'
+            'Bad date,09/03/2025,,1\n'
+            'Bad type,2025-09-04,Juggling,1\n'
+            'Bad max,2025-09-05,,zero\n'
+        )
+        result = import_slots(self.volunteer_form, StringIO(csv_text))
+        self.assertFalse(result.committed)
+        self.assertEqual(result.created, 0)
+        self.assertEqual([row for row, _ in result.errors], [2, 3, 4, 5])
+        self.assertFalse(self.volunteer_form.slots.exists())
+        
+        result = import_slots(self.volunteer_form, StringIO(csv_text), skip_invalid=True)
+        self.assertTrue(result.committed)
+        self.assertEqual(result.created, 1)
+    
+    def test_json_array_and_lines_are_streamed(self):
+        """JSON arrays and JSON Lines are decoded across read boundaries"""
+        rows = [{'title': f'Slot {i}', 'date': '2025-10-01', 'Volunteer_Type': 'Trash Duty'} for i in range(50)]
+        array = StringIO(json.dumps(rows, indent=2))
+        array.read = lambda size=-1, read=array.read: read(7)  # Force tiny chunks
+        self.assertEqual(import_slots(self.volunteer_form, array, fmt='json').created, 50)
+        lines = StringIO('\n'.join(json.dumps(row) for row in rows))
+        self.assertEqual(import_slots(self.volunteer_form, lines, fmt='json').created, 50)
+        self.assertEqual(self.volunteer_form.slots.filter(volunteer_type__name='Trash Duty').count(), 100)
+    
+    def test_malformed_json_reports_parse_error(self):
+        result = import_slots(self.volunteer_form, StringIO('[{"title": "A", "date": "2025-01-01"}, {"title": '), fmt='json')
+        self.assertFalse(result.committed)
+        self.assertIn('Could not parse file', result.errors[0][1])
+    
+    def test_stray_array_punctuation_is_rejected(self):
+        """Only one opening '[' and single ',' separators are accepted"""
+        row = '{"title": "A", "date": "2025-01-01"}'
+        for text in [f'[{row}, ]{row}]', f'[[{row}]', f']{row}', f'[{row},,{row}]', f'[{row} {row}]', f'[{row}']:
+            with self.subTest(text=text):
+                result = import_slots(self.volunteer_form, StringIO(text), fmt='json')
+                self.assertFalse(result.committed)
+                self.assertIn('Could not parse file', result.errors[-1][1])
+        self.assertEqual(import_slots(self.volunteer_form, StringIO(f' [ {row} ,\n{row} ] '), fmt='json').created, 2)
+    
+    def test_command_dry_run(self):
+        """The command validates without writing on --dry-run"""
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as handle:
+            handle.write('title,date\nA,2025-09-01\nB,2025-09-02\n')
+        self.addCleanup(os.unlink, handle.name)
+        out = StringIO()
+        call_command('import_slots', str(self.volunteer_form.pk), handle.name, '--dry-run', stdout=out)
+        self.assertIn('2 of 2 row(s) are valid', out.getvalue())
+        self.assertFalse(self.volunteer_form.slots.exists())
+        call_command('import_slots', str(self.volunteer_form.pk), handle.name, stdout=out)
+        self.assertEqual(self.volunteer_form.slots.count(), 2)
+    
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=10)
+    def test_admin_upload(self):
+        """The admin upload view imports a file spooled to disk and reports bad rows"""
+        self.client.force_login(self.user)
+        url = reverse('admin:signups_volunteerform_import_slots', args=[self.volunteer_form.pk])
+        self.assertContains(
+            self.client.get(reverse('admin:signups_volunteerform_change', args=[self.volunteer_form.pk])),
+            url,
+        )
+        upload = SimpleUploadedFile('slots.csv', b'title,date\nA,2025-09-01\nB,not-a-date\n')
+        response = self.client.post(url, {'file': upload})
+        self.assertContains(response, 'Invalid date')
+        self.assertFalse(self.volunteer_form.slots.exists())
+        upload = SimpleUploadedFile('slots.json', b'[{"title": "A", "date": "2025-09-01"}]')
+        response = self.client.post(url, {'file': upload})
+        self.assertRedirects(response, reverse('admin:signups_volunteerform_change', args=[self.volunteer_form.pk]))
+        self.assertEqual(self.volunteer_form.slots.count(), 1)
+
+
+class SignupExportTests(TestCase):
+    """Test streaming CSV and JSON exports of a form's signups"""
+    
+    def setUp(self):
+        self.user = User.objects.create_superuser(username='admin', password='adminpass', email='admin@example.com')
+        self.volunteer_form = VolunteerForm.objects.create(title='Test Form', description='D', created_by=self.user)
+        volunteer_type = VolunteerType.objects.create(name='Trash Duty', description='Trash', credit_hours=0.5)
+        self.slot = VolunteerSlot.objects.create(
+            form=self.volunteer_form, volunteer_type=volunteer_type, title='Trash Week 1',
+            date=date(2025, 9, 1), max_volunteers=3,
+        )
+        self.empty_slot = VolunteerSlot.objects.create(
+            form=self.volunteer_form, title='Open Helper', date=date(2025, 9, 2), max_volunteers=1,
+        )
+        VolunteerSignup(slot=self.slot, name='Ann', email='ann@example.com').save()
+        VolunteerSignup(slot=self.slot, name='Bob', email='bob@example.com').save()
+        self.client.force_login(self.user)
+    
+    def export(self, url_name):
+        url = reverse(url_name, kwargs={'unique_url': self.volunteer_form.unique_url})
+        with self.assertNumQueries(4):  # Session, user, form and the single export query
+            response = self.client.get(url)
+            content = b''.join(response.streaming_content).decode()
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment', response['Content-Disposition'])
+        return content
+    
+    def test_csv_export(self):
+        """CSV rows cover every signup and every empty slot"""
+        rows = list(csv.DictReader(StringIO(self.export('signups:export_csv'))))
+        self.assertEqual([row['name'] for row in rows], ['Ann', 'Bob', ''])
+        self.assertEqual(rows[0]['volunteer_type'], 'Trash Duty')
+        self.assertEqual(rows[0]['credit_hours'], '0.50')
+        self.assertEqual(rows[2]['slot_title'], 'Open Helper')
+        self.assertEqual(rows[2]['credit_hours'], '')
+    
+    def test_csv_export_neutralises_formulas(self):
+        """Text a spreadsheet would run as a formula is exported as plain text"""
+        VolunteerSignup(slot=self.slot, name='=HYPERLINK("http://evil.example")', email='@evil@example.com').save()
+        self.slot.title = '-1+2'
+        self.slot.save()
+        rows = list(csv.DictReader(StringIO(self.export('signups:export_csv'))))
+        self.assertEqual(rows[2]['name'], '\'=HYPERLINK("http://evil.example")')
+        self.assertEqual(rows[2]['email'], "'@evil@example.com")
+        self.assertEqual(rows[0]['slot_title'], "'-1+2")
+        self.assertEqual(rows[0]['credit_hours'], '0.50')
+        # JSON is not opened by spreadsheets and keeps the original text
+        self.assertEqual(json.loads(self.export('signups:export_json'))[2]['name'], '=HYPERLINK("http://evil.example")')
+    
+    def test_json_export(self):
+        """JSON export is one valid array of row objects"""
+        rows = json.loads(self.export('signups:export_json'))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[1]['email'], 'bob@example.com')
+        self.assertEqual(rows[1]['date'], '2025-09-01')
+        self.assertIsNone(rows[2]['email'])
+    
+    def test_export_requires_staff(self):
+        """Volunteer emails are only exported to staff"""
+        self.client.logout()
+        url = reverse('signups:export_csv', kwargs={'unique_url': self.volunteer_form.unique_url})
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+
+class AvailabilityApiTests(TestCase):
+    """Test the JSON availability endpoint and its conditional GET support"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.volunteer_form = VolunteerForm.objects.create(title='Test Form', description='D', created_by=self.user)
+        self.slot = VolunteerSlot.objects.create(
+            form=self.volunteer_form, title='Slot', date=date(2025, 9, 1), max_volunteers=2,
+        )
+        self.full_slot = VolunteerSlot.objects.create(
+            form=self.volunteer_form, title='Full Slot', date=date(2025, 9, 2), max_volunteers=1,
+        )
+        VolunteerSignup(slot=self.full_slot, name='Ann', email='ann@example.com').save()
+        self.url = reverse('signups:form_availability', kwargs={'unique_url': self.volunteer_form.unique_url})
+    
+    def test_returns_slot_availability_in_two_queries(self):
+        with self.assertNumQueries(2):  # The ETag's aggregate, then the slots
+            response = self.client.get(self.url)
+        self.assertEqual(response.json()['slots'], [
+            {'id': self.slot.id, 'available_spots': 2, 'is_full': False},
+            {'id': self.full_slot.id, 'available_spots': 0, 'is_full': True},
+        ])
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertTrue(response.has_header('ETag'))
+    
+    def test_unchanged_form_answers_304_with_one_query(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+    
+    def test_signup_changes_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        VolunteerSignup(slot=self.slot, name='Bob', email='bob@example.com').save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['slots'][0]['available_spots'], 1)
+    
+    def test_etag_ignores_page_cache_tokens(self):
+        """A change another worker made is seen even if this process's cache never heard of it"""
+        etag = self.client.get(self.url)['ETag']
+        VolunteerSlot.objects.filter(pk=self.slot.pk).update(current_signups=1, version=F('version') + 1)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['slots'][0]['available_spots'], 1)
+    
+    def test_inactive_or_unknown_form_is_404(self):
+        self.volunteer_form.is_active = False
+        self.volunteer_form.save()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        missing = reverse('signups:form_availability', kwargs={'unique_url': 'missing'})
+        self.assertEqual(self.client.get(missing).status_code, 404)
+
+
+class LiveAvailabilityEventTests(TestCase):
+    """Test the availability pub/sub broker and server-sent events stream"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.volunteer_form = VolunteerForm.objects.create(title='Test Form', description='D', created_by=self.user)
+        self.slot = VolunteerSlot.objects.create(
+            form=self.volunteer_form, title='Slot', date=date(2025, 9, 1), max_volunteers=1,
+        )
+        self.url = reverse('signups:form_events', kwargs={'unique_url': self.volunteer_form.unique_url})
+    
+    def sign_up(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            VolunteerSignup(slot=self.slot, name='Ann', email='ann@example.com').save()
+    
+    async def test_broker_fans_out_across_threads(self):
+        """Messages published from a sync thread reach every subscriber"""
+        broker = InProcessBroker()
+        with broker.subscribe('form:1') as first, broker.subscribe('form:1') as second:
+            self.assertEqual(broker.subscriber_count('form:1'), 2)
+            await asyncio.to_thread(broker.publish, 'form:1', {'event': 'ping'})
+            broker.publish('form:2', {'event': 'elsewhere'})
+            self.assertEqual(await asyncio.wait_for(first.get(), 1), {'event': 'ping'})
+            self.assertEqual(await asyncio.wait_for(second.get(), 1), {'event': 'ping'})
+            self.assertTrue(first.empty())
+        self.assertEqual(broker.subscriber_count('form:1'), 0)
+    
+    async def test_stream_sends_snapshot_then_changes(self):
+        """An ASGI stream starts with a snapshot and then pushes each signup"""
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        first = (await anext(stream)).decode()
+        self.assertIn('event: snapshot', first)
+        self.assertIn('"available_spots": 1', first)
+        
+        await sync_to_async(self.sign_up)()
+        change = (await asyncio.wait_for(anext(stream), 1)).decode()
+        self.assertIn('event: availability', change)
+        self.assertIn(f'"id": {self.slot.id}', change)
+        self.assertIn('"is_full": true', change)
+        await stream.aclose()
+    
+    def test_wsgi_stream_ends_after_snapshot(self):
+        """Under WSGI the stream sends one snapshot and asks the browser to retry"""
+        response = self.client.get(self.url)
+        content = b''.join(response.streaming_content).decode()
+        self.assertTrue(content.startswith('retry: '))
+        self.assertIn('event: snapshot', content)
+    
+    def test_inactive_form_is_404(self):
+        self.volunteer_form.is_active = False
+        self.volunteer_form.save()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class AsyncViewTests(TestCase):
+    """Test the async read-path views against their sync counterparts"""
+    
+    def setUp(self):
+        cache.clear()
+        self.factory = AsyncRequestFactory()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        volunteer_type = VolunteerType.objects.create(name='Setup', description='Set up', credit_hours=Decimal('1.5'))
+        self.volunteer_form = VolunteerForm.objects.create(title='Test Form', description='D', created_by=self.user)
+        self.slot = VolunteerSlot.objects.create(
+            form=self.volunteer_form, volunteer_type=volunteer_type,
+            title='Morning Shift', date=date(2025, 9, 1), max_volunteers=3,
+        )
+        VolunteerSignup(slot=self.slot, name='Ann Example', email='ann@example.com').save()
+    
+    def kwargs(self, **extra):
+        return {'unique_url': self.volunteer_form.unique_url, **extra}
+    
+    async def test_async_form_view_matches_sync(self):
+        """The async form page and summary render the same content as the sync views"""
+        for async_view, sync_view in [
+            (views.async_volunteer_form_view, views.volunteer_form_view),
+            (views.async_form_summary, views.form_summary),
+        ]:
+            await cache.aclear()
+            response = await async_view(self.factory.get('/'), **self.kwargs())
+            self.assertEqual(response.status_code, 200)
+            await cache.aclear()
+            expected = await sync_to_async(sync_view)(RequestFactory().get('/'), **self.kwargs())
+            self.assertEqual(response.content, expected.content)
+    
+    async def test_async_form_view_uses_page_cache(self):
+        """The page cache wraps async views too"""
+        first = await views.async_volunteer_form_view(self.factory.get('/'), **self.kwargs())
+        second = await views.async_volunteer_form_view(self.factory.get('/'), **self.kwargs())
+        self.assertEqual(first['X-Page-Cache'], 'miss')
+        self.assertEqual(second['X-Page-Cache'], 'hit')
+        self.assertEqual(first.content, second.content)
+    
+    async def test_async_slot_detail(self):
+        """The async slot page lists signups and 404s for slots of inactive forms"""
+        response = await views.async_volunteer_slot_detail(self.factory.get('/'), **self.kwargs(slot_id=self.slot.id))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Ann Example')
+        self.assertContains(response, 'Morning Shift')
+        
+        self.volunteer_form.is_active = False
+        await self.volunteer_form.asave()
+        with self.assertRaises(Http404):
+            await views.async_volunteer_slot_detail(self.factory.get('/'), **self.kwargs(slot_id=self.slot.id))
+    
+    async def test_async_views_without_a_stats_row(self):
+        """A form whose stats row is not built yet falls back to an async aggregate"""
+        await FormStats.objects.filter(form=self.volunteer_form).adelete()
+        for view in [views.async_volunteer_form_view, views.async_form_summary]:
+            response = await view(self.factory.get('/'), **self.kwargs())
+            self.assertEqual(response.status_code, 200)
+            self.assertContains(response, '1.50 hours')
+    
+    async def test_async_missing_form_raises_404(self):
+        with self.assertRaises(Http404):
+            await views.async_form_summary(self.factory.get('/'), unique_url='missing')
@@ -1,11 +1,29 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
 app_name = 'signups'
 
+if settings.SIGNUPS_ASYNC_VIEWS:
+    form_view = views.async_volunteer_form_view
+    slot_detail = views.async_volunteer_slot_detail
+    form_summary = views.async_form_summary
+else:
+    form_view = views.volunteer_form_view
+    slot_detail = views.volunteer_slot_detail
+    form_summary = views.form_summary
+
 urlpatterns = [
     path('', views.home, name='home'),
-    path('form/<str:unique_url>/', views.volunteer_form_view, name='volunteer_form_view'),
-    path('form/<str:unique_url>/slot/<int:slot_id>/', views.volunteer_slot_detail, name='slot_detail'),
-    path('form/<str:unique_url>/summary/', views.form_summary, name='form_summary'),
+    path('my-signups/', views.my_signups, name='my_signups'),
+    path('my-signups.json', views.my_signups_api, name='my_signups_api'),
+    path('metrics', views.metrics, name='metrics'),
+    path('form/<str:unique_url>/', form_view, name='volunteer_form_view'),
+    path('form/<str:unique_url>/slot/<int:slot_id>/', slot_detail, name='slot_detail'),
+    path('form/<str:unique_url>/signup/', views.batch_signup, name='batch_signup'),
+    path('form/<str:unique_url>/summary/', form_summary, name='form_summary'),
+    path('form/<str:unique_url>/availability/', views.form_availability, name='form_availability'),
+    path('form/<str:unique_url>/events/', views.form_events, name='form_events'),
+    path('form/<str:unique_url>/export.csv', views.export_signups, {'fmt': 'csv'}, name='export_csv'),
+    path('form/<str:unique_url>/export.json', views.export_signups, {'fmt': 'json'}, name='export_json'),
 ]
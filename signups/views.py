@@ -1,75 +1,472 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import Http404
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.contrib import messages
-from .models import VolunteerForm, VolunteerSlot, VolunteerSignup
-from .forms import VolunteerSignupForm
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.cache import patch_cache_control
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import condition, require_GET
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.conf import settings
+from asgiref.sync import sync_to_async
+import asyncio
+import csv
+import json
+from .models import VolunteerForm, VolunteerSlot, VolunteerSignup, WaitlistEntry, SlotFullError, normalize_email, waitlist_count
+from .forms import BatchSignupForm, SignupLookupForm, VolunteerSignupForm, WaitlistEntryForm
+from .cache import arender_slot_cards, bump_form_version, cache_form_page, render_slot_cards
+from .events import form_channel, get_broker, publish_form_event, slot_availability
+from .metrics import SIGNUP_ATTEMPTS, instrument_view, registry
+from .pagination import aget_slot_page, get_slot_page
 
 def home(request):
     """Display the home page for the signups app"""
     return render(request, 'signups/home.html')
 
+def get_form(unique_url, **filters):
+    """Load a form with its stats row, which holds its credit hour total"""
+    return get_object_or_404(VolunteerForm.objects.select_related('stats'), unique_url=unique_url, **filters)
+
+def render_slot_page(request, template_name, fragment_name, context):
+    """Render a page of slots, or only the slots when "Load more" asks for a fragment.
+
+    The context's cards come from render_slot_cards(). Together with the
+    form query this is at most three queries whatever the size of the form:
+    the page of slots with their volunteer types joined, and the signups of
+    the slots whose cached cards are out of date.
+    """
+    page = context['page']
+    context['slots'] = page.slots
+    return render(request, fragment_name if request.GET.get('fragment') else template_name, context)
+
+@instrument_view('volunteer_form_view')
+@cache_form_page
 def volunteer_form_view(request, unique_url):
     """Display a volunteer form for public signup"""
-    form = get_object_or_404(VolunteerForm, unique_url=unique_url, is_active=True)
-    # Force ordering by date, then by title for slots with same date
-    slots = form.slots.all().order_by('date', 'title')
-    
-    # Calculate total credit hours for the form
-    total_credit_hours = form.get_total_credit_hours()
-    
+    form = get_form(unique_url, is_active=True)
+
+    page = get_slot_page(request, form)
     context = {
         'form': form,
-        'slots': slots,
-        'total_credit_hours': total_credit_hours,
+        'page': page,
+        'cards': render_slot_cards(page.slots, 'signups/slot_card.html', form),
+        'total_credit_hours': form.get_total_credit_hours(),
+        'event_stream': settings.SIGNUPS_EVENT_STREAM,
     }
-    return render(request, 'signups/volunteer_form.html', context)
+    return render_slot_page(request, 'signups/volunteer_form.html', 'signups/volunteer_form_slots.html', context)
 
+@instrument_view('volunteer_slot_detail')
 def volunteer_slot_detail(request, unique_url, slot_id):
     """Display details for a specific volunteer slot"""
     form = get_object_or_404(VolunteerForm, unique_url=unique_url, is_active=True)
-    slot = get_object_or_404(VolunteerSlot, id=slot_id, form=form)
-    
-    if request.method == 'POST':
+    slot = get_object_or_404(VolunteerSlot.objects.annotate(waitlist_length=waitlist_count()), id=slot_id, form=form)
+    signup_form = VolunteerSignupForm()
+    waitlist_form = WaitlistEntryForm()
+
+    if request.method == 'POST' and 'waitlist' in request.POST:
+        waitlist_form = WaitlistEntryForm(request.POST)
+        if waitlist_form.is_valid():
+            entry = waitlist_form.save(commit=False)
+            entry.slot = slot
+            with transaction.atomic():
+                entry.save()
+                # A seat may have freed up since the page was shown
+                promoted = WaitlistEntry.objects.promote_next(slot)
+            if promoted and not WaitlistEntry.objects.filter(pk=entry.pk).exists():
+                SIGNUP_ATTEMPTS.inc(outcome='promoted')
+                messages.success(request, f'A spot opened up, so you are signed up for {slot.title}!')
+            else:
+                SIGNUP_ATTEMPTS.inc(outcome='waitlisted')
+                messages.success(
+                    request,
+                    f"You are number {entry.position()} on the waitlist for {slot.title}. "
+                    f"You will be signed up automatically if a spot opens.",
+                )
+            return redirect('signups:volunteer_form_view', unique_url=unique_url)
+        SIGNUP_ATTEMPTS.inc(outcome='invalid')
+    elif request.method == 'POST':
         signup_form = VolunteerSignupForm(request.POST)
         if signup_form.is_valid():
-            # Check if slot is full
-            if slot.is_full():
-                messages.error(request, 'Sorry, this slot is already full.')
-            else:
-                # Create the signup
-                signup = signup_form.save(commit=False)
-                signup.slot = slot
+            # Create the signup; the seat is claimed atomically in save()
+            signup = signup_form.save(commit=False)
+            signup.slot = slot
+            try:
                 signup.save()
+            except SlotFullError:
+                SIGNUP_ATTEMPTS.inc(outcome='full')
+                slot.refresh_from_db(fields=['current_signups'])
+                messages.error(request, 'Sorry, this slot is already full. You can join the waitlist instead.')
+                waitlist_form = WaitlistEntryForm(initial=signup_form.cleaned_data)
+            else:
+                SIGNUP_ATTEMPTS.inc(outcome='signed_up')
                 messages.success(request, f'Successfully signed up for {slot.title}!')
                 return redirect('signups:volunteer_form_view', unique_url=unique_url)
-    else:
-        signup_form = VolunteerSignupForm()
-    
+        else:
+            SIGNUP_ATTEMPTS.inc(outcome='invalid')
+
     # Calculate credit hours for this slot
     slot_credit_hours = slot.get_total_credit_hours()
     individual_credit_hours = slot.volunteer_type.credit_hours if slot.volunteer_type else 0
-    
+
     context = {
         'form': form,
         'slot': slot,
         'signup_form': signup_form,
+        'waitlist_form': waitlist_form,
+        'waitlist_length': slot.waitlist_length,
         'signups': slot.signups.all(),
         'slot_credit_hours': slot_credit_hours,
         'individual_credit_hours': individual_credit_hours,
     }
     return render(request, 'signups/slot_detail.html', context)
 
+def describe_slots(slots):
+    return ', '.join(f"{slot.title} ({slot.date:%b} {slot.date.day})" for slot in slots)
+
+@instrument_view('batch_signup')
+@never_cache
+def batch_signup(request, unique_url):
+    """Sign up for the slots ticked on the volunteer form in one go.
+
+    The volunteer form page is cached and shared, so it cannot carry a CSRF
+    token; its checkboxes GET this page, which confirms the selection and
+    POSTs the signup. All the seats are claimed in one transaction.
+    """
+    form = get_object_or_404(VolunteerForm, unique_url=unique_url, is_active=True)
+
+    if request.method == 'POST':
+        signup_form = BatchSignupForm(request.POST, volunteer_form=form)
+        if signup_form.is_valid():
+            data = signup_form.cleaned_data
+            slots = list(data['slots'])
+            try:
+                signups, full_ids = VolunteerSignup.objects.create_for_slots(
+                    slots, partial=data['partial'], name=data['name'], email=data['email'],
+                )
+            except SlotFullError as error:
+                full = [slot for slot in slots if slot.pk in error.slot_ids]
+                messages.error(
+                    request,
+                    f"Sorry, {describe_slots(full)} {'is' if len(full) == 1 else 'are'} already full, "
+                    f"so you have not been signed up for anything yet.",
+                )
+            else:
+                bump_form_version(form.pk)
+                for signup in signups:
+                    publish_form_event(form.pk, 'availability', slot_availability(signup.slot))
+                messages.success(request, f'Successfully signed up for {describe_slots(signup.slot for signup in signups)}!')
+                if full_ids:
+                    full = [slot for slot in slots if slot.pk in full_ids]
+                    messages.warning(request, f'{describe_slots(full)} filled up first, so you were not signed up for them.')
+                return redirect('signups:volunteer_form_view', unique_url=unique_url)
+        selected = signup_form.cleaned_data.get('slots', [])
+    else:
+        signup_form = BatchSignupForm(volunteer_form=form, initial={'slots': request.GET.getlist('slots')})
+        try:
+            selected = signup_form.fields['slots'].clean(request.GET.getlist('slots'))
+        except ValidationError:
+            messages.error(request, 'Please tick at least one open slot to sign up for.')
+            return redirect('signups:volunteer_form_view', unique_url=unique_url)
+
+    context = {
+        'form': form,
+        'signup_form': signup_form,
+        'slots': selected,
+    }
+    return render(request, 'signups/batch_signup.html', context)
+
+@instrument_view('form_summary')
+@cache_form_page
 def form_summary(request, unique_url):
     """Display a summary of all signups for a form (admin view)"""
-    form = get_object_or_404(VolunteerForm, unique_url=unique_url)
-    slots = form.slots.all().order_by('date')
-    
-    # Calculate total credit hours for the form
-    total_credit_hours = form.get_total_credit_hours()
-    
+    form = get_form(unique_url)
+
+    page = get_slot_page(request, form)
+    context = {
+        'form': form,
+        'page': page,
+        'cards': render_slot_cards(page.slots, 'signups/slot_summary_card.html', form),
+        'total_credit_hours': form.get_total_credit_hours(),
+    }
+    return render_slot_page(request, 'signups/form_summary.html', 'signups/form_summary_slots.html', context)
+
+# Async versions of the read-heavy views, routed in place of the sync ones
+# when SIGNUPS_ASYNC_VIEWS is enabled. Database access goes through the async
+# ORM, so a slow query no longer holds a whole worker while it waits.
+
+async def aget_form(unique_url, **filters):
+    """Async get_form()"""
+    try:
+        return await VolunteerForm.objects.select_related('stats').aget(unique_url=unique_url, **filters)
+    except VolunteerForm.DoesNotExist:
+        raise Http404('No VolunteerForm matches the given query.')
+
+@instrument_view('volunteer_form_view')
+@cache_form_page
+async def async_volunteer_form_view(request, unique_url):
+    """Async volunteer_form_view"""
+    form = await aget_form(unique_url, is_active=True)
+    page = await aget_slot_page(request, form)
+    context = {
+        'form': form,
+        'page': page,
+        'cards': await arender_slot_cards(page.slots, 'signups/slot_card.html', form),
+        'total_credit_hours': await form.aget_total_credit_hours(),
+        'event_stream': settings.SIGNUPS_EVENT_STREAM,
+    }
+    return render_slot_page(request, 'signups/volunteer_form.html', 'signups/volunteer_form_slots.html', context)
+
+@instrument_view('volunteer_slot_detail')
+async def async_volunteer_slot_detail(request, unique_url, slot_id):
+    """Async volunteer_slot_detail; signups (POSTs) still run the sync view"""
+    if request.method == 'POST':
+        # The unwrapped view, so the request is only counted once
+        return await sync_to_async(volunteer_slot_detail.__wrapped__)(request, unique_url, slot_id)
+
+    try:
+        slot = await (
+            VolunteerSlot.objects
+            .select_related('form', 'volunteer_type')
+            .annotate(waitlist_length=waitlist_count())
+            .aget(id=slot_id, form__unique_url=unique_url, form__is_active=True)
+        )
+    except VolunteerSlot.DoesNotExist:
+        raise Http404('No VolunteerSlot matches the given query.')
+    signups = [signup async for signup in slot.signups.all()]
+
+    context = {
+        'form': slot.form,
+        'slot': slot,
+        'signup_form': VolunteerSignupForm(),
+        'waitlist_form': WaitlistEntryForm(),
+        'waitlist_length': slot.waitlist_length,
+        'signups': signups,
+        'slot_credit_hours': slot.get_total_credit_hours(),
+        'individual_credit_hours': slot.volunteer_type.credit_hours if slot.volunteer_type else 0,
+    }
+    return render(request, 'signups/slot_detail.html', context)
+
+@instrument_view('form_summary')
+@cache_form_page
+async def async_form_summary(request, unique_url):
+    """Async form_summary"""
+    form = await aget_form(unique_url)
+    page = await aget_slot_page(request, form)
     context = {
         'form': form,
-        'slots': slots,
+        'page': page,
+        'cards': await arender_slot_cards(page.slots, 'signups/slot_summary_card.html', form),
+        'total_credit_hours': await form.aget_total_credit_hours(),
+    }
+    return render_slot_page(request, 'signups/form_summary.html', 'signups/form_summary_slots.html', context)
+
+def lookup_signups(lookup_form):
+    """One email's signups across active forms and their credit hour total"""
+    signups = list(VolunteerSignup.objects.for_email(lookup_form.cleaned_data['email']))
+    return signups, sum(signup.get_credit_hours() for signup in signups)
+
+@instrument_view('my_signups')
+@never_cache
+def my_signups(request):
+    """Let a volunteer see every slot they signed up for, across all forms"""
+    lookup_form = SignupLookupForm(request.GET or None)
+    signups, total_credit_hours = lookup_signups(lookup_form) if lookup_form.is_valid() else (None, 0)
+
+    context = {
+        'lookup_form': lookup_form,
+        'signups': signups,
         'total_credit_hours': total_credit_hours,
     }
-    return render(request, 'signups/form_summary.html', context)
+    return render(request, 'signups/my_signups.html', context)
+
+@instrument_view('my_signups_api')
+@require_GET
+@never_cache
+def my_signups_api(request):
+    """JSON version of my_signups, looked up with ?email="""
+    lookup_form = SignupLookupForm(request.GET)
+    if not lookup_form.is_valid():
+        return JsonResponse({'errors': lookup_form.errors}, status=400)
+    signups, total_credit_hours = lookup_signups(lookup_form)
+
+    return JsonResponse({
+        'email': normalize_email(lookup_form.cleaned_data['email']),
+        'total_credit_hours': total_credit_hours,
+        'signups': [
+            {
+                'form': signup.slot.form.title,
+                'form_url': signup.slot.form.get_form_url(),
+                'slot': signup.slot.title,
+                'date': signup.slot.date,
+                'volunteer_type': signup.slot.volunteer_type.name if signup.slot.volunteer_type else None,
+                'credit_hours': signup.get_credit_hours(),
+                'signed_up_at': signup.signed_up_at,
+            }
+            for signup in signups
+        ],
+    }, encoder=DjangoJSONEncoder)
+
+def availability_etag(request, unique_url):
+    """ETag for a form's availability, read from the database so every worker agrees.
+
+    Slot versions only ever go up, and a new slot always raises the highest
+    id, so the slot count, highest id and version total change together
+    with any slot. None for a missing or inactive form, which is then a 404.
+    """
+    state = (
+        VolunteerForm.objects
+        .filter(unique_url=unique_url, is_active=True)
+        .values('pk')
+        .annotate(count=Count('slots'), last=Max('slots__id'), versions=Sum('slots__version'))
+        .first()
+    )
+    if state is None:
+        return None
+    return f"{state['pk']}-{state['count']}-{state['last']}-{state['versions']}"
+
+@instrument_view('form_availability')
+@require_GET
+@condition(etag_func=availability_etag)
+def form_availability(request, unique_url):
+    """Compact per-slot availability for polling, answered with 304 when unchanged"""
+    slots = list(
+        VolunteerSlot.objects
+        .filter(form__unique_url=unique_url, form__is_active=True)
+        .order_by('date', 'title', 'id')
+        .values_list('id', 'max_volunteers', 'current_signups')
+    )
+    if not slots and not VolunteerForm.objects.filter(unique_url=unique_url, is_active=True).exists():
+        raise Http404('No VolunteerForm matches the given query.')
+
+    response = JsonResponse({
+        'form': unique_url,
+        'slots': [
+            {
+                'id': slot_id,
+                'available_spots': max(0, max_volunteers - current_signups),
+                'is_full': current_signups >= max_volunteers,
+            }
+            for slot_id, max_volunteers, current_signups in slots
+        ],
+    })
+    # Browsers must revalidate every poll, which costs a 304 while nothing changes
+    patch_cache_control(response, no_cache=True)
+    return response
+
+def sse_message(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+async def form_events(request, unique_url):
+    """Server-sent events stream of slot availability changes for a form.
+
+    Sends a snapshot of every slot first, then one event per change. Under
+    WSGI a request cannot be held open cheaply, so the stream ends after the
+    snapshot and the browser's EventSource reconnects after SIGNUPS_EVENT_RETRY.
+    """
+    try:
+        form_id = await VolunteerForm.objects.filter(is_active=True).values_list('pk', flat=True).aget(unique_url=unique_url)
+    except VolunteerForm.DoesNotExist:
+        raise Http404('No VolunteerForm matches the given query.')
+
+    slots = VolunteerSlot.objects.filter(form_id=form_id).order_by('date', 'title', 'id')
+    snapshot = sse_message('snapshot', {'slots': [
+        {
+            'id': slot_id,
+            'available_spots': max(0, max_volunteers - current_signups),
+            'is_full': current_signups >= max_volunteers,
+        }
+        async for slot_id, max_volunteers, current_signups in slots.values_list('id', 'max_volunteers', 'current_signups')
+    ]})
+    retry = f'retry: {settings.SIGNUPS_EVENT_RETRY * 1000}\n\n'
+
+    if not isinstance(request, ASGIRequest):
+        response = StreamingHttpResponse([retry, snapshot], content_type='text/event-stream')
+    else:
+        async def stream():
+            # Subscribe before sending the snapshot so no change slips between them
+            with get_broker().subscribe(form_channel(form_id)) as queue:
+                yield retry + snapshot
+                while True:
+                    try:
+                        message = await asyncio.wait_for(queue.get(), settings.SIGNUPS_EVENT_HEARTBEAT)
+                    except asyncio.TimeoutError:
+                        yield ': keepalive\n\n'  # Keeps proxies from closing an idle stream
+                        continue
+                    yield sse_message(message['event'], message['data'])
+        response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+EXPORT_COLUMNS = [
+    'slot_id', 'slot_title', 'date', 'volunteer_type', 'max_volunteers',
+    'name', 'email', 'signed_up_at', 'credit_hours',
+]
+EXPORT_CHUNK_SIZE = 2000
+
+class Echo:
+    """File-like object whose write() hands back the value for streaming"""
+    def write(self, value):
+        return value
+
+# Spreadsheets run cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+def csv_cell(value):
+    """A CSV cell for value, with user text that a spreadsheet would run quoted as text"""
+    if value is None:
+        return ''
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+def iter_export_rows(form):
+    """Yield one row per signup, plus one per slot that has none, in a single query"""
+    rows = (
+        VolunteerSlot.objects
+        .filter(form=form)
+        .order_by('date', 'title', 'id', 'signups__signed_up_at')
+        .values_list(
+            'id', 'title', 'date', 'volunteer_type__name', 'max_volunteers',
+            'signups__name', 'signups__email', 'signups__signed_up_at',
+            'volunteer_type__credit_hours',
+        )
+    )
+    for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        *fields, credit_hours = row
+        signed_up = fields[5] is not None
+        yield fields + [(credit_hours or 0) if signed_up else None]
+
+@staff_member_required
+@never_cache
+def metrics(request):
+    """Counters and latency histograms in the Prometheus text format, summed
+    across every worker sharing SIGNUPS_METRICS_DIR"""
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@staff_member_required
+def export_signups(request, unique_url, fmt):
+    """Stream a form's slots and signups as CSV or JSON"""
+    form = get_object_or_404(VolunteerForm, unique_url=unique_url)
+    rows = iter_export_rows(form)
+
+    if fmt == 'json':
+        def stream():
+            yield '['
+            for i, row in enumerate(rows):
+                yield (',' if i else '') + json.dumps(dict(zip(EXPORT_COLUMNS, row)), cls=DjangoJSONEncoder)
+            yield ']'
+        response = StreamingHttpResponse(stream(), content_type='application/json')
+    else:
+        writer = csv.writer(Echo())
+        def stream():
+            yield writer.writerow(EXPORT_COLUMNS)
+            for row in rows:
+                yield writer.writerow([csv_cell(value) for value in row])
+        response = StreamingHttpResponse(stream(), content_type='text/csv')
+
+    response['Content-Disposition'] = f'attachment; filename="{form.unique_url}-signups.{fmt}"'
+    return response